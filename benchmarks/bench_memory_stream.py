@@ -0,0 +1,108 @@
+"""MemoryStream的微基准测试
+
+用法：
+    python -m benchmarks.bench_memory_stream --sizes 100,1000,10000 --out memory.json
+"""
+from typing import Dict, List
+import argparse
+import gc
+import random
+import tracemalloc
+
+from benchmarks.common import measure, peak_rss_mb, save_results
+from models.memory_stream import MemoryStream
+
+MEMORY_TYPES = ['action', 'dialogue', 'movement', 'custom']
+
+def make_memory(rng: random.Random, char_ids: List[str]) -> Dict:
+    """生成一条随机记忆"""
+    return {
+        'type': rng.choice(MEMORY_TYPES),
+        'content': f"与{rng.choice(char_ids)}在实验室讨论了模型训练的进展",
+        'importance': rng.randint(1, 10),
+        'related_chars': rng.sample(char_ids, 2)
+    }
+
+def build_stream(size: int, rng: random.Random, char_ids: List[str]) -> MemoryStream:
+    """构建一个刚好填满的记忆流"""
+    stream = MemoryStream(max_size=size)
+    for _ in range(size):
+        stream.add_memory(make_memory(rng, char_ids))
+    return stream
+
+def bytes_per_memory(size: int, seed: int, char_ids: List[str]) -> float:
+    """用tracemalloc测量记忆流中平均每条记忆占用的内存（不含向量）"""
+    rng = random.Random(seed)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        stream = build_stream(size, rng, char_ids)
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    # 向量矩阵按块预分配，与单条记录的大小无关
+    return (current - stream._vectors.nbytes) / size
+
+def bench_size(size: int, min_time: float, seed: int) -> Dict:
+    """对指定大小的记忆流执行各项操作的基准测试"""
+    rng = random.Random(seed)
+    char_ids = [f"char_{i}" for i in range(50)]
+    stream = build_stream(size, rng, char_ids)
+    result = {'size': size, 'operations': {}}
+    result['bytes_per_memory'] = bytes_per_memory(min(size, 100000), seed, char_ids)
+    ops = result['operations']
+
+    # 记忆流已满，每次插入都会触发淘汰
+    ops['add_memory'] = measure(
+        lambda: stream.add_memory(make_memory(rng, char_ids)),
+        min_time=min_time
+    )
+    ops['get_recent_memories'] = measure(
+        lambda: stream.get_recent_memories(hours=24),
+        min_time=min_time
+    )
+    ops['get_memories_about_character'] = measure(
+        lambda: stream.get_memories_about_character(rng.choice(char_ids)),
+        min_time=min_time
+    )
+
+    def overfill() -> None:
+        # 临时放宽上限，多放入一条记忆而不触发淘汰
+        stream.max_size = size + 1
+        stream.add_memory(make_memory(rng, char_ids))
+        stream.max_size = size
+
+    # 单独测量一次淘汰的耗时
+    ops['_filter_memories'] = measure(
+        stream._filter_memories,
+        min_time=min_time,
+        setup=overfill
+    )
+
+    result['peak_rss_mb'] = peak_rss_mb()
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="MemoryStream微基准测试")
+    parser.add_argument('--sizes', default='100,1000,10000,100000,1000000',
+                        help="逗号分隔的记忆流大小")
+    parser.add_argument('--min-time', type=float, default=0.2,
+                        help="每项操作的最短测量时间（秒）")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', help="结果JSON文件路径")
+    args = parser.parse_args()
+
+    results = []
+    for size in [int(x) for x in args.sizes.split(',')]:
+        result = bench_size(size, args.min_time, args.seed)
+        results.append(result)
+        ops = ', '.join(
+            f"{name}={op['mean_us']:.1f}us" for name, op in result['operations'].items()
+        )
+        print(f"size={size}: {ops}, {result['bytes_per_memory']:.0f}B/memory")
+        gc.collect()
+
+    save_results('memory_stream', results, args.out)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""VirtualTown整体模拟吞吐量基准测试
+
+使用离线模拟后端运行VirtualTown的观察模式：引擎的step_async()推进每个tick，实时面板
+在每个tick结束时重绘到内存缓冲区而不是终端。统计每秒tick数、实际执行的回合数、
+各阶段耗时和峰值内存。各阶段耗时由引擎的phase_timer记录，render为面板的画面合成；
+并发回合的耗时分别累加。每组角色数在独立的子进程中运行，峰值内存互不影响。
+
+模拟时间由手动时钟推进，从固定的早上8点开始，结果与运行时的真实时间无关。
+--tick-seconds可以加大每个tick的模拟时长，例如以600秒一个tick跑1008个tick即模拟一周。
+
+用法：
+    python -m benchmarks.bench_simulation --characters 10,100,1000 --rooms 20 --ticks 5 --out sim.json
+    python -m benchmarks.bench_simulation --characters 20 --ticks 1008 --tick-seconds 600
+"""
+from typing import Dict, List
+from datetime import datetime
+import argparse
+import io
+import random
+import time
+
+from benchmarks.common import PhaseTimer, peak_rss_mb, run_isolated, save_results
+from config.settings import SIMULATION_TICK
+from main import VirtualTown
+from models.character import Character
+from models.memory_stream import MemoryStream
+from models.room import Room
+from models.occupancy import OccupancyIndex
+from models.town_map import TownMap
+from utils.api_client import DeepSeekClient
+from utils.renderer import Renderer
+from utils.sim_clock import SimClock, MANUAL
+from utils.stub_llm import StubBackend
+
+PERSONALITIES = ["热情、乐于分享", "安静、细心", "活跃、直率", "外向、话多", "理性、专注"]
+START_TIME = datetime(2024, 1, 1, 8).timestamp()  # 模拟开始的时间
+
+def build_town(
+    n_characters: int,
+    n_rooms: int,
+    seed: int,
+    latency: str,
+    tick_seconds: float = SIMULATION_TICK
+) -> VirtualTown:
+    """构建一个使用模拟后端、包含合成角色和房间的小镇，画面输出到内存缓冲区"""
+    rng = random.Random(seed)
+    town = VirtualTown(
+        DeepSeekClient(backend=StubBackend(latency=latency, seed=seed)),
+        clock=SimClock(MANUAL, step=tick_seconds, start=START_TIME)
+    )
+    town.renderer = Renderer(stream=io.StringIO())
+
+    room_ids = [f"room_{i}" for i in range(n_rooms)]
+    for i, room_id in enumerate(room_ids):
+        # 环形连接加上一条随机捷径
+        connected = {room_ids[(i - 1) % n_rooms], room_ids[(i + 1) % n_rooms], rng.choice(room_ids)}
+        connected.discard(room_id)
+        town.rooms[room_id] = Room(
+            id=room_id,
+            name=f"房间{i}",
+            description="一个普通的房间。",
+            connected_to=sorted(connected),
+            items=["桌子", "椅子"],
+            ambient_sounds=["安静"],
+            time_features={'morning': "清晨", 'afternoon': "午后", 'evening': "夜晚"},
+            clock=town.clock
+        )
+    town.town_map = TownMap.from_rooms(town.rooms.values())
+    town.occupancy = OccupancyIndex(town.rooms.values())
+
+    for i in range(n_characters):
+        char = Character(
+            id=f"char_{i}",
+            name=f"角色{i}",
+            age=20,
+            occupation="学生",
+            personality=rng.choice(PERSONALITIES),
+            background="",
+            interests=[],
+            current_location=rng.choice(room_ids),
+            daily_routine={'morning': "学习", 'afternoon': "研究", 'evening': "休息"},
+            memory_stream=MemoryStream(clock=town.clock),
+            routine_locations={period: rng.choice(room_ids) for period in ('morning', 'afternoon', 'evening')},
+            clock=town.clock
+        )
+        town.characters[char.id] = char
+        town.memory_streams[char.id] = char.memory_stream
+        town.occupancy.place(char.id, char.current_location, force=True)
+
+    return town
+
+def bench_simulation(
+    n_characters: int,
+    n_rooms: int,
+    ticks: int,
+    seed: int,
+    latency: str,
+    tick_seconds: float = SIMULATION_TICK
+) -> Dict:
+    """运行一组参数的整体模拟基准测试"""
+    # 引擎内部的移动和关系变化使用全局随机数
+    random.seed(seed)
+    town = build_town(n_characters, n_rooms, seed, latency, tick_seconds)
+    timer = PhaseTimer()
+    town.phase_timer = timer
+    turns = 0
+
+    def count_turn(event: Dict) -> None:
+        nonlocal turns
+        turns += 1
+
+    # 调度器只让到期的角色行动，按实际发布的action事件统计回合数
+    town.events.subscribe('action', count_turn)
+    town.open_observation_panel()
+    start = time.perf_counter()
+    town.run(ticks)
+    elapsed = time.perf_counter() - start
+    town.close_observation_panel()
+
+    result = {
+        'characters': n_characters,
+        'rooms': n_rooms,
+        'ticks': ticks,
+        'elapsed_s': elapsed,
+        'ticks_per_second': ticks / elapsed if elapsed else 0.0,
+        'character_turns': turns,
+        'character_turns_per_second': turns / elapsed if elapsed else 0.0,
+        'simulated_seconds': town.now - START_TIME,
+        'phases': timer.summary(),
+        'llm_requests': town.api_client.get_backend_stats().get('requests'),
+        'compaction': town.memory_compactor.stats() if town.memory_compactor else None,
+        'peak_rss_mb': peak_rss_mb()
+    }
+    town.shutdown()
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="VirtualTown模拟吞吐量基准测试")
+    parser.add_argument('--characters', default='10,100,1000',
+                        help="逗号分隔的角色数量")
+    parser.add_argument('--rooms', type=int, default=20)
+    parser.add_argument('--ticks', type=int, default=5)
+    parser.add_argument('--latency', default='fixed:0',
+                        help="模拟后端的延迟分布，默认无延迟以测量引擎本身")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--tick-seconds', type=float, default=SIMULATION_TICK,
+                        help="每个tick推进的模拟时间（秒）")
+    parser.add_argument('--out', help="结果JSON文件路径")
+    args = parser.parse_args()
+
+    results: List[Dict] = []
+    for n in [int(x) for x in args.characters.split(',')]:
+        result = run_isolated(
+            bench_simulation, n, args.rooms, args.ticks, args.seed, args.latency, args.tick_seconds
+        )
+        results.append(result)
+        phases = ', '.join(
+            f"{name}={phase['total_s']:.3f}s" for name, phase in result['phases'].items()
+        )
+        print(
+            f"characters={n} rooms={args.rooms} ticks={args.ticks}: "
+            f"{result['ticks_per_second']:.2f} ticks/s, "
+            f"{result['character_turns_per_second']:.2f} turns/s, llm_requests={result['llm_requests']}, "
+            f"peak_rss={result['peak_rss_mb']}MB ({phases})"
+        )
+
+    save_results('simulation', results, args.out)
+
+if __name__ == "__main__":
+    main()
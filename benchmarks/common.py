@@ -0,0 +1,117 @@
+from typing import Any, Callable, Dict, List, Optional
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Windows没有resource模块
+    resource = None
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+class PhaseTimer:
+    """按阶段累计耗时"""
+
+    def __init__(self):
+        self.totals: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.totals[name] = self.totals.get(name, 0.0) + time.perf_counter() - start
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """各阶段的总耗时、调用次数和平均耗时"""
+        return {
+            name: {
+                'total_s': total,
+                'calls': self.counts[name],
+                'mean_us': total / self.counts[name] * 1e6
+            }
+            for name, total in self.totals.items()
+        }
+
+def measure(
+    func: Callable[[], None],
+    min_time: float = 0.2,
+    max_iterations: int = 100000,
+    setup: Optional[Callable[[], None]] = None
+) -> Dict[str, float]:
+    """重复执行func直到累计耗时达到min_time，返回单次平均耗时
+
+    慢操作（如百万级记忆的全量排序）至少执行一次即可返回。
+    """
+    iterations = 0
+    elapsed = 0.0
+    while iterations < max_iterations and (iterations == 0 or elapsed < min_time):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        elapsed += time.perf_counter() - start
+        iterations += 1
+    return {
+        'iterations': iterations,
+        'total_s': elapsed,
+        'mean_us': elapsed / iterations * 1e6
+    }
+
+def peak_rss_mb() -> Optional[float]:
+    """进程的峰值常驻内存（MB），不支持的平台返回None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux以KB为单位，macOS以字节为单位
+    if sys.platform == 'darwin':
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+def run_isolated(func: Callable[..., Any], *args) -> Any:
+    """在新启动的子进程中运行func并返回结果
+
+    峰值内存是进程级的最高水位，同一进程中依次测量多组参数时后面的结果会继承前面的峰值；
+    每组参数在独立的进程中运行，互不影响。func和参数、结果都需要可以pickle。
+    """
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        return executor.submit(func, *args).result()
+
+def git_revision() -> Optional[str]:
+    """当前代码的git提交号"""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=ROOT_DIR,
+            stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def save_results(suite: str, results: List[Dict], output: Optional[str]) -> Dict:
+    """保存基准测试结果为JSON，附带运行环境信息"""
+    report = {
+        'suite': suite,
+        'commit': git_revision(),
+        'timestamp': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results
+    }
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return report
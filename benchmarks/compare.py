@@ -0,0 +1,52 @@
+"""比较两次基准测试结果
+
+用法：
+    python -m benchmarks.compare baseline.json current.json
+"""
+from typing import Dict, Iterator, Tuple
+import argparse
+import json
+
+def _metrics(report: Dict) -> Iterator[Tuple[str, float]]:
+    """把报告展开为(指标名, 数值)，数值越小越好"""
+    for result in report['results']:
+        if 'operations' in result:
+            key = f"size={result['size']}"
+            for name, op in result['operations'].items():
+                yield f"{key} {name} (us)", op['mean_us']
+            if result.get('bytes_per_memory') is not None:
+                yield f"{key} bytes/memory", result['bytes_per_memory']
+        else:
+            key = f"characters={result['characters']} rooms={result['rooms']}"
+            tps = result['ticks_per_second']
+            yield f"{key} s/tick", 1 / tps if tps else 0.0
+            for name, phase in result['phases'].items():
+                yield f"{key} {name} (s)", phase['total_s']
+        if result.get('peak_rss_mb') is not None:
+            yield f"{key} peak_rss (MB)", result['peak_rss_mb']
+
+def main():
+    parser = argparse.ArgumentParser(description="比较两次基准测试结果")
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--threshold', type=float, default=1.1,
+                        help="current/baseline超过该比值时标记为退化")
+    args = parser.parse_args()
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(args.current, encoding='utf-8') as f:
+        current = json.load(f)
+
+    print(f"baseline: {baseline.get('commit')}  current: {current.get('commit')}")
+    base_metrics = dict(_metrics(baseline))
+    for name, value in _metrics(current):
+        if name not in base_metrics:
+            continue
+        base = base_metrics[name]
+        ratio = value / base if base else float('inf')
+        flag = "  <-- 退化" if ratio > args.threshold else ""
+        print(f"{name:60s} {base:12.4g} -> {value:12.4g}  x{ratio:.2f}{flag}")
+
+if __name__ == "__main__":
+    main()
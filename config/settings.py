@@ -1,16 +1,71 @@
 # API配置
 API_KEY = "sk-"  # DeepSeek API密钥
 API_BASE_URL = "https://api.deepseek.com/v1"
+LLM_BACKEND = "http"  # LLM后端：http为真实接口，stub为离线模拟后端
+
+# 离线模拟后端设置（LLM_BACKEND = "stub"时生效）
+STUB_LATENCY = "fixed:0"  # 延迟分布，如 fixed:0.05、uniform:0.05,0.3、lognormal:-2.5,0.6
+STUB_ERROR_RATE = 0.0  # 注入错误的概率
+STUB_SEED = 42  # 随机数种子
+
+HTTP_POOL_SIZE = 10  # 连接池大小，不应小于MAX_CONCURRENT_REQUESTS
+CONNECT_TIMEOUT = 5  # 建立连接超时时间（秒）
+READ_TIMEOUT = 60  # 读取响应超时时间（秒）
+
+# 限流与容错设置
+REQUESTS_PER_MINUTE = 300  # 每分钟最大请求数
+TOKENS_PER_MINUTE = 1000000  # 每分钟最大token数（含预估输出）
+MAX_RETRIES = 3  # 429/5xx/网络错误的最大重试次数
+RETRY_BASE_DELAY = 1.0  # 指数退避的基础等待时间（秒）
+RETRY_MAX_DELAY = 30.0  # 单次重试的最长等待时间（秒）
+CIRCUIT_FAILURE_THRESHOLD = 5  # 连续失败多少次后熔断
+CIRCUIT_RECOVERY_TIMEOUT = 30.0  # 熔断后多久尝试恢复（秒）
 
 # 全局参数设置
 DEFAULT_TEMPERATURE = 0.8  # 提高创造性
 MAX_TOKENS = 4096  # 增加输出长度
 TOP_P = 0.95  # 提高多样性
 
+# 提示与输出长度预算（token数，按调用类型区分）
+PROMPT_TOKEN_BUDGETS = {
+    'action': 800,  # 行为决策
+    'dialogue': 1000,  # 对话生成
+    'mood': 400,  # 心情分析
+    'turn': 1200,  # 观察模式的回合决策
+    'observation': 400,  # 环境观察
+    'emotion': 600,  # 情感分析
+    'reflection': 1500,  # 记忆压缩（多组记忆一起概括）
+    'default': 1000
+}
+COMPLETION_TOKEN_LIMITS = {
+    'action': 300,
+    'dialogue': 400,
+    'mood': 32,
+    'turn': 500,
+    'observation': 300,
+    'emotion': 200,
+    'reflection': 600,
+    'default': 512
+}
+MEMORY_ITEM_TOKEN_LIMIT = 120  # 提示中单条记忆的最大token数
+
+# 响应缓存设置
+CACHE_ENABLED = False  # 是否启用LLM响应缓存
+CACHE_FILE = "llm_cache.sqlite3"  # 磁盘缓存文件，设为None则只使用内存缓存
+CACHE_TTL = 24 * 3600  # 缓存有效期（秒）
+CACHE_MEMORY_SIZE = 1024  # 内存LRU缓存条目数
+CACHE_DISK_SIZE = 100000  # 磁盘缓存最大条目数
+CACHE_MAX_TEMPERATURE = 0.3  # 温度不超过该值的请求默认可缓存
+CACHE_HIGH_TEMPERATURE = False  # 是否也缓存高温度（创造性）请求
+MAX_CONCURRENT_REQUESTS = 8  # 观察模式下同时进行的最大API请求数
+
 # 房间参数
 MAX_CHARACTERS = 8  # 增加房间最大角色数以适应更多互动
 MEMORY_WINDOW = 200  # 增加记忆窗口以存储更多历史
 INTERACTION_COOLDOWN = 1  # 减少互动冷却时间以增加互动频率
+OBSERVATION_ROUND_DELAY = 2  # 观察模式每轮结束后的暂停时间（秒）
+TURN_MAX_RETRIES = 1  # 回合决策JSON格式错误时的重试次数
+RELATIONSHIP_DELTA_RANGE = (-5, 10)  # 单次互动关系值变化范围
 
 # 日志设置
 LOG_LEVEL = "INFO"
@@ -19,12 +74,52 @@ LOG_FILE = "virtual_room.log"
 # 渲染设置
 COLOR_ENABLED = True  # 启用彩色输出
 DISPLAY_TIMESTAMP = True  # 显示时间戳
+STREAM_DIALOGUE = True  # 对话以流式方式逐字显示
+OBSERVATION_LOG_LINES = 8  # 观察模式实时面板显示的最近事件条数
 
 # 角色行为设置
 EMOTION_UPDATE_INTERVAL = 5  # 情绪更新间隔（秒）
 ACTION_UPDATE_INTERVAL = 10  # 行为更新间隔（秒）
+SIMULATION_TICK = 2  # 每个tick推进的模拟时间（秒）
+CLOCK_MODE = "realtime"  # 交互界面的模拟时钟：realtime（真实时间）、accelerated（加速）、manual（每个tick前进SIMULATION_TICK秒）
+CLOCK_SPEED = 1440  # 加速时钟的倍速，1440即一分钟模拟一天
+SCHEDULER_NIGHT_FACTOR = 4  # 夜间（22点到6点）更新间隔的放大倍数
+SCHEDULER_LOW_ENERGY = 30  # 精力低于该值时视为疲惫
+SCHEDULER_LOW_ENERGY_FACTOR = 3  # 疲惫角色更新间隔的放大倍数
+SCHEDULER_IDLE_FACTOR = 2  # 房间里没有其他人时更新间隔的放大倍数
 MEMORY_RETENTION_DAYS = 7  # 记忆保留天数
 
+# 记忆存储设置
+MEMORY_BACKEND = "sqlite"  # 记忆存储：sqlite为持久化到数据库，memory为只保存在内存中
+MEMORY_DB_FILE = "memories.sqlite3"  # SQLite记忆数据库文件
+MEMORY_DB_MAX_SIZE = 2000  # SQLite中每个角色保留的未压缩记忆数，达到水位线时触发压缩
+
+# 状态持久化设置
+JOURNAL_ENABLED = True  # 是否记录事件日志，重启时从快照和日志恢复小镇状态
+JOURNAL_DIR = "town_state"  # 快照和事件日志所在目录
+JOURNAL_SYNC_INTERVAL = 1.0  # 事件批量写入磁盘并fsync的间隔（秒）
+JOURNAL_SNAPSHOT_INTERVAL = 5000  # 每记录多少个事件写入一次完整快照
+
+# 记忆检索设置
+EMBEDDING_DIM = 256  # 哈希n-gram向量维度
+EMBEDDING_NGRAMS = (1, 2, 3)  # 使用的字符n-gram长度
+RETRIEVAL_DECAY = 0.995  # 新近度每小时的衰减系数
+RETRIEVAL_CANDIDATES = 200  # SQLite存储检索时每类候选记忆的条数
+RETRIEVAL_WEIGHTS = {
+    'recency': 1.0,  # 新近度
+    'importance': 1.0,  # 重要性
+    'relevance': 1.0  # 与查询的相似度
+}
+
+# 记忆压缩设置
+COMPACTION_ENABLED = True  # 是否在后台把旧记忆概括为摘要
+COMPACTION_WATERMARK = 0.8  # 记忆数达到max_size的该比例时触发压缩
+COMPACTION_GROUP_SIZE = 8  # 每条摘要概括的记忆数
+COMPACTION_MAX_GROUPS = 4  # 一次调用最多概括的组数
+COMPACTION_MAX_IMPORTANCE = 5  # 重要性不超过该值的记忆可以被压缩
+COMPACTION_MIN_AGE = 6 * 3600  # 超过该时长（秒）的记忆无论重要性都可以被压缩
+COMPACTION_ARCHIVE_SIZE = 1000  # 每个记忆流保留的已压缩原始记忆条数
+
 # 符号显示设置
 CHARACTER_SYMBOL = "@"  # 角色显示符号
 EMOTION_SEPARATOR = ":"  # 情绪分隔符
\ No newline at end of file
@@ -0,0 +1,740 @@
+from typing import ContextManager, Dict, Iterator, List, Optional
+from contextlib import nullcontext
+import asyncio
+import json
+import random
+import time
+import uuid
+
+from models.character import Character
+from models.memory import Memory
+from models.room import Room
+from models.town_map import TownMap
+from models.occupancy import OccupancyIndex
+from models.memory_stream import MemoryStream
+from models.memory_store import MemoryStore
+from utils.api_client import DeepSeekClient, AsyncDeepSeekClient, TurnDecision, APIError
+from utils.event_bus import EventBus
+from utils.prompt_builder import PromptBuilder, completion_tokens
+from utils.memory_compactor import MemoryCompactor
+from utils.event_journal import EventJournal
+from utils.scheduler import CharacterScheduler, ACTION, MOOD
+from utils.sim_clock import SimClock, MANUAL, REALTIME
+from config.settings import (
+    RELATIONSHIP_DELTA_RANGE, COMPACTION_ENABLED, MEMORY_BACKEND, MEMORY_DB_MAX_SIZE, JOURNAL_ENABLED,
+    ACTION_UPDATE_INTERVAL, EMOTION_UPDATE_INTERVAL,
+    SCHEDULER_NIGHT_FACTOR, SCHEDULER_LOW_ENERGY, SCHEDULER_LOW_ENERGY_FACTOR, SCHEDULER_IDLE_FACTOR
+)
+
+class SimulationEngine:
+    """小镇模拟引擎
+
+    保存角色、房间、记忆和事件日志，推进模拟的每一个tick。引擎本身不读取输入、
+    不打印、不休眠：行为、对话、移动等通过events发布，由终端界面或其他前端订阅。
+    step()执行一个tick，run(ticks)连续执行多个tick，速度只受LLM延迟和引擎本身限制。
+
+    模拟时间来自clock（SimClock），角色、房间和记忆流共用同一个时钟。默认的手动时钟
+    每个tick前进SIMULATION_TICK秒，与运行速度无关；也可以传入真实时间或加速的时钟。
+    只有行为或心情更新到期的角色才会调用LLM（见CharacterScheduler）；夜间、
+    精力不足或独处的角色间隔按配置放大。
+
+    发布的事件（事件字典均包含type字段）：
+        - restored: 从存档恢复，字段replayed为重放的事件数
+        - action: 角色的行为，字段char_id、action
+        - dialogue: 角色对他人说话，字段char_id、target_id、utterance
+        - move: 角色移动，字段char_id、from_room、room_id
+        - mood: 角色心情变化，字段char_id、mood
+        - turn_failed: 角色本回合的LLM调用失败，字段char_id、error
+        - tick: 一个tick结束，字段tick、elapsed（秒）
+    """
+
+    def __init__(self, api_client: Optional[DeepSeekClient] = None, clock: Optional[SimClock] = None):
+        self.api_client = api_client or DeepSeekClient()
+        self.async_api_client = AsyncDeepSeekClient(self.api_client)
+        self.memory_compactor = (
+            MemoryCompactor(self.api_client, on_applied=self._record_compaction)
+            if COMPACTION_ENABLED else None
+        )
+        self.events = EventBus()
+        self.characters: Dict[str, Character] = {}
+        self.rooms: Dict[str, Room] = {}
+        # 房间连通图，房间加载后构建；房间布局变化时需调用town_map.set_layout
+        self.town_map = TownMap()
+        # 房间与在场角色的双向索引，角色移动都经过它
+        self.occupancy = OccupancyIndex()
+        self.memory_streams: Dict[str, MemoryStream] = {}
+        self.memory_store: Optional[MemoryStore] = None
+        # 事件日志，在initialize中打开；重放日志时不再重复记录
+        self.journal: Optional[EventJournal] = None
+        self._replaying = False
+        # 前端当前控制的角色，保存在快照中；无界面运行时为None
+        self.current_character: Optional[Character] = None
+        self.tick = 0
+        # 模拟时钟，角色、房间和记忆流共用；默认每个tick前进SIMULATION_TICK秒
+        self.clock = clock or SimClock(MANUAL)
+        # 当前tick的模拟时间（秒），每个tick开始时从时钟读取一次
+        self.now = self.clock.now()
+        self.scheduler = CharacterScheduler()
+        # 上次评估心情时各角色记忆流的插入计数，没有新记忆时不再调用LLM
+        self._mood_seen: Dict[str, int] = {}
+        # 可选的分阶段计时器，需提供phase(name)上下文管理器（如benchmarks.common.PhaseTimer）；
+        # 并发回合中各阶段的耗时分别累加，llm_wait等阶段的总和可能超过tick的实际用时
+        self.phase_timer = None
+
+    def _phase(self, name: str) -> ContextManager:
+        """为一个阶段计时，未设置phase_timer时什么也不做"""
+        if self.phase_timer is None:
+            return nullcontext()
+        return self.phase_timer.phase(name)
+
+    def load_config(self) -> None:
+        """加载配置文件"""
+        # 使用SQLite存储时，所有角色的记忆保存在同一个数据库中，重启后继续使用
+        if MEMORY_BACKEND == 'sqlite' and self.memory_store is None:
+            self.memory_store = MemoryStore()
+
+        # 加载角色配置
+        with open('config/characters.json', 'r', encoding='utf-8') as f:
+            char_data = json.load(f)
+            for char_info in char_data['characters']:
+                memory_stream = (
+                    self.memory_store.stream(char_info['id'], MEMORY_DB_MAX_SIZE, self.clock)
+                    if self.memory_store is not None
+                    else MemoryStream(clock=self.clock)
+                )
+                char = Character.from_config(char_info, memory_stream, self.clock)
+                self.characters[char.id] = char
+                # 与角色持有同一个记忆流，两处看到的记忆始终一致
+                self.memory_streams[char.id] = char.memory_stream
+
+        # 加载房间配置
+        with open('config/room_layout.json', 'r', encoding='utf-8') as f:
+            room_data = json.load(f)
+            for room_info in room_data['rooms']:
+                room = Room.from_config(room_info, self.clock)
+                self.rooms[room.id] = room
+        self.town_map = TownMap.from_rooms(self.rooms.values())
+        self.occupancy = OccupancyIndex(self.rooms.values())
+
+    def initialize(self) -> Optional[str]:
+        """加载配置、放置角色，并从上次运行留下的快照和事件日志恢复状态
+
+        Returns:
+            快照中记录的当前控制角色ID，没有时为None
+        """
+        self.load_config()
+
+        # 将角色放置到初始位置，初始位置由配置决定，不受房间容量限制
+        for char_id, char in self.characters.items():
+            self.occupancy.place(char_id, char.current_location, force=True)
+
+        current_id = None
+        if JOURNAL_ENABLED:
+            self.journal = EventJournal()
+            snapshot, events = self.journal.load()
+            if snapshot is not None:
+                current_id = self._restore_snapshot(snapshot)
+            self._replay_events(events)
+            if snapshot is not None or events:
+                self._resume_clock(snapshot)
+                self.events.publish('restored', replayed=len(events))
+        return current_id
+
+    def _resume_clock(self, snapshot: Optional[Dict]) -> None:
+        """非真实时间的时钟从存档中最后的模拟时间继续，保证新记忆不早于已有记忆"""
+        if self.clock.mode == REALTIME:
+            return
+        times = [snapshot['clock']] if snapshot is not None and 'clock' in snapshot else []
+        for stream in self.memory_streams.values():
+            latest = stream.get_latest(1)
+            if latest:
+                times.append(latest[0].timestamp)
+        if times:
+            self.clock.set_time(max(times))
+            self.now = self.clock.now()
+
+    def step(self) -> None:
+        """执行一个tick"""
+        asyncio.run(self.step_async())
+
+    def run(self, ticks: int) -> None:
+        """连续执行ticks个tick，所有tick共用一个事件循环"""
+        asyncio.run(self._run_async(ticks))
+
+    async def _run_async(self, ticks: int) -> None:
+        for _ in range(ticks):
+            await self.step_async()
+
+    async def step_async(self) -> None:
+        """step()的异步版本：到期的角色并发完成回合决策和心情评估，然后更新小镇状态"""
+        start = time.perf_counter()
+        with self._phase('schedule'):
+            self.now = self.clock.tick()
+            for char_id in self.characters:
+                if char_id not in self.scheduler:
+                    self.scheduler.add(char_id, self.now)
+            jobs = self.scheduler.pop_due(self.now)
+        try:
+            actors = [char_id for char_id, kind in jobs if kind == ACTION]
+            await asyncio.gather(*(self._observe_character(char_id) for char_id in actors))
+            # 本tick已经做出回合决策（其中包含心情）的角色不再单独评估心情
+            acted = set(actors)
+            await asyncio.gather(*(
+                self._reevaluate_mood(char_id) for char_id, kind in jobs
+                if kind == MOOD and char_id not in acted
+            ))
+        finally:
+            # tick被取消（如用户退出观察模式）时同样重新安排，被取消的回合推迟到下次；
+            # 状态只在LLM调用返回后同步修改，因此不会留下做了一半的回合
+            with self._phase('schedule'):
+                night = self.clock.is_night()
+                for char_id, kind in jobs:
+                    base = ACTION_UPDATE_INTERVAL if kind == ACTION else EMOTION_UPDATE_INTERVAL
+                    self.scheduler.schedule(char_id, kind, self.now + self._interval(char_id, base, night))
+
+        with self._phase('state_update'):
+            self.update_game_state()
+        self.tick += 1
+        self.events.publish('tick', tick=self.tick, elapsed=time.perf_counter() - start)
+
+    def _interval(self, char_id: str, base: float, night: bool) -> float:
+        """按角色当前状态放大更新间隔：夜间、精力不足或房间里没有其他人时更少调度"""
+        char = self.characters[char_id]
+        interval = base
+        if night:
+            interval *= SCHEDULER_NIGHT_FACTOR
+        if char.energy < SCHEDULER_LOW_ENERGY:
+            interval *= SCHEDULER_LOW_ENERGY_FACTOR
+        if self.occupancy.count(char.current_location) <= 1:
+            interval *= SCHEDULER_IDLE_FACTOR
+        return interval
+
+    async def _reevaluate_mood(self, char_id: str) -> None:
+        """心情更新到期时，只有自上次评估以来有新记忆才调用LLM"""
+        stream = self.memory_streams[char_id]
+        if self._mood_seen.get(char_id) == stream.insert_count:
+            return
+        self._mood_seen[char_id] = stream.insert_count
+        try:
+            with self._phase('llm_wait'):
+                await self.update_mood_based_on_events_async(char_id)
+        except APIError as e:
+            self.events.publish('turn_failed', char_id=char_id, error=str(e))
+
+    def _record(self, event_type: str, **data) -> None:
+        """把改变状态的事件写入事件日志"""
+        if self.journal is not None and not self._replaying:
+            self.journal.append(event_type, **data)
+
+    def _record_character_state(self, char: Character) -> None:
+        """记录角色的心情和精力"""
+        self._record('character', char_id=char.id, mood=char.mood, energy=char.energy)
+
+    def _snapshot_state(self) -> Dict:
+        """导出可以完整恢复小镇动态状态的快照，静态信息仍从配置文件读取"""
+        return {
+            'current_character': self.current_character.id if self.current_character else None,
+            'clock': self.now,
+            'characters': {
+                char_id: {
+                    'current_location': char.current_location,
+                    'mood': char.mood,
+                    'energy': char.energy,
+                    'relationships': char.relationships
+                }
+                for char_id, char in self.characters.items()
+            },
+            'rooms': {
+                room_id: {'characters': list(room.characters), 'state': room.state}
+                for room_id, room in self.rooms.items()
+            },
+            # SQLite存储中的记忆本身已经持久化，只有内存中的记忆流需要写入快照
+            'memories': {
+                char_id: stream.to_records()
+                for char_id, stream in self.memory_streams.items()
+                if isinstance(stream, MemoryStream)
+            }
+        }
+
+    def _restore_snapshot(self, snapshot: Dict) -> Optional[str]:
+        """从快照恢复状态，返回快照时正在控制的角色ID"""
+        for char_id, data in snapshot['characters'].items():
+            char = self.characters.get(char_id)
+            if char is None:
+                continue
+            char.current_location = data['current_location']
+            char.mood = data['mood']
+            char.energy = data['energy']
+            char.relationships = data['relationships']
+        self.occupancy.clear()
+        for room_id, data in snapshot['rooms'].items():
+            room = self.rooms.get(room_id)
+            if room is not None:
+                for char_id in data['characters']:
+                    if char_id in self.characters:
+                        self.occupancy.place(char_id, room_id, force=True)
+                room.state = data['state']
+        for char_id, records in snapshot['memories'].items():
+            stream = self.memory_streams.get(char_id)
+            if isinstance(stream, MemoryStream):
+                stream.load_records(records)
+        return snapshot.get('current_character')
+
+    def _replay_events(self, events: List[Dict]) -> None:
+        """按顺序重放快照之后的事件"""
+        self._replaying = True
+        try:
+            for event in events:
+                self._apply_event(event)
+        finally:
+            self._replaying = False
+
+    def _apply_event(self, event: Dict) -> None:
+        """把一个事件应用到当前状态"""
+        event_type = event['type']
+        char = self.characters.get(event.get('char_id'))
+        if event_type == 'move' and char is not None:
+            if self.occupancy.place(char.id, event['room_id'], force=True):
+                char.current_location = event['room_id']
+        elif event_type == 'memory':
+            stream = self.memory_streams.get(event['char_id'])
+            if isinstance(stream, MemoryStream):
+                stream.restore_memory(event['memory'])
+        elif event_type == 'compaction':
+            stream = self.memory_streams.get(event['char_id'])
+            if isinstance(stream, MemoryStream):
+                for summary in event['summaries']:
+                    stream.restore_compaction(summary)
+        elif event_type == 'relationship' and char is not None:
+            char.relationships[event['other_id']] = event['value']
+        elif event_type == 'energy':
+            for char_id, energy in event['energies'].items():
+                if char_id in self.characters:
+                    self.characters[char_id].energy = energy
+        elif event_type == 'character' and char is not None:
+            char.mood = event['mood']
+            char.energy = event['energy']
+        elif event_type == 'room_state' and event['room_id'] in self.rooms:
+            self.rooms[event['room_id']].state.update(event['state'])
+
+    def checkpoint(self) -> None:
+        """事件足够多时写入快照，否则按同步间隔把事件写入磁盘"""
+        if self.journal is None:
+            return
+        if self.journal.needs_snapshot():
+            self.journal.write_snapshot(self._snapshot_state())
+        else:
+            self.journal.flush_if_due()
+
+    def shutdown(self) -> None:
+        """退出前写入剩余事件并释放后台资源"""
+        if self.journal is not None:
+            self.journal.close()
+        if self.memory_compactor is not None:
+            self.memory_compactor.close()
+        self.async_api_client.close()
+        if self.memory_store is not None:
+            self.memory_store.close()
+
+    def move_character(self, char_id: str, room_id: str) -> bool:
+        """移动角色到指定房间"""
+        if char_id not in self.characters or room_id not in self.rooms:
+            return False
+
+        char = self.characters[char_id]
+        old_room = self.rooms[char.current_location]
+        new_room = self.rooms[room_id]
+
+        # 检查是否可以移动到目标房间，目标房间已满时不能进入
+        if not self.town_map.is_adjacent(old_room.id, room_id):
+            return False
+        if not self.occupancy.place(char_id, room_id):
+            return False
+
+        # 更新角色状态
+        char.current_location = room_id
+        self._record('move', char_id=char_id, room_id=room_id)
+        self.events.publish('move', char_id=char_id, from_room=old_room.id, room_id=room_id)
+
+        # 记录移动事件，新房间里已有的角色作为相关角色
+        self.add_memory(char_id, {
+            'type': 'movement',
+            'content': f"从{old_room.name}移动到{new_room.name}",
+            'importance': 3,
+            'related_chars': self.occupancy.colocated(char_id)
+        })
+
+        return True
+
+    def _choose_move(self, char: Character) -> Optional[str]:
+        """选择角色本回合要走进的房间，不移动时返回None
+
+        有30%的概率移动：日常活动配置了地点时沿最短路径向其走一步，已到达则留下；
+        没有配置地点或地点不可达时随机走到一个相邻房间。
+        """
+        if random.random() >= 0.3:
+            return None
+        destination = char.get_routine_location()
+        if destination == char.current_location:
+            return None
+        next_room = self.town_map.next_hop(char.current_location, destination) if destination else None
+        if next_room is not None:
+            return next_room
+        neighbors = self.town_map.neighbors(char.current_location)
+        return random.choice(neighbors) if neighbors else None
+
+    def nearby_characters(self, char_id: str, hops: int = 1) -> List[str]:
+        """角色所在房间hops步以内的其他角色（不含同一房间）"""
+        location = self.characters[char_id].current_location
+        return [
+            other_id
+            for room_id in sorted(self.town_map.neighborhood(location, hops)) if room_id != location
+            for other_id in self.rooms[room_id].characters
+        ]
+
+    def add_memory(self, char_id: str, memory: Dict) -> None:
+        """为角色添加记忆"""
+        if char_id in self.memory_streams:
+            stream = self.memory_streams[char_id]
+            stored = stream.add_memory(memory)
+            # SQLite存储的记忆写入时已经持久化，无需再记入事件日志
+            if isinstance(stream, MemoryStream):
+                # 压缩事件按ID引用原始记忆，记录前先分配ID
+                if stored.id is None:
+                    stored.id = uuid.uuid4().hex
+                self._record('memory', char_id=char_id, memory=stored.to_dict())
+            self._schedule_compaction(char_id)
+
+    def _record_compaction(self, char_id: str, summaries: List[Memory]) -> None:
+        """记录写回的压缩结果，重放时用摘要替换其sources列出的原始记忆"""
+        if isinstance(self.memory_streams.get(char_id), MemoryStream):
+            self._record('compaction', char_id=char_id,
+                         summaries=[summary.to_dict() for summary in summaries])
+
+    def _schedule_compaction(self, char_id: str) -> None:
+        """写回已完成的记忆压缩，并在记忆流达到水位线时在后台发起新的压缩"""
+        if self.memory_compactor is None:
+            return
+        self.memory_compactor.apply_finished()
+        char = self.characters.get(char_id)
+        char_desc = f"{char.name}（{char.personality}）" if char else None
+        self.memory_compactor.maybe_schedule(char_id, self.memory_streams[char_id], char_desc)
+
+    def generate_character_action(self, char_id: str) -> str:
+        """生成角色行动"""
+        char = self.characters[char_id]
+        room = self.rooms[char.current_location]
+        
+        # 获取角色描述和当前情境
+        char_desc = f"{char.name}是一个{char.age}岁的{char.occupation}，{char.personality}"
+        situation = f"现在在{room.name}，{room.get_current_description()}"
+        
+        # 获取可用行动
+        available_actions = room.get_available_interactions()
+        
+        return self.api_client.generate_action(
+            char_desc,
+            situation,
+            available_actions
+        )
+
+    def generate_dialogue(self, speaker_id: str, listener_id: str) -> str:
+        """生成对话内容，考虑角色关系和历史互动"""
+        prompt = self._build_dialogue_prompt(speaker_id, listener_id)
+        dialogue = self.api_client.generate_response(
+            prompt, max_tokens=completion_tokens('dialogue')
+        )
+        self._apply_dialogue_relationship(speaker_id, listener_id)
+        return dialogue
+
+    def generate_dialogue_stream(self, speaker_id: str, listener_id: str) -> Iterator[str]:
+        """以流式方式生成对话内容，对话结束后更新关系值"""
+        prompt = self._build_dialogue_prompt(speaker_id, listener_id)
+        yield from self.api_client.stream_response(
+            prompt, max_tokens=completion_tokens('dialogue')
+        )
+        self._apply_dialogue_relationship(speaker_id, listener_id)
+
+    def _build_dialogue_prompt(self, speaker_id: str, listener_id: str) -> str:
+        """构建对话提示"""
+        speaker = self.characters[speaker_id]
+        listener = self.characters[listener_id]
+    
+        # 在涉及对方的记忆中检索与当前场景最相关的两条
+        room = self.rooms[speaker.current_location]
+        speaker_related_memories = self.memory_streams[speaker_id].retrieve(
+            f"{listener.name} {room.name}", k=2, related_char=listener_id
+        )
+    
+        # 构建对话提示
+        builder = PromptBuilder('dialogue')
+        builder.add(
+            f"作为{speaker.name}（{speaker.personality}），"
+            f"你现在遇到了{listener.name}（{listener.personality}）。\n",
+            priority=20
+        )
+    
+        # 添加关系信息
+        relationship = speaker.relationships.get(listener_id, 50)
+        if relationship >= 80:
+            builder.add(f"你们关系非常好。", priority=15)
+        elif relationship >= 60:
+            builder.add(f"你们是朋友。", priority=15)
+        elif relationship <= 20:
+            builder.add(f"你们关系不太好。", priority=15)
+        else:
+            builder.add(f"你们是普通关系。", priority=15)
+    
+        # 添加最近互动记忆
+        builder.add_items(
+            f"\n你最近与{listener.name}的互动：\n",
+            [mem['content'] for mem in speaker_related_memories]
+        )
+    
+        # 添加当前环境信息
+        builder.add(f"\n你们现在在{room.name}，你想对{listener.name}说什么？", priority=20)
+        return builder.build()
+
+    def _apply_dialogue_relationship(self, speaker_id: str, listener_id: str) -> None:
+        """对话后更新双方关系值"""
+        relationship_change = random.randint(*RELATIONSHIP_DELTA_RANGE)  # 倾向于略微提升关系
+        self.update_relationship(speaker_id, listener_id, relationship_change)
+        self.update_relationship(listener_id, speaker_id, relationship_change)
+
+    def update_relationship(self, char_id: str, other_id: str, value_change: int) -> None:
+        """更新角色对另一角色的关系值并记录到事件日志"""
+        char = self.characters[char_id]
+        char.update_relationship(other_id, value_change)
+        self._record('relationship', char_id=char_id, other_id=other_id,
+                     value=char.relationships[other_id])
+
+    def update_game_state(self) -> None:
+        """更新游戏状态"""
+        night = self.clock.is_night()
+
+        # 更新所有角色状态，心情由调度器按EMOTION_UPDATE_INTERVAL单独评估
+        changed: Dict[str, int] = {}
+        for char in self.characters.values():
+            # 更新精力值
+            energy = char.energy
+            if night:
+                char.rest(10)  # 夜间休息恢复精力
+            else:
+                char.consume_energy(1)  # 日间活动消耗精力
+            if char.energy != energy:
+                changed[char.id] = char.energy
+        # 本tick精力有变化的角色合并为一条事件，精力已满或耗尽的角色不再每个tick写日志
+        if changed:
+            self._record('energy', energies=changed)
+
+        # 更新房间状态
+        for room in self.rooms.values():
+            # 根据时间更新房间状态
+            lighting = 'bright' if 6 <= self.clock.hour() < 18 else 'dim'
+            if room.state.get('lighting') != lighting:
+                room.update_state({'lighting': lighting})
+                self._record('room_state', room_id=room.id, state={'lighting': lighting})
+
+        self.checkpoint()
+
+    def generate_action_based_on_memory(self, char_id: str) -> str:
+        """根据角色的记忆生成行为决策"""
+        return self.api_client.generate_response(
+            self._build_action_prompt(char_id),
+            max_tokens=completion_tokens('action')
+        )
+
+    async def generate_action_based_on_memory_async(self, char_id: str) -> str:
+        """generate_action_based_on_memory的异步版本"""
+        return await self.async_api_client.generate_response(
+            self._build_action_prompt(char_id),
+            max_tokens=completion_tokens('action')
+        )
+
+    def _build_action_prompt(self, char_id: str) -> str:
+        """构建基于记忆的行为提示"""
+        character = self.characters[char_id]
+        room = self.rooms[character.current_location]
+        relevant_memories = self.memory_streams[char_id].retrieve(
+            self._situation_query(char_id), k=5
+        )
+    
+        # 构建提示，包含角色信息和相关记忆
+        builder = PromptBuilder('action')
+        builder.add(f"作为{character.name}（{character.personality}），", priority=20)
+        builder.add_items(
+            "根据最近的经历：\n",
+            [mem['content'] for mem in relevant_memories],
+            prefix=""
+        )
+        builder.add(
+            f"现在你在{room.name}，考虑到你的性格和经历，你会做什么？",
+            priority=20
+        )
+        return builder.build()
+
+    def _situation_query(self, char_id: str, others: Optional[List[str]] = None) -> str:
+        """用角色当前所处的情境构造记忆检索的查询文本"""
+        character = self.characters[char_id]
+        parts = [self.rooms[character.current_location].name, character.get_current_routine()]
+        parts.extend(self.characters[other_id].name for other_id in others or [])
+        return " ".join(parts)
+
+    def update_mood_based_on_events(self, char_id: str) -> None:
+        """根据最近事件更新角色心情"""
+        prompt = self._build_mood_prompt(char_id)
+        if prompt is None:
+            return
+        mood_analysis = self.api_client.generate_response(
+            prompt, max_tokens=completion_tokens('mood')
+        )
+        self.characters[char_id].mood = mood_analysis[:10]  # 取前10个字符作为心情描述
+        self._record_character_state(self.characters[char_id])
+        self.events.publish('mood', char_id=char_id, mood=self.characters[char_id].mood)
+
+    async def update_mood_based_on_events_async(self, char_id: str) -> None:
+        """update_mood_based_on_events的异步版本"""
+        prompt = self._build_mood_prompt(char_id)
+        if prompt is None:
+            return
+        mood_analysis = await self.async_api_client.generate_response(
+            prompt, max_tokens=completion_tokens('mood')
+        )
+        self.characters[char_id].mood = mood_analysis[:10]
+        self._record_character_state(self.characters[char_id])
+        self.events.publish('mood', char_id=char_id, mood=self.characters[char_id].mood)
+
+    def _build_mood_prompt(self, char_id: str) -> Optional[str]:
+        """构建心情分析提示，没有近期记忆时返回None"""
+        character = self.characters[char_id]
+        memory_stream = self.memory_streams[char_id]
+        recent_memories = memory_stream.get_recent_memories(hours=6)
+    
+        if not recent_memories:
+            return None
+    
+        # 分析最近事件对心情的影响
+        builder = PromptBuilder('mood')
+        builder.add_items(
+            f"分析{character.name}最近的经历：\n",
+            [mem['content'] for mem in recent_memories[-3:]]
+        )
+        builder.add(
+            f"考虑到{character.personality}的性格，这些经历会让他/她感觉如何？"
+            "请用不超过10个字描述心情。",
+            priority=20
+        )
+        return builder.build()
+
+    async def _observe_character(self, char_id: str) -> None:
+        """单个角色在一轮观察中的行为
+
+        行为、对话和心情由一次结构化JSON调用同时生成。
+        """
+        char = self.characters[char_id]
+        others = self.occupancy.colocated(char_id)
+        can_talk = self.scheduler.can_interact(char_id, self.now)
+
+        with self._phase('prompt_build'):
+            prompt = self._build_turn_prompt(char_id, others, can_talk)
+        try:
+            with self._phase('llm_wait'):
+                decision = await self.async_api_client.generate_turn(
+                    prompt, max_tokens=completion_tokens('turn')
+                )
+                if decision is None:
+                    # JSON格式始终不正确时退化为只生成行为
+                    decision = TurnDecision(
+                        action=await self.generate_action_based_on_memory_async(char_id)
+                    )
+        except APIError as e:
+            # API失败时跳过本回合，不把错误信息写入记忆
+            self.events.publish('turn_failed', char_id=char_id, error=str(e))
+            return
+
+        # 记录并发布行为
+        with self._phase('memory_insert'):
+            self.events.publish('action', char_id=char_id, action=decision.action)
+            self.add_memory(char_id, {
+                'type': 'action',
+                'content': decision.action,
+                'importance': 3
+            })
+
+            # 与同一房间的其他角色互动；其他角色在等待LLM期间可能已经离开，按当前位置重新判断
+            if (can_talk and decision.utterance and decision.target in others
+                    and self.occupancy.together(char_id, decision.target)):
+                target_id = decision.target
+                # 说话者进入互动冷却，被搭话的角色提前到下一个tick行动
+                self.scheduler.mark_interaction(char_id, self.now)
+                self.scheduler.wake(target_id, self.now)
+                self.events.publish(
+                    'dialogue', char_id=char_id, target_id=target_id, utterance=decision.utterance
+                )
+                self.add_memory(char_id, {
+                    'type': 'dialogue',
+                    'content': f"与{self.characters[target_id].name}交谈: {decision.utterance}",
+                    'importance': 5,
+                    'related_chars': [target_id]
+                })
+                self.update_relationship(char_id, target_id, decision.relationship_delta)
+                self.update_relationship(target_id, char_id, decision.relationship_delta)
+
+        # 决定是否向日常活动的地点移动
+        with self._phase('room_update'):
+            next_room = self._choose_move(char)
+            if next_room is not None:
+                self.move_character(char_id, next_room)
+
+        # 更新角色心情
+        with self._phase('state_update'):
+            if decision.mood:
+                char.mood = decision.mood[:10]
+                self._record_character_state(char)
+                self.events.publish('mood', char_id=char_id, mood=char.mood)
+            self._mood_seen[char_id] = self.memory_streams[char_id].insert_count
+
+    def _build_turn_prompt(self, char_id: str, others: List[str], can_talk: bool = True) -> str:
+        """构建回合决策提示，要求模型以JSON格式同时给出行为、对话和心情"""
+        character = self.characters[char_id]
+        relevant_memories = self.memory_streams[char_id].retrieve(
+            self._situation_query(char_id, others), k=5
+        )
+
+        builder = PromptBuilder('turn')
+        builder.add(f"作为{character.name}（{character.personality}），", priority=30)
+        builder.add_items(
+            "根据最近的经历：\n",
+            [mem['content'] for mem in relevant_memories],
+            prefix=""
+        )
+        builder.add(
+            f"现在你在{self.rooms[character.current_location].name}，心情{character.mood}。\n",
+            priority=25
+        )
+
+        if others:
+            others_lines = []
+            for other_id in others:
+                other = self.characters[other_id]
+                relationship = character.relationships.get(other_id, 50)
+                others_lines.append(
+                    f"{other.name}（id: {other_id}，{other.personality}，关系值{relationship}）"
+                )
+            builder.add_items("房间里的其他人：\n", others_lines, priority=15)
+        else:
+            builder.add("房间里没有其他人。\n", priority=15)
+        if others and not can_talk:
+            builder.add("你刚和别人说过话，这次不要说话。\n", priority=15)
+
+        low, high = RELATIONSHIP_DELTA_RANGE
+        builder.add(
+            "考虑到你的性格和经历，决定你接下来做什么。请只输出一个JSON对象，包含以下字段：\n"
+            '- "action": 你要做的事情（一两句话）\n'
+            '- "utterance": 你想对房间里某人说的话，不想说话时为null\n'
+            '- "target": 说话对象的id，不说话时为null\n'
+            '- "mood": 此刻的心情（不超过10个字）\n'
+            f'- "relationship_delta": 这次互动后与对方关系值的变化（{low}到{high}的整数，不说话时为0）',
+            priority=30
+        )
+        return builder.build()
@@ -1,57 +1,110 @@
-import json
-import time
+import asyncio
 import random
-import msvcrt
-from typing import Dict, List, Optional
+from collections import deque
 from datetime import datetime
-import os
-import sys
+from typing import Deque, Dict, Optional
 
-from models.character import Character
+from engine import SimulationEngine
 from models.room import Room
-from models.memory_stream import MemoryStream
-from utils.api_client import DeepSeekClient
+from utils.api_client import DeepSeekClient, APIError
 from utils.renderer import Renderer
-
-class VirtualTown:
-    def __init__(self):
+from utils.keyboard import KeyReader
+from utils.sim_clock import SimClock
+from utils.prompt_builder import PromptBuilder, completion_tokens
+from config.settings import (
+    OBSERVATION_ROUND_DELAY, STREAM_DIALOGUE, ACTION_UPDATE_INTERVAL, SIMULATION_TICK,
+    OBSERVATION_LOG_LINES, CLOCK_MODE, CLOCK_SPEED
+)
+
+class VirtualTown(SimulationEngine):
+    """交互式终端界面：在模拟引擎之上提供菜单，并把引擎发布的事件渲染到终端"""
+
+    def __init__(self, api_client: Optional[DeepSeekClient] = None, clock: Optional[SimClock] = None):
+        super().__init__(api_client, clock or SimClock(CLOCK_MODE, CLOCK_SPEED))
         self.renderer = Renderer()
-        self.api_client = DeepSeekClient()
-        self.characters: Dict[str, Character] = {}
-        self.rooms: Dict[str, Room] = {}
-        self.memory_streams: Dict[str, MemoryStream] = {}
-        self.current_character: Optional[Character] = None
         self.current_room: Optional[Room] = None
+        # 观察模式实时面板的最近事件，None表示不在实时面板中
+        self._event_log: Optional[Deque[str]] = None
+        self._last_actions: Dict[str, str] = {}
+        self.events.subscribe('restored', self._on_restored)
+        self.events.subscribe('action', self._on_action)
+        self.events.subscribe('dialogue', self._on_dialogue)
+        self.events.subscribe('move', self._on_move)
+        self.events.subscribe('turn_failed', self._on_turn_failed)
+        self.events.subscribe('tick', self._on_tick)
+
+    # 以下把引擎发布的事件渲染到终端；实时面板打开时只记入事件列表，在tick结束时统一重绘
+    def _log_event(self, message: str) -> bool:
+        """实时面板打开时记录事件并返回True，否则返回False"""
+        if self._event_log is None:
+            return False
+        self._event_log.append(message)
+        return True
+
+    def _on_restored(self, event: Dict) -> None:
+        self.renderer.render_system_message(f"已从存档恢复小镇状态（重放{event['replayed']}个事件）")
+
+    def _on_action(self, event: Dict) -> None:
+        self._last_actions[event['char_id']] = event['action']
+        message = f"{self.characters[event['char_id']].name}的行为：{event['action']}"
+        if not self._log_event(message):
+            self.renderer.render_system_message(message)
+
+    def _on_dialogue(self, event: Dict) -> None:
+        name = self.characters[event['char_id']].name
+        if not self._log_event(f"{name}：{event['utterance']}"):
+            self.renderer.render_dialogue(name, event['utterance'])
+
+    def _on_move(self, event: Dict) -> None:
+        message = f"{self.characters[event['char_id']].name}移动到了{self.rooms[event['room_id']].name}"
+        if not self._log_event(message):
+            self.renderer.render_system_message(message)
+
+    def _on_turn_failed(self, event: Dict) -> None:
+        message = f"{self.characters[event['char_id']].name}本回合行动失败: {event['error']}"
+        if not self._log_event(f"⚠️ {message}"):
+            self.renderer.render_error(message)
+
+    def _on_tick(self, event: Dict) -> None:
+        if self._event_log is not None:
+            with self._phase('render'):
+                self._render_observation()
+
+    def _render_observation(self) -> None:
+        """重绘观察模式的实时面板，只有变化的行会被重写"""
+        characters = []
+        for char_id, char in self.characters.items():
+            room = self.rooms.get(char.current_location)
+            characters.append({
+                'name': char.name,
+                'location': room.name if room else char.current_location,
+                'mood': char.mood,
+                'energy': char.energy,
+                'activity': self._last_actions.get(char_id, '')
+            })
+        title = f"观察模式 | 第{self.tick}个tick | {datetime.fromtimestamp(self.now):%H:%M:%S}"
+        self.renderer.render_observation(title, characters, list(self._event_log))
 
-    def load_config(self) -> None:
-        """加载配置文件"""
-        # 加载角色配置
-        with open('config/characters.json', 'r', encoding='utf-8') as f:
-            char_data = json.load(f)
-            for char_info in char_data['characters']:
-                char = Character.from_config(char_info)
-                self.characters[char.id] = char
-                self.memory_streams[char.id] = MemoryStream()
-
-        # 加载房间配置
-        with open('config/room_layout.json', 'r', encoding='utf-8') as f:
-            room_data = json.load(f)
-            for room_info in room_data['rooms']:
-                room = Room.from_config(room_info)
-                self.rooms[room.id] = room
+    def open_observation_panel(self) -> None:
+        """打开观察模式的实时面板，之后每个tick结束时重绘"""
+        self._event_log = deque(maxlen=OBSERVATION_LOG_LINES)
+        self.renderer.begin_live()
+        self._render_observation()
+
+    def close_observation_panel(self) -> None:
+        """关闭实时面板，事件恢复为逐条输出"""
+        if self._event_log is not None:
+            self._event_log = None
+            self.renderer.end_live()
 
     def initialize_game(self) -> None:
         """初始化游戏状态"""
-        self.load_config()
-        
-        # 将角色放置到初始位置
-        for char_id, char in self.characters.items():
-            room = self.rooms[char.current_location]
-            room.add_character(char_id)
+        current_id = self.initialize()
 
         # 设置初始角色和房间
-        first_char = list(self.characters.values())[0]
-        self.switch_character(first_char.id)
+        if current_id not in self.characters:
+            current_id = list(self.characters.keys())[0]
+        self.switch_character(current_id)
 
     def switch_character(self, char_id: str) -> None:
         """切换当前控制的角色"""
@@ -61,138 +114,44 @@ class VirtualTown:
             self.renderer.clear_screen()
             self.renderer.render_system_message(f"切换到角色：{self.current_character.name}")
 
-    def move_character(self, char_id: str, room_id: str) -> bool:
-        """移动角色到指定房间"""
-        if char_id not in self.characters or room_id not in self.rooms:
-            return False
-
-        char = self.characters[char_id]
-        old_room = self.rooms[char.current_location]
-        new_room = self.rooms[room_id]
-
-        # 检查是否可以移动到目标房间
-        if room_id not in old_room.connected_to:
-            return False
-
-        # 更新房间和角色状态
-        old_room.remove_character(char_id)
-        new_room.add_character(char_id)
-        char.current_location = room_id
-
-        # 记录移动事件
-        self.add_memory(char_id, {
-            'type': 'movement',
-            'content': f"从{old_room.name}移动到{new_room.name}",
-            'importance': 3,
-            'timestamp': datetime.now().isoformat()
-        })
-
-        return True
-
-    def add_memory(self, char_id: str, memory: Dict) -> None:
-        """为角色添加记忆"""
-        if char_id in self.memory_streams:
-            self.memory_streams[char_id].add_memory(memory)
-
-    def generate_character_action(self, char_id: str) -> str:
-        """生成角色行动"""
-        char = self.characters[char_id]
-        room = self.rooms[char.current_location]
-        
-        # 获取角色描述和当前情境
-        char_desc = f"{char.name}是一个{char.age}岁的{char.occupation}，{char.personality}"
-        situation = f"现在在{room.name}，{room.get_current_description()}"
-        
-        # 获取可用行动
-        available_actions = room.get_available_interactions()
-        
-        return self.api_client.generate_action(
-            char_desc,
-            situation,
-            available_actions
-        )
-
-    def generate_dialogue(self, speaker_id: str, listener_id: str) -> str:
-        """生成对话内容，考虑角色关系和历史互动"""
+    def speak(self, speaker_id: str, listener_id: str) -> str:
+        """生成并显示对话，返回完整的对话内容"""
         speaker = self.characters[speaker_id]
-        listener = self.characters[listener_id]
-    
-        # 获取双方的最近记忆
-        speaker_memories = self.memory_streams[speaker_id].get_recent_memories(hours=24)
-        listener_memories = self.memory_streams[listener_id].get_recent_memories(hours=24)
-    
-        # 找出涉及对方的记忆
-        speaker_related_memories = [mem for mem in speaker_memories 
-                                if listener.name in mem['content']]
-        listener_related_memories = [mem for mem in listener_memories 
-                                if speaker.name in mem['content']]
-    
-        # 构建对话提示
-        prompt = f"作为{speaker.name}（{speaker.personality}），"
-        prompt += f"你现在遇到了{listener.name}（{listener.personality}）。\n"
-    
-        # 添加关系信息
-        relationship = speaker.relationships.get(listener_id, 50)
-        if relationship >= 80:
-            prompt += f"你们关系非常好。"
-        elif relationship >= 60:
-            prompt += f"你们是朋友。"
-        elif relationship <= 20:
-            prompt += f"你们关系不太好。"
-        else:
-            prompt += f"你们是普通关系。"
-    
-        # 添加最近互动记忆
-        if speaker_related_memories:
-            prompt += f"\n你最近与{listener.name}的互动：\n"
-            for mem in speaker_related_memories[-2:]:
-                prompt += f"- {mem['content']}\n"
-    
-        # 添加当前环境信息
-        room = self.rooms[speaker.current_location]
-        prompt += f"\n你们现在在{room.name}，"
-        prompt += f"你想对{listener.name}说什么？"
-    
-        # 生成对话
-        dialogue = self.api_client.generate_response(prompt)
-    
-        # 更新关系值
-        relationship_change = random.randint(-5, 10)  # 倾向于略微提升关系
-        speaker.update_relationship(listener_id, relationship_change)
-        listener.update_relationship(speaker_id, relationship_change)
-    
+        if STREAM_DIALOGUE:
+            return self.renderer.render_dialogue_stream(
+                speaker.name,
+                self.generate_dialogue_stream(speaker_id, listener_id)
+            )
+        dialogue = self.generate_dialogue(speaker_id, listener_id)
+        self.renderer.render_dialogue(speaker.name, dialogue)
         return dialogue
 
-    def update_game_state(self) -> None:
-        """更新游戏状态"""
-        current_time = datetime.now()
-
-        # 更新所有角色状态
-        for char in self.characters.values():
-            # 更新心情
-            recent_memories = self.memory_streams[char.id].get_recent_memories(hours=1)
-            char.update_mood(recent_memories)
-
-            # 更新精力值
-            if current_time.hour >= 22 or current_time.hour < 6:
-                char.rest(10)  # 夜间休息恢复精力
-            else:
-                char.consume_energy(1)  # 日间活动消耗精力
-
-        # 更新房间状态
-        for room in self.rooms.values():
-            # 根据时间更新房间状态
-            if 6 <= current_time.hour < 18:
-                room.update_state({'lighting': 'bright'})
-            else:
-                room.update_state({'lighting': 'dim'})
-
     def run_game_loop(self) -> None:
         """运行游戏主循环"""
         # 初始化游戏
         self.initialize_game()
-        
+        try:
+            self._menu_loop()
+        finally:
+            # 正常退出或在input()处按Ctrl+C时都写入剩余事件并释放资源
+            self.shutdown()
+
+    def _flush_journal(self) -> None:
+        """菜单模式下两次操作之间可能停留很久，操作后立即把事件写入日志"""
+        if self.journal is not None:
+            self.journal.flush()
+
+    def _pause(self) -> None:
+        """写入事件日志后等待用户按回车"""
+        self._flush_journal()
+        input("按回车键继续...")
+
+    def _menu_loop(self) -> None:
+        """显示主菜单并执行用户选择的操作，直到选择退出"""
         while True:
+            # 菜单模式不推进tick，每次操作前让时段、昼夜等跟上当前时间
+            self.clock.sync()
+
             # 显示主菜单
             options = [
                 "选择角色",
@@ -218,30 +177,38 @@ class VirtualTown:
                 self.show_memories()
             elif choice == '4':
                 if self.current_character:
-                    action = self.generate_action_based_on_memory(self.current_character.id)
-                    self.renderer.render_system_message(f"{self.current_character.name}的行为：{action}")
-                    self.add_memory(self.current_character.id, {
-                        'type': 'action',
-                        'content': action,
-                        'importance': 3
-                    })
-                    input("按回车键继续...")
+                    try:
+                        action = self.generate_action_based_on_memory(self.current_character.id)
+                    except APIError as e:
+                        self.renderer.render_error(f"生成行为失败: {e}")
+                    else:
+                        self.renderer.render_system_message(f"{self.current_character.name}的行为：{action}")
+                        self.add_memory(self.current_character.id, {
+                            'type': 'action',
+                            'content': action,
+                            'importance': 3
+                        })
+                    self._pause()
             elif choice == '5':
                 if self.current_character and self.current_room:
-                    others = [char_id for char_id in self.current_room.characters if char_id != self.current_character.id]
+                    others = self.occupancy.colocated(self.current_character.id)
                     if others:
                         target_id = random.choice(others)
-                        dialogue = self.generate_dialogue(self.current_character.id, target_id)
-                        self.renderer.render_dialogue(self.current_character.name, dialogue)
-                        self.add_memory(self.current_character.id, {
-                            'type': 'dialogue',
-                            'content': f"与{self.characters[target_id].name}交谈: {dialogue}",
-                            'importance': 5
-                        })
-                        input("按回车键继续...")
+                        try:
+                            dialogue = self.speak(self.current_character.id, target_id)
+                        except APIError as e:
+                            self.renderer.render_error(f"生成对话失败: {e}")
+                        else:
+                            self.add_memory(self.current_character.id, {
+                                'type': 'dialogue',
+                                'content': f"与{self.characters[target_id].name}交谈: {dialogue}",
+                                'importance': 5,
+                                'related_chars': [target_id]
+                            })
+                        self._pause()
                     else:
                         self.renderer.render_system_message("当前房间没有其他角色可以对话")
-                        input("按回车键继续...")
+                        self._pause()
             elif choice == '6':
                 self.renderer.render_system_message("进入观察模式 (按q键退出)")
                 self.run_observation_mode()
@@ -255,19 +222,21 @@ class VirtualTown:
                         'importance': importance
                     })
                     self.renderer.render_system_message("记忆已添加")
-                    input("按回车键继续...")
+                    self._pause()
             elif choice == '8':
                 self.renderer.render_system_message("退出游戏")
                 break
             else:
                 self.renderer.render_system_message("无效的选择")
-                input("按回车键继续...")
+                self._pause()
+
+            self._flush_journal()
             
             # 更新状态栏
             if self.current_character and self.current_room:
                 status = {
                     'location': self.current_room.name,
-                    'character_count': len(self.current_room.characters),
+                    'character_count': self.occupancy.count(self.current_room.id),
                     'system_status': '正常运行'
                 }
                 self.renderer.render_status_bar(status)
@@ -279,14 +248,38 @@ class VirtualTown:
 
         description = self.current_room.get_current_description()
         self.renderer.render_system_message(description)
+        if self.current_character:
+            nearby = self.nearby_characters(self.current_character.id)
+            if nearby:
+                self.renderer.render_system_message("隔壁房间有：" + "、".join(
+                    f"{self.characters[char_id].name}（{self.rooms[self.characters[char_id].current_location].name}）"
+                    for char_id in nearby
+                ))
 
         # 生成并显示当前角色的观察
         if self.current_character:
-            observation = self.api_client.generate_response(
-                f"作为{self.current_character.name}，描述你对{self.current_room.name}的观察感受。",
-                character_desc=f"{self.current_character.personality}"
-            )
-            self.renderer.render_dialogue(self.current_character.name, observation)
+            prompt = PromptBuilder('observation').add(
+                f"作为{self.current_character.name}，描述你对{self.current_room.name}的观察感受。"
+            ).build()
+            character_desc = f"{self.current_character.personality}"
+            max_tokens = completion_tokens('observation')
+            try:
+                if STREAM_DIALOGUE:
+                    self.renderer.render_dialogue_stream(
+                        self.current_character.name,
+                        self.api_client.stream_response(
+                            prompt, max_tokens=max_tokens, character_desc=character_desc
+                        )
+                    )
+                else:
+                    observation = self.api_client.generate_response(
+                        prompt,
+                        max_tokens=max_tokens,
+                        character_desc=character_desc
+                    )
+                    self.renderer.render_dialogue(self.current_character.name, observation)
+            except APIError as e:
+                self.renderer.render_error(f"生成观察失败: {e}")
 
     def talk_to_others(self) -> None:
         """与其他角色交谈"""
@@ -294,10 +287,7 @@ class VirtualTown:
             return
 
         # 获取同一房间的其他角色
-        others = [
-            char_id for char_id in self.current_room.characters
-            if char_id != self.current_character.id
-        ]
+        others = self.occupancy.colocated(self.current_character.id)
 
         if not others:
             self.renderer.render_system_message("房间里没有其他角色")
@@ -314,17 +304,18 @@ class VirtualTown:
             idx = int(choice) - 1
             if 0 <= idx < len(others):
                 listener_id = others[idx]
-                dialogue = self.generate_dialogue(
-                    self.current_character.id,
-                    listener_id
-                )
-                self.renderer.render_dialogue(self.current_character.name, dialogue)
+                try:
+                    dialogue = self.speak(self.current_character.id, listener_id)
+                except APIError as e:
+                    self.renderer.render_error(f"生成对话失败: {e}")
+                    return
 
                 # 记录对话
                 self.add_memory(self.current_character.id, {
                     'type': 'dialogue',
                     'content': f"与{self.characters[listener_id].name}交谈: {dialogue}",
-                    'importance': 5
+                    'importance': 5,
+                    'related_chars': [listener_id]
                 })
         except ValueError:
             self.renderer.render_error("无效的选择")
@@ -349,10 +340,7 @@ class VirtualTown:
         if not self.current_character or not self.current_room:
             return
 
-        connected_rooms = [
-            room_id for room_id in self.current_room.connected_to
-            if room_id in self.rooms
-        ]
+        connected_rooms = list(self.town_map.neighbors(self.current_room.id))
 
         if not connected_rooms:
             self.renderer.render_system_message("没有可以移动到的房间")
@@ -368,11 +356,9 @@ class VirtualTown:
             idx = int(choice) - 1
             if 0 <= idx < len(connected_rooms):
                 target_room = connected_rooms[idx]
+                # 移动成功的提示由move事件的订阅者显示
                 if self.move_character(self.current_character.id, target_room):
                     self.current_room = self.rooms[target_room]
-                    self.renderer.render_system_message(
-                        f"移动到了{self.current_room.name}"
-                    )
                 else:
                     self.renderer.render_error("无法移动到该房间")
         except ValueError:
@@ -394,90 +380,44 @@ class VirtualTown:
         for memory in recent_memories:
             self.renderer.render_memory(memory)
 
-    def generate_action_based_on_memory(self, char_id: str) -> str:
-        """根据角色的记忆生成行为决策"""
-        character = self.characters[char_id]
-        memory_stream = self.memory_streams[char_id]
-        recent_memories = memory_stream.get_recent_memories(hours=24)
-    
-        # 构建提示，包含角色信息和最近记忆
-        memory_summary = "\n".join([mem['content'] for mem in recent_memories[-5:]])
-        prompt = f"作为{character.name}（{character.personality}），"f"根据最近的经历：\n{memory_summary}\n"
-        prompt += f"现在你在{self.rooms[character.current_location].name}，考虑到你的性格和经历，你会做什么？"
-    
-        return self.api_client.generate_response(prompt)
-    
-    def update_mood_based_on_events(self, char_id: str) -> None:
-        """根据最近事件更新角色心情"""
-        character = self.characters[char_id]
-        memory_stream = self.memory_streams[char_id]
-        recent_memories = memory_stream.get_recent_memories(hours=6)
-    
-        if not recent_memories:
-            return
-    
-        # 分析最近事件对心情的影响
-        prompt = f"分析{character.name}最近的经历：\n"
-        for mem in recent_memories[-3:]:
-            prompt += f"- {mem['content']}\n"
-        prompt += f"考虑到{character.personality}的性格，这些经历会让他/她感觉如何？"
-    
-        mood_analysis = self.api_client.generate_response(prompt)
-        character.mood = mood_analysis[:10]  # 取前10个字符作为心情描述
-    
     def run_observation_mode(self) -> None:
-        """运行观察模式，让所有角色都能互动，并添加按q键退出功能"""
+        """运行观察模式：角色在后台持续行动，按q键随时退出"""
         if not self.current_character or not self.current_room:
             return
-    
-        # 让每个角色都有机会行动
-        for char_id in list(self.characters.keys()):
-            char = self.characters[char_id]
-            current_room = self.rooms[char.current_location]
-            
-            # 生成并显示角色行为
-            action = self.generate_action_based_on_memory(char_id)
-            self.renderer.render_system_message(f"{char.name}的行为：{action}")
-            
-            # 记录行为
-            self.add_memory(char_id, {
-                'type': 'action',
-                'content': action,
-                'importance': 3
-            })
-            
-            # 与同一房间的其他角色互动
-            others = [other_id for other_id in current_room.characters if other_id != char_id]
-            if others and random.random() < 0.7:  # 70%的概率进行互动
-                target_id = random.choice(others)
-                dialogue = self.generate_dialogue(char_id, target_id)
-                self.renderer.render_dialogue(char.name, dialogue)
-                
-                # 记录对话
-                self.add_memory(char_id, {
-                    'type': 'dialogue',
-                    'content': f"与{self.characters[target_id].name}交谈: {dialogue}",
-                    'importance': 5
-                })
-            
-            # 随机决定是否移动到其他房间
-            connected_rooms = [room_id for room_id in current_room.connected_to if room_id in self.rooms]
-            if connected_rooms and random.random() < 0.3:  # 30%的概率移动
-                target_room = random.choice(connected_rooms)
-                if self.move_character(char_id, target_room):
-                    self.renderer.render_system_message(f"{char.name}移动到了{self.rooms[target_room].name}")
-            
-            # 更新角色心情
-            self.update_mood_based_on_events(char_id)
-            
-            time.sleep(2)  # 暂停2秒，让用户能够观察到行为
-            
-            # 检查是否要退出观察模式
-            if msvcrt.kbhit():  # 检查是否有按键输入
-                key = msvcrt.getch()
-                if key == b'q':  # 按q键退出观察模式
-                    self.renderer.render_system_message("退出观察模式")
-                    return
+        asyncio.run(self._observe_until_quit())
+        self.renderer.render_system_message("退出观察模式")
+
+    async def _observe_until_quit(self) -> None:
+        """同时运行模拟和按键监听，按下q键时立即取消正在进行的tick和LLM调用"""
+        with KeyReader() as keys:
+            if not keys.interactive:
+                # 没有终端（如输入被重定向）时无法读取按键，只推进一个行为间隔的模拟时间
+                end = self.clock.now() + ACTION_UPDATE_INTERVAL
+                while self.now < end:
+                    await self.step_async()
+                    await asyncio.sleep(self.clock.wall_seconds(SIMULATION_TICK))
+                return
+
+            if self.renderer.live_supported:
+                self.open_observation_panel()
+            simulation = asyncio.ensure_future(self._observation_loop())
+            quit_key = asyncio.ensure_future(keys.wait_for('q'))
+            try:
+                await asyncio.wait({simulation, quit_key}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                simulation.cancel()
+                quit_key.cancel()
+                await asyncio.gather(simulation, quit_key, return_exceptions=True)
+                self.close_observation_panel()
+            # 模拟本身出错时把异常抛给调用方
+            if not simulation.cancelled() and simulation.exception() is not None:
+                raise simulation.exception()
+
+    async def _observation_loop(self) -> None:
+        """不断推进tick，每个tick之后暂停片刻，让用户能够看清角色的行为"""
+        while True:
+            await self.step_async()
+            await asyncio.sleep(OBSERVATION_ROUND_DELAY)
 
 def main():
     game = VirtualTown()
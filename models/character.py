@@ -1,8 +1,14 @@
 from typing import Dict, List, Optional
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import json
+import os
 import random
-from datetime import datetime
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from models.memory import Memory
+from models.memory_stream import MemoryStream
+from utils.sim_clock import SimClock
 
 @dataclass
 class Character:
@@ -15,18 +21,35 @@ class Character:
     interests: List[str]
     current_location: str
     daily_routine: Dict[str, str]
-    memory_stream: List[Dict]  # 记忆流，存储角色的经历和互动
+    memory_stream: MemoryStream  # 记忆流，与VirtualTown.memory_streams共享同一个对象
     mood: str = "平静"  # 当前心情
     energy: int = 100  # 精力值
     relationships: Dict[str, int] = None  # 与其他角色的关系值
+    routine_locations: Dict[str, str] = None  # 各时段日常活动所在的房间ID
+    clock: SimClock = field(default=None, repr=False, compare=False)  # 模拟时钟，默认与记忆流共用
 
     def __post_init__(self):
+        if self.clock is None:
+            self.clock = self.memory_stream.clock
         if self.relationships is None:
             self.relationships = {}
+        if self.routine_locations is None:
+            self.routine_locations = {}
 
     @classmethod
-    def from_config(cls, char_data: Dict) -> 'Character':
-        """从配置文件创建角色实例"""
+    def from_config(
+        cls,
+        char_data: Dict,
+        memory_stream: Optional[MemoryStream] = None,
+        clock: Optional[SimClock] = None
+    ) -> 'Character':
+        """从配置文件创建角色实例
+
+        Args:
+            char_data: 角色配置
+            memory_stream: 角色的记忆流（如SQLite记忆流），默认新建内存中的MemoryStream
+            clock: 模拟时钟，默认为真实时间
+        """
         return cls(
             id=char_data['id'],
             name=char_data['name'],
@@ -37,16 +60,14 @@ class Character:
             interests=char_data['interests'],
             current_location=char_data['initial_location'],
             daily_routine=char_data['daily_routine'],
-            memory_stream=[],
+            memory_stream=memory_stream if memory_stream is not None else MemoryStream(clock=clock),
+            routine_locations=char_data.get('routine_locations'),
+            clock=clock,
         )
 
-    def add_memory(self, event: Dict) -> None:
-        """添加新的记忆"""
-        event['timestamp'] = datetime.now().isoformat()
-        self.memory_stream.append(event)
-        # 保持记忆流在限定大小内
-        if len(self.memory_stream) > 100:  # 可以从配置文件读取这个值
-            self.memory_stream.pop(0)
+    def add_memory(self, event: Dict) -> Memory:
+        """添加新的记忆，返回保存的记录，不修改传入的字典"""
+        return self.memory_stream.add_memory(event)
 
     def update_relationship(self, other_id: str, value_change: int) -> None:
         """更新与其他角色的关系值"""
@@ -56,13 +77,11 @@ class Character:
 
     def get_current_routine(self) -> str:
         """根据当前时间获取日常活动"""
-        hour = datetime.now().hour
-        if 6 <= hour < 12:
-            return self.daily_routine['morning']
-        elif 12 <= hour < 18:
-            return self.daily_routine['afternoon']
-        else:
-            return self.daily_routine['evening']
+        return self.daily_routine[self.clock.time_of_day()]
+
+    def get_routine_location(self) -> Optional[str]:
+        """当前日常活动所在的房间ID，未配置时返回None"""
+        return self.routine_locations.get(self.clock.time_of_day())
 
     def update_mood(self, events: List[Dict]) -> None:
         """根据最近发生的事件更新心情"""
@@ -86,9 +105,9 @@ class Character:
         relationship = self.relationships.get(other_id, 50)
         return relationship > 20  # 关系值需要超过20才能互动
 
-    def get_memory_summary(self) -> List[Dict]:
+    def get_memory_summary(self) -> List[Memory]:
         """获取最近记忆的摘要"""
-        return self.memory_stream[-10:]  # 返回最近的10条记忆
+        return self.memory_stream.get_latest(10)  # 返回最近的10条记忆
 
     def to_dict(self) -> Dict:
         """将角色数据转换为字典格式"""
@@ -104,5 +123,6 @@ class Character:
             'daily_routine': self.daily_routine,
             'mood': self.mood,
             'energy': self.energy,
-            'relationships': self.relationships
+            'relationships': self.relationships,
+            'routine_locations': self.routine_locations
         }
\ No newline at end of file
@@ -0,0 +1,155 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+from datetime import datetime
+from enum import IntEnum
+import sys
+
+class MemoryType(IntEnum):
+    """记忆类型，以小整数保存"""
+    OTHER = 0  # 未知类型，原始类型名保存在extra中
+    ACTION = 1
+    DIALOGUE = 2
+    MOVEMENT = 3
+    OBSERVATION = 4
+    EMOTION = 5
+    INTERACTION = 6
+    CUSTOM = 7
+    SUMMARY = 8
+
+_TYPES_BY_NAME = {memory_type.name.lower(): memory_type for memory_type in MemoryType}
+_NO_CHARS: Tuple[str, ...] = ()
+
+def to_timestamp(value: Union[str, float, int]) -> float:
+    """把ISO时间字符串或数值时间戳统一转换为数值时间戳"""
+    if isinstance(value, str):
+        return datetime.fromisoformat(value).timestamp()
+    return float(value)
+
+class Memory:
+    """一条记忆
+
+    使用__slots__而不是字典保存，时间戳为数值，类型为MemoryType，
+    相关角色ID经过驻留（sys.intern），大量记忆时可以显著降低内存占用。
+    为兼容原有代码，支持只读的字典式访问（memory['content']、
+    memory.get('importance')），to_dict()/from_dict()用于JSON导出和导入。
+    """
+
+    __slots__ = (
+        'timestamp', 'kind', 'content', 'importance',
+        'related_chars', 'level', 'id', 'extra'
+    )
+
+    def __init__(
+        self,
+        content: str = '',
+        kind: MemoryType = MemoryType.OTHER,
+        importance: int = 0,
+        timestamp: float = 0.0,
+        related_chars: Iterable[str] = _NO_CHARS,
+        level: int = 0,
+        id: Optional[Union[str, int]] = None,
+        extra: Optional[Dict[str, Any]] = None
+    ):
+        self.timestamp = timestamp
+        self.kind = kind
+        self.content = content
+        self.importance = importance
+        self.related_chars = (
+            tuple(map(sys.intern, related_chars)) if related_chars else _NO_CHARS
+        )
+        self.level = level
+        self.id = id
+        # 其他字段（如摘要的sources），没有时为None以节省内存
+        self.extra = extra or None
+
+    @classmethod
+    def from_dict(cls, data: Dict, timestamp: Optional[float] = None) -> 'Memory':
+        """从记忆字典创建记录
+
+        Args:
+            data: 记忆字典，timestamp可以是ISO字符串或数值
+            timestamp: 指定时间戳，覆盖data中的值
+        """
+        extra = None
+        if not _DICT_FIELDS.issuperset(data):
+            extra = {key: value for key, value in data.items() if key not in _DICT_FIELDS}
+        type_name = data.get('type')
+        kind = _TYPES_BY_NAME.get(type_name, MemoryType.OTHER)
+        if kind is MemoryType.OTHER and type_name is not None:
+            extra = dict(extra or {}, type=type_name)
+        if timestamp is None:
+            timestamp = to_timestamp(data['timestamp']) if 'timestamp' in data else 0.0
+        return cls(
+            content=data.get('content', ''),
+            kind=kind,
+            importance=data.get('importance', 0),
+            timestamp=timestamp,
+            related_chars=data.get('related_chars') or _NO_CHARS,
+            level=data.get('level', 0),
+            id=data.get('id'),
+            extra=extra
+        )
+
+    @classmethod
+    def coerce(cls, memory: Union['Memory', Dict], timestamp: Optional[float] = None) -> 'Memory':
+        """把记忆字典或记录转换为新的记录，不修改传入的对象"""
+        if isinstance(memory, Memory):
+            memory = memory.to_dict()
+        return cls.from_dict(memory, timestamp)
+
+    @property
+    def type(self) -> Optional[str]:
+        """记忆类型名，未知类型返回原始类型名"""
+        if self.kind:
+            return self.kind.name.lower()
+        return self.extra.get('type') if self.extra else None
+
+    def to_dict(self) -> Dict:
+        """转换为记忆字典，时间戳为数值"""
+        data = {
+            'type': self.type,
+            'content': self.content,
+            'importance': self.importance,
+            'related_chars': list(self.related_chars),
+            'timestamp': self.timestamp
+        }
+        if self.level:
+            data['level'] = self.level
+        if self.id is not None:
+            data['id'] = self.id
+        if self.extra:
+            data.update((key, value) for key, value in self.extra.items() if key != 'type')
+        return data
+
+    def __getitem__(self, key: str) -> Any:
+        if key == 'type':
+            value = self.type
+        elif key in _DICT_FIELDS:
+            value = getattr(self, key)
+            if key == 'related_chars':
+                value = list(value)
+        elif self.extra and key in self.extra:
+            return self.extra[key]
+        else:
+            raise KeyError(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def keys(self) -> List[str]:
+        return list(self.to_dict().keys())
+
+    def __repr__(self) -> str:
+        return f"Memory({self.to_dict()!r})"
+
+_DICT_FIELDS = frozenset(
+    ('type', 'content', 'importance', 'related_chars', 'timestamp', 'level', 'id')
+)
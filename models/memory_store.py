@@ -0,0 +1,481 @@
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+from collections import deque
+from datetime import datetime
+import json
+import os
+import re
+import sqlite3
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.settings import (
+    MEMORY_WINDOW, MEMORY_DB_FILE, RETRIEVAL_CANDIDATES,
+    COMPACTION_WATERMARK, COMPACTION_GROUP_SIZE, COMPACTION_MAX_GROUPS,
+    COMPACTION_MAX_IMPORTANCE, COMPACTION_MIN_AGE
+)
+from models.memory import Memory, MemoryType
+from models.memory_stream import score_memories
+from utils.embedding import embed_text, embed_texts
+from utils.sim_clock import SimClock
+
+_SELECT = (
+    "SELECT m.id, m.timestamp, m.type, m.importance, m.content, "
+    "m.related_chars, m.level, m.extra FROM memories m "
+)
+_CJK = re.compile(r'([\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff])')
+
+def _segment(text: str) -> str:
+    """在中日韩文字之间插入空格，使FTS5的unicode61分词器按字建立索引"""
+    return _CJK.sub(r' \1 ', text)
+
+def _quote(text: str) -> str:
+    """把文本转换为FTS5短语"""
+    return '"' + ' '.join(_segment(text).split()).replace('"', '""') + '"'
+
+def _match_expression(query: str, operator: str = 'AND') -> Optional[str]:
+    """把查询文本转换为只匹配content列的FTS5查询表达式，每个词作为一个短语"""
+    phrases = [_quote(term) for term in query.split() if _segment(term).split()]
+    if not phrases:
+        return None
+    return 'content : (' + f' {operator} '.join(phrases) + ')'
+
+class MemoryStore:
+    """所有角色共用的SQLite记忆存储
+
+    记忆保存在一张memories表中，按角色、时间、类型和重要性建立索引；
+    相关角色另存一张关联表，内容建立FTS5全文索引。数据库使用WAL模式，
+    读写不互相阻塞，进程退出后记忆仍然保留。
+    """
+
+    def __init__(self, db_path: str = MEMORY_DB_FILE):
+        self.db_path = db_path
+        self.db = sqlite3.connect(db_path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(
+            "CREATE TABLE IF NOT EXISTS memories ("
+            "id INTEGER PRIMARY KEY, "
+            "char_id TEXT NOT NULL, "
+            "timestamp REAL NOT NULL, "
+            "type TEXT, "
+            "importance INTEGER NOT NULL DEFAULT 0, "
+            "content TEXT NOT NULL DEFAULT '', "
+            "related_chars TEXT NOT NULL DEFAULT '[]', "
+            "level INTEGER NOT NULL DEFAULT 0, "
+            "archived INTEGER NOT NULL DEFAULT 0, "
+            "extra TEXT);"
+            # 已压缩的原始记忆（archived=1）不参与查询，索引只覆盖未压缩的记忆
+            "CREATE INDEX IF NOT EXISTS idx_memories_time "
+            "ON memories(char_id, timestamp) WHERE archived = 0;"
+            "CREATE INDEX IF NOT EXISTS idx_memories_type "
+            "ON memories(char_id, type, timestamp) WHERE archived = 0;"
+            "CREATE INDEX IF NOT EXISTS idx_memories_importance "
+            "ON memories(char_id, importance, timestamp) WHERE archived = 0;"
+            "CREATE TABLE IF NOT EXISTS memory_links ("
+            "memory_id INTEGER NOT NULL, "
+            "char_id TEXT NOT NULL, "
+            "related_char TEXT NOT NULL, "
+            "timestamp REAL NOT NULL, "
+            "PRIMARY KEY (memory_id, related_char)) WITHOUT ROWID;"
+            "CREATE INDEX IF NOT EXISTS idx_links_related "
+            "ON memory_links(char_id, related_char, timestamp);"
+            # 无内容的FTS5表，只保存倒排索引，rowid即记忆ID；
+            # 角色ID也建立索引，使匹配只在本角色的记忆中进行
+            "CREATE VIRTUAL TABLE IF NOT EXISTS memories_fts "
+            "USING fts5(char_id, content, content='');"
+        )
+        self.db.commit()
+
+    def stream(
+        self,
+        char_id: str,
+        max_size: Optional[int] = None,
+        clock: Optional[SimClock] = None
+    ) -> 'SQLiteMemoryStream':
+        """获取某个角色的记忆流"""
+        return SQLiteMemoryStream(self, char_id, max_size, clock)
+
+    def close(self) -> None:
+        """关闭数据库连接"""
+        self.db.close()
+
+class SQLiteMemoryStream:
+    """保存在SQLite中的角色记忆流
+
+    查询接口与MemoryStream相同，另外提供全文检索search()。记忆只在查询时
+    按需读取，内存占用与记忆总数无关。max_size为None时不淘汰记忆。
+    """
+
+    def __init__(
+        self,
+        store: MemoryStore,
+        char_id: str,
+        max_size: Optional[int] = None,
+        clock: Optional[SimClock] = None
+    ):
+        self.store = store
+        self.clock = clock or SimClock()
+        self.db = store.db
+        self.char_id = char_id
+        self.max_size = max_size
+        self._inserts = 0
+        # 最新记忆的环形缓冲，首次读取时从数据库加载，之后随add_memory追加
+        self._recent: Optional['deque[Memory]'] = None
+        self._count = self.db.execute(
+            "SELECT COUNT(*) FROM memories WHERE char_id = ? AND archived = 0",
+            (char_id,)
+        ).fetchone()[0]
+
+    @property
+    def memories(self) -> List[Memory]:
+        """按时间顺序排列的所有记忆"""
+        return self._query("ORDER BY m.timestamp, m.id")
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def insert_count(self) -> int:
+        """累计插入过的记忆数，可用于判断记忆流自某一时刻以来是否有变化"""
+        return self._inserts
+
+    def add_memory(self, memory: Union[Memory, Dict]) -> Memory:
+        """添加新的记忆，参数和返回值同MemoryStream.add_memory"""
+        memory = Memory.coerce(memory, timestamp=self.clock.now())
+        with self.db:
+            self._insert(memory)
+            if self._recent is not None:
+                self._recent.append(memory)
+            if self.max_size is not None and self._count > self.max_size:
+                self._filter_memories()
+        return memory
+
+    def _insert(self, memory: Memory) -> int:
+        """写入一条记忆及其相关角色和全文索引，记忆ID写回memory.id并返回"""
+        # 未知类型名保存在type列中，不再重复写入extra
+        extra = {key: value for key, value in (memory.extra or {}).items() if key != 'type'}
+        cursor = self.db.execute(
+            "INSERT INTO memories (char_id, timestamp, type, importance, content, "
+            "related_chars, level, extra) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                self.char_id, memory.timestamp, memory.type,
+                memory.importance, memory.content,
+                json.dumps(memory.related_chars, ensure_ascii=False),
+                memory.level,
+                json.dumps(extra, ensure_ascii=False) if extra else None
+            )
+        )
+        memory_id = cursor.lastrowid
+        memory.id = memory_id
+        self.db.executemany(
+            "INSERT OR IGNORE INTO memory_links VALUES (?, ?, ?, ?)",
+            [(memory_id, self.char_id, char_id, memory.timestamp) for char_id in memory.related_chars]
+        )
+        self.db.execute(
+            "INSERT INTO memories_fts (rowid, char_id, content) VALUES (?, ?, ?)",
+            (memory_id, self.char_id, _segment(memory.content))
+        )
+        self._count += 1
+        self._inserts += 1
+        return memory_id
+
+    def _unindex(self, rows: Iterable[Tuple[int, str]], delete: bool) -> None:
+        """把记忆移出查询范围：delete为True时删除，否则标记为已压缩"""
+        rows = list(rows)
+        if not rows:
+            return
+        ids = [(memory_id,) for memory_id, _ in rows]
+        self.db.executemany(
+            "INSERT INTO memories_fts (memories_fts, rowid, char_id, content) "
+            "VALUES ('delete', ?, ?, ?)",
+            [(memory_id, self.char_id, _segment(content)) for memory_id, content in rows]
+        )
+        self.db.executemany("DELETE FROM memory_links WHERE memory_id = ?", ids)
+        if delete:
+            self.db.executemany("DELETE FROM memories WHERE id = ?", ids)
+        else:
+            self.db.executemany("UPDATE memories SET archived = 1 WHERE id = ?", ids)
+        self._count -= len(rows)
+        if self._recent is not None:
+            removed = {memory_id for memory_id, _ in rows}
+            if any(memory.id in removed for memory in self._recent):
+                self._recent = deque(
+                    (memory for memory in self._recent if memory.id not in removed),
+                    maxlen=MEMORY_WINDOW
+                )
+
+    def _filter_memories(self) -> None:
+        """删除最不重要的旧记忆，使记忆数不超过max_size"""
+        excess = self._count - self.max_size
+        if excess > 0:
+            self._unindex(self.db.execute(
+                "SELECT id, content FROM memories WHERE char_id = ? AND archived = 0 "
+                "ORDER BY importance, timestamp LIMIT ?",
+                (self.char_id, excess)
+            ).fetchall(), delete=True)
+
+    def _query(self, clause: str, params: Tuple = ()) -> List[Memory]:
+        """查询本角色未压缩的记忆，clause为附加的条件和排序"""
+        rows = self.db.execute(
+            _SELECT + "WHERE m.char_id = ? AND m.archived = 0 " + clause,
+            (self.char_id,) + tuple(params)
+        ).fetchall()
+        return [self._to_memory(row) for row in rows]
+
+    @staticmethod
+    def _to_memory(row: Tuple) -> Memory:
+        """把查询结果还原为记忆记录"""
+        memory_id, timestamp, memory_type, importance, content, related_chars, level, extra = row
+        memory = Memory.from_dict({
+            'type': memory_type,
+            'content': content,
+            'importance': importance,
+            'related_chars': json.loads(related_chars),
+            'level': level,
+            'id': memory_id
+        }, timestamp=timestamp)
+        if extra:
+            memory.extra = dict(memory.extra or {}, **json.loads(extra))
+        return memory
+
+    def get_memories_since(self, timestamp: float) -> List[Memory]:
+        """获取指定时间戳之后的记忆"""
+        return self._query("AND m.timestamp > ? ORDER BY m.timestamp, m.id", (timestamp,))
+
+    def get_latest(self, count: int = 10) -> List[Memory]:
+        """获取最新的count条记忆（按时间顺序），最多MEMORY_WINDOW条"""
+        if self._recent is None:
+            latest = self._query("ORDER BY m.timestamp DESC, m.id DESC LIMIT ?", (MEMORY_WINDOW,))
+            self._recent = deque(reversed(latest), maxlen=MEMORY_WINDOW)
+        if count <= 0:
+            return []
+        return list(self._recent)[-count:]
+
+    def get_recent_memories(self, hours: int = 24) -> List[Memory]:
+        """获取最近一段时间内的记忆"""
+        return self.get_memories_since(self.clock.now() - hours * 3600)
+
+    def get_memories_by_type(self, memory_type: str) -> List[Memory]:
+        """获取特定类型的记忆"""
+        return self._query("AND m.type = ? ORDER BY m.timestamp, m.id", (memory_type,))
+
+    def get_memories_about_character(
+        self,
+        character_id: str,
+        limit: Optional[int] = None,
+        since: Optional[float] = None
+    ) -> List[Memory]:
+        """获取与特定角色相关的记忆，参数同MemoryStream.get_memories_about_character"""
+        rows = self.db.execute(
+            _SELECT + "JOIN memory_links l ON l.memory_id = m.id "
+            "WHERE l.char_id = ? AND l.related_char = ? AND l.timestamp > ? "
+            "ORDER BY l.timestamp DESC, m.id DESC LIMIT ?",
+            (self.char_id, character_id, -1.0 if since is None else since,
+             -1 if limit is None else limit)
+        ).fetchall()
+        return [self._to_memory(row) for row in reversed(rows)]
+
+    def get_important_memories(self, min_importance: int = 7) -> List[Memory]:
+        """获取重要性超过特定值的记忆"""
+        return self._query("AND m.importance >= ? ORDER BY m.timestamp, m.id", (min_importance,))
+
+    def search(self, query: str, limit: int = 10) -> List[Memory]:
+        """全文检索记忆内容，按匹配程度排序
+
+        查询中的每个词都必须出现；中文按字建立索引，词内的字需要相邻。
+
+        Args:
+            query: 查询文本，如角色名或地点
+            limit: 最多返回的记忆条数
+
+        Returns:
+            按匹配程度从高到低排列的记忆列表
+        """
+        expression = _match_expression(query)
+        if expression is None:
+            return []
+        return self._search(expression, limit)
+
+    def _search(self, expression: str, limit: int) -> List[Memory]:
+        """执行FTS5查询，只返回本角色未压缩的记忆
+
+        char_id列的全文匹配按词进行（角色li也会匹配li_xiaomei），只用来缩小候选范围，
+        归属由memories表的char_id精确过滤，LIMIT在过滤之后执行。
+        """
+        rows = self.db.execute(
+            _SELECT + "JOIN memories_fts f ON f.rowid = m.id "
+            "WHERE memories_fts MATCH ? AND m.char_id = ? AND m.archived = 0 "
+            "ORDER BY f.rank LIMIT ?",
+            (f"char_id : {_quote(self.char_id)} AND {expression}", self.char_id, limit)
+        ).fetchall()
+        return [self._to_memory(row) for row in rows]
+
+    def retrieve(
+        self,
+        query: str,
+        k: int = 5,
+        related_char: Optional[str] = None,
+        now: Optional[float] = None
+    ) -> List[Memory]:
+        """按新近度、重要性和相关度取出最相关的k条记忆，参数同MemoryStream.retrieve
+
+        候选集为全文检索命中的记忆加上最近和最重要的记忆（各RETRIEVAL_CANDIDATES条），
+        评分只在候选集上进行，因此不需要把全部记忆读入内存。
+        """
+        if k <= 0:
+            return []
+        candidates: Dict[int, Memory] = {}
+        if related_char is not None:
+            memories = self.get_memories_about_character(related_char, limit=RETRIEVAL_CANDIDATES)
+        else:
+            memories = self._query("ORDER BY m.timestamp DESC LIMIT ?", (RETRIEVAL_CANDIDATES,))
+            memories += self._query("ORDER BY m.importance DESC, m.timestamp DESC LIMIT ?",
+                                    (RETRIEVAL_CANDIDATES,))
+            expression = _match_expression(query, 'OR')
+            if expression is not None:
+                memories += self._search(expression, RETRIEVAL_CANDIDATES)
+        for memory in memories:
+            candidates[memory.id] = memory
+        if not candidates:
+            return []
+
+        pool = list(candidates.values())
+        scores = score_memories(
+            np.array([memory.timestamp for memory in pool], dtype=np.float64),
+            np.array([memory.importance for memory in pool], dtype=np.float32),
+            embed_texts([memory.content for memory in pool]) @ embed_text(query),
+            self.clock.now() if now is None else now
+        )
+        top = np.argsort(-scores, kind='stable')[:k]
+        return sorted((pool[i] for i in top), key=lambda memory: (memory.timestamp, memory.id))
+
+    def needs_compaction(self) -> bool:
+        """记忆数是否达到触发压缩的水位线，不限制大小时从不压缩"""
+        return self.max_size is not None and self._count >= self.max_size * COMPACTION_WATERMARK
+
+    def select_compaction_groups(
+        self,
+        group_size: int = COMPACTION_GROUP_SIZE,
+        max_groups: int = COMPACTION_MAX_GROUPS,
+        now: Optional[float] = None
+    ) -> List[List[int]]:
+        """挑选可以压缩的记忆并分组，规则同MemoryStream.select_compaction_groups"""
+        cutoff = (self.clock.now() if now is None else now) - COMPACTION_MIN_AGE
+        rows = self.db.execute(
+            "SELECT id, level FROM memories WHERE char_id = ? AND archived = 0 "
+            "AND (importance <= ? OR timestamp <= ?) ORDER BY timestamp, id",
+            (self.char_id, COMPACTION_MAX_IMPORTANCE, cutoff)
+        )
+        pending: Dict[int, List[int]] = {}
+        groups: List[List[int]] = []
+        for memory_id, level in rows:
+            group = pending.setdefault(level, [])
+            group.append(memory_id)
+            if len(group) == group_size:
+                groups.append(group)
+                pending[level] = []
+                if len(groups) >= max_groups:
+                    break
+        return groups
+
+    def _fetch(self, ids: List[int]) -> List[Memory]:
+        """按ID读取仍未压缩的记忆，保持ids的顺序"""
+        if not ids:
+            return []
+        placeholders = ','.join('?' * len(ids))
+        found = {
+            memory.id: memory
+            for memory in self._query(f"AND m.id IN ({placeholders})", tuple(ids))
+        }
+        return [found[memory_id] for memory_id in ids if memory_id in found]
+
+    def get_group_contents(self, group: List[int]) -> List[str]:
+        """取出一组记忆的内容，已被删除的记忆跳过"""
+        return [memory.content for memory in self._fetch(group)]
+
+    def apply_compaction(self, groups: List[List[int]], summaries: List) -> List[Memory]:
+        """用摘要记忆替换被压缩的原始记忆，规则同MemoryStream.apply_compaction
+
+        原始记忆保留在数据库中并标记为已压缩，可以通过get_archived按ID取回。
+        """
+        created = []
+        with self.db:
+            for group, summary in zip(groups, summaries):
+                if summary is None:
+                    continue
+                sources = self._fetch(group)
+                if not sources:
+                    continue
+
+                related_chars: Dict[str, None] = {}
+                for source in sources:
+                    related_chars.update(dict.fromkeys(source.related_chars))
+                importance = max(source.importance for source in sources)
+                if summary.importance is not None:
+                    importance = max(importance, summary.importance)
+
+                self._unindex(
+                    ((source.id, source.content) for source in sources), delete=False
+                )
+                record = Memory(
+                    content=summary.summary,
+                    kind=MemoryType.SUMMARY,
+                    importance=importance,
+                    timestamp=sources[-1].timestamp,
+                    related_chars=related_chars,
+                    level=max(source.level for source in sources) + 1,
+                    extra={'sources': [source.id for source in sources]}
+                )
+                self._insert(record)
+                created.append(record)
+        return created
+
+    def get_archived(self, memory_id: int) -> Optional[Memory]:
+        """按ID取回已被压缩为摘要的原始记忆"""
+        row = self.db.execute(
+            _SELECT + "WHERE m.id = ? AND m.char_id = ? AND m.archived = 1",
+            (memory_id, self.char_id)
+        ).fetchone()
+        return self._to_memory(row) if row else None
+
+    def summarize_memories(self, character_id: Optional[str] = None) -> str:
+        """生成记忆摘要，可以选择性地针对特定角色"""
+        memories_to_summarize = (
+            self.get_memories_about_character(character_id)
+            if character_id
+            else self.get_recent_memories(hours=24)
+        )
+
+        if not memories_to_summarize:
+            return "没有相关记忆。"
+
+        return "\n".join(
+            f"[{datetime.fromtimestamp(memory.timestamp).strftime('%H:%M')}] "
+            f"{memory.content or '未知事件'}"
+            for memory in memories_to_summarize
+        )
+
+    def save_to_file(self, filepath: str) -> None:
+        """将记忆流导出为与MemoryStream相同格式的JSON文件"""
+        records = [
+            dict(memory.to_dict(), timestamp=datetime.fromtimestamp(memory.timestamp).isoformat())
+            for memory in self.memories
+        ]
+        with open(filepath, 'w', encoding='utf-8') as f:
+            json.dump(records, f, ensure_ascii=False, indent=2)
+
+    def clear_old_memories(self, days: int = 7) -> None:
+        """删除指定天数之前的记忆（包括已压缩的原始记忆）"""
+        cutoff = self.clock.now() - days * 86400
+        with self.db:
+            self._unindex(self.db.execute(
+                "SELECT id, content FROM memories WHERE char_id = ? AND archived = 0 "
+                "AND timestamp <= ?",
+                (self.char_id, cutoff)
+            ).fetchall(), delete=True)
+            self.db.execute(
+                "DELETE FROM memories WHERE char_id = ? AND archived = 1 AND timestamp <= ?",
+                (self.char_id, cutoff)
+            )
@@ -1,71 +1,531 @@
-from typing import Dict, List, Optional
-from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple, Union
+from bisect import bisect_right
+from collections import OrderedDict, deque
+from datetime import datetime
+import heapq
 import json
+import os
+import sys
+import uuid
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.settings import (
+    MEMORY_WINDOW, EMBEDDING_DIM, RETRIEVAL_DECAY, RETRIEVAL_WEIGHTS,
+    COMPACTION_WATERMARK, COMPACTION_GROUP_SIZE, COMPACTION_MAX_GROUPS,
+    COMPACTION_MAX_IMPORTANCE, COMPACTION_MIN_AGE, COMPACTION_ARCHIVE_SIZE
+)
+from models.memory import Memory, MemoryType
+from utils.embedding import embed_text, embed_texts
+from utils.sim_clock import SimClock
+
+def _normalize(values: np.ndarray) -> np.ndarray:
+    """把分数线性缩放到[0, 1]，所有值相同时返回全零"""
+    low = values.min()
+    span = values.max() - low
+    if span <= 0:
+        return np.zeros_like(values, dtype=np.float64)
+    return (values - low) / span
+
+def score_memories(
+    timestamps: np.ndarray,
+    importance: np.ndarray,
+    relevance: np.ndarray,
+    now: float
+) -> np.ndarray:
+    """计算记忆的综合检索分数
+
+    新近度按小时指数衰减，三项分数分别归一化到[0, 1]后按RETRIEVAL_WEIGHTS加权求和。
+    """
+    hours = np.maximum(now - timestamps, 0.0) / 3600
+    return (
+        RETRIEVAL_WEIGHTS['recency'] * _normalize(RETRIEVAL_DECAY ** hours)
+        + RETRIEVAL_WEIGHTS['importance'] * _normalize(importance)
+        + RETRIEVAL_WEIGHTS['relevance'] * _normalize(relevance)
+    )
 
 class MemoryStream:
-    def __init__(self, max_size: int = 100):
-        self.memories: List[Dict] = []
+    """角色的记忆流
+
+    记忆以Memory记录保存，timestamp为数值时间戳（秒），只在保存到文件时转换为ISO字符串。
+    时间戳和“最近”“过期”等判断都取自模拟时钟clock，默认为真实时间。
+    """
+
+    def __init__(self, max_size: int = MEMORY_WINDOW, clock: Optional[SimClock] = None):
         self.max_size = max_size
+        self.clock = clock or SimClock()
+        self._next_seq = 0
+        self._reset()
+
+    def _reset(self) -> None:
+        """清空记忆和所有索引"""
+        # 记忆本体，键为内部序号
+        self._memories: Dict[int, Memory] = {}
+        # 时间索引：按时间排序的时间戳和对应序号，已删除的序号在查询时跳过
+        self._times: List[float] = []
+        self._seqs: List[int] = []
+        # 二级索引：值为以序号为键的有序字典，按(时间戳, 序号)排列
+        self._by_type: Dict[str, Dict[int, None]] = {}
+        self._by_char: Dict[str, Dict[int, None]] = {}
+        self._by_importance: Dict[int, Dict[int, None]] = {}
+        # 最新记忆序号的环形缓冲，只记录追加在时间索引末尾的记忆（摘要等按原时间
+        # 插入到中间的不算），已删除的序号在读取时跳过
+        self._recent: 'deque[int]' = deque(maxlen=MEMORY_WINDOW)
+        # 淘汰用的最小堆：(重要性, 时间戳, 序号)，已删除的记忆在弹出时跳过
+        self._eviction_heap: List[Tuple[int, float, int]] = []
+        # 检索用的向量存储：每条记忆占一行，删除后的行放入空闲列表复用
+        self._rows: Dict[int, int] = {}
+        self._free_rows: List[int] = []
+        self._row_count = 0
+        self._row_seqs = np.full(0, -1, dtype=np.int64)
+        self._row_times = np.zeros(0, dtype=np.float64)
+        self._row_importance = np.zeros(0, dtype=np.float32)
+        self._vectors = np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+        # 尚未计算向量的行，检索时批量计算
+        self._unembedded: List[int] = []
+        # 已被压缩为摘要的原始记忆，按记忆ID保存，超出上限时丢弃最旧的
+        self.archive: 'OrderedDict[str, Memory]' = OrderedDict()
+
+    @property
+    def memories(self) -> List[Memory]:
+        """按时间顺序排列的所有记忆"""
+        return self._collect(0)
+
+    @memories.setter
+    def memories(self, memories: List[Union[Memory, Dict]]) -> None:
+        self._reset()
+        # 旧版本保存的文件可能是按重要性排序的，这里恢复时间顺序
+        records = sorted(
+            (Memory.coerce(memory) for memory in memories),
+            key=lambda memory: memory.timestamp
+        )
+        for memory in records:
+            self._insert(memory)
 
-    def add_memory(self, memory: Dict) -> None:
+    def __len__(self) -> int:
+        return len(self._memories)
+
+    @property
+    def insert_count(self) -> int:
+        """累计插入过的记忆数，可用于判断记忆流自某一时刻以来是否有变化"""
+        return self._next_seq
+
+    def add_memory(self, memory: Union[Memory, Dict]) -> Memory:
         """添加新的记忆
-        
+
         Args:
-            memory: 包含记忆内容的字典，应该包含以下字段：
+            memory: Memory记录或包含记忆内容的字典，字典应该包含以下字段：
                 - type: 记忆类型（如'interaction', 'observation', 'emotion'）
                 - content: 记忆内容
                 - importance: 重要性评分（1-10）
                 - related_chars: 相关角色列表
+
+        Returns:
+            以当前时间为时间戳新建的记录，传入的对象不会被修改
         """
-        memory['timestamp'] = datetime.now().isoformat()
-        self.memories.append(memory)
-        
+        memory = Memory.coerce(memory, timestamp=self.clock.now())
+        self._insert(memory)
+
         # 保持记忆流大小在限制范围内
-        if len(self.memories) > self.max_size:
+        if len(self._memories) > self.max_size:
             # 根据重要性和时间进行过滤
             self._filter_memories()
+        return memory
+
+    def _insert(self, memory: Memory) -> None:
+        """保存记忆并登记到时间索引和淘汰堆"""
+        timestamp = memory.timestamp
+        seq = self._next_seq
+        self._next_seq += 1
+        self._memories[seq] = memory
+
+        if not self._times or timestamp >= self._times[-1]:
+            self._times.append(timestamp)
+            self._seqs.append(seq)
+            self._recent.append(seq)
+        else:
+            # 系统时钟回拨等少见情况下按时间插入到中间
+            index = bisect_right(self._times, timestamp)
+            self._times.insert(index, timestamp)
+            self._seqs.insert(index, seq)
+
+        heapq.heappush(
+            self._eviction_heap,
+            (memory.importance, timestamp, seq)
+        )
+        self._index(seq, memory)
+        self._allocate_row(seq, memory)
+
+    def _index(self, seq: int, memory: Memory) -> None:
+        """把记忆登记到类型、相关角色和重要性索引"""
+        timestamp = memory.timestamp
+        self._add_to_bucket(self._by_type, memory.type, seq, timestamp)
+        for char_id in memory.related_chars:
+            self._add_to_bucket(self._by_char, char_id, seq, timestamp)
+        self._add_to_bucket(self._by_importance, memory.importance, seq, timestamp)
+
+    def _add_to_bucket(self, index: Dict, key, seq: int, timestamp: float) -> None:
+        """把序号加入索引桶，保持桶内按(时间戳, 序号)排序
+
+        正常插入的记忆时间不早于桶中最后一条，直接追加；按原时间插入的记忆
+        （摘要、重放、时钟回拨）少见，此时重建该桶。
+        """
+        bucket = index.setdefault(key, {})
+        if bucket:
+            last = next(reversed(bucket))
+            if (timestamp, seq) < (self._memories[last].timestamp, last):
+                memories = self._memories
+                ordered = sorted(
+                    [*bucket, seq],
+                    key=lambda other: (memories[other].timestamp, other)
+                )
+                index[key] = dict.fromkeys(ordered)
+                return
+        bucket[seq] = None
+
+    def _remove(self, seq: int) -> None:
+        """删除记忆并同步更新二级索引（时间索引和淘汰堆惰性清理）"""
+        memory = self._memories.pop(seq, None)
+        if memory is None:
+            return
+        self._discard(self._by_type, memory.type, seq)
+        for char_id in memory.related_chars:
+            self._discard(self._by_char, char_id, seq)
+        self._discard(self._by_importance, memory.importance, seq)
+        row = self._rows.pop(seq)
+        self._row_seqs[row] = -1
+        self._free_rows.append(row)
+
+    @staticmethod
+    def _discard(index: Dict, key, seq: int) -> None:
+        """从索引中移除一个序号，桶为空时删除该键"""
+        bucket = index.get(key)
+        if bucket is not None:
+            bucket.pop(seq, None)
+            if not bucket:
+                del index[key]
+
+    def _allocate_row(self, seq: int, memory: Memory) -> None:
+        """为记忆分配向量存储中的一行，向量延迟到检索时再计算"""
+        if self._free_rows:
+            row = self._free_rows.pop()
+        else:
+            row = self._row_count
+            self._row_count += 1
+            if row >= len(self._row_seqs):
+                self._grow_rows(max(64, 2 * len(self._row_seqs)))
+        self._rows[seq] = row
+        self._row_seqs[row] = seq
+        self._row_times[row] = memory.timestamp
+        self._row_importance[row] = memory.importance
+        self._unembedded.append(row)
+
+    def _grow_rows(self, capacity: int) -> None:
+        """扩大向量存储的容量"""
+        size = len(self._row_seqs)
+        row_seqs = np.full(capacity, -1, dtype=np.int64)
+        row_seqs[:size] = self._row_seqs
+        row_times = np.zeros(capacity, dtype=np.float64)
+        row_times[:size] = self._row_times
+        row_importance = np.zeros(capacity, dtype=np.float32)
+        row_importance[:size] = self._row_importance
+        vectors = np.zeros((capacity, EMBEDDING_DIM), dtype=np.float32)
+        vectors[:size] = self._vectors
+        self._row_seqs = row_seqs
+        self._row_times = row_times
+        self._row_importance = row_importance
+        self._vectors = vectors
+
+    def _embed_pending(self) -> None:
+        """计算尚未计算向量的记忆"""
+        # 行可能已被删除，或被复用后重新排队
+        rows = np.unique(np.asarray(self._unembedded, dtype=np.int64))
+        rows = rows[self._row_seqs[rows] >= 0]
+        self._unembedded = []
+        if rows.size:
+            texts = [self._memories[int(seq)].content for seq in self._row_seqs[rows]]
+            self._vectors[rows] = embed_texts(texts)
 
     def _filter_memories(self) -> None:
         """根据重要性和时间对记忆进行过滤"""
-        # 按重要性和时间排序
-        self.memories.sort(key=lambda x: (
-            x.get('importance', 0),
-            datetime.fromisoformat(x['timestamp'])
-        ))
-        
-        # 删除最不重要的旧记忆
-        while len(self.memories) > self.max_size:
-            self.memories.pop(0)
-
-    def get_recent_memories(self, hours: int = 24) -> List[Dict]:
-        """获取最近一段时间内的记忆"""
-        cutoff_time = datetime.now() - timedelta(hours=hours)
-        return [
-            memory for memory in self.memories
-            if datetime.fromisoformat(memory['timestamp']) > cutoff_time
+        # 删除最不重要的旧记忆，每次淘汰O(log n)
+        while len(self._memories) > self.max_size and self._eviction_heap:
+            _, _, seq = heapq.heappop(self._eviction_heap)
+            self._remove(seq)
+
+        # 其他途径删除的记忆会在堆中留下失效条目，过多时重建堆
+        if len(self._eviction_heap) > 2 * len(self._memories) + 64:
+            self._rebuild_heap()
+        # 被淘汰的记忆同样在时间索引中留下失效条目
+        if len(self._seqs) > 2 * len(self._memories) + 64:
+            self._compact_time_index()
+
+    def _rebuild_heap(self) -> None:
+        """丢弃淘汰堆中的失效条目"""
+        self._eviction_heap = [
+            entry for entry in self._eviction_heap
+            if entry[2] in self._memories
         ]
+        heapq.heapify(self._eviction_heap)
 
-    def get_memories_by_type(self, memory_type: str) -> List[Dict]:
-        """获取特定类型的记忆"""
-        return [
-            memory for memory in self.memories
-            if memory.get('type') == memory_type
+    def _compact_time_index(self) -> None:
+        """丢弃时间索引中的失效条目"""
+        live = [
+            (timestamp, seq) for timestamp, seq in zip(self._times, self._seqs)
+            if seq in self._memories
         ]
+        self._times = [timestamp for timestamp, _ in live]
+        self._seqs = [seq for _, seq in live]
 
-    def get_memories_about_character(self, character_id: str) -> List[Dict]:
-        """获取与特定角色相关的记忆"""
+    def _collect(self, start: int) -> List[Memory]:
+        """从时间索引的start位置起按时间顺序取出仍然存在的记忆"""
+        memories = self._memories
         return [
-            memory for memory in self.memories
-            if character_id in memory.get('related_chars', [])
+            memories[seq] for seq in self._seqs[start:]
+            if seq in memories
         ]
 
-    def get_important_memories(self, min_importance: int = 7) -> List[Dict]:
+    def get_memories_since(self, timestamp: float) -> List[Memory]:
+        """获取指定时间戳之后的记忆，O(log n + k)"""
+        return self._collect(bisect_right(self._times, timestamp))
+
+    def get_latest(self, count: int = 10) -> List[Memory]:
+        """获取最新的count条记忆（按时间顺序），O(count)，最多MEMORY_WINDOW条"""
+        latest = []
+        for seq in reversed(self._recent):
+            if len(latest) >= count:
+                break
+            memory = self._memories.get(seq)
+            if memory is not None:
+                latest.append(memory)
+        latest.reverse()
+        return latest
+
+    def get_recent_memories(self, hours: int = 24) -> List[Memory]:
+        """获取最近一段时间内的记忆"""
+        return self.get_memories_since(self.clock.now() - hours * 3600)
+
+    def get_memories_by_type(self, memory_type: str) -> List[Memory]:
+        """获取特定类型的记忆"""
+        bucket = self._by_type.get(memory_type, {})
+        return [self._memories[seq] for seq in bucket]
+
+    def get_memories_about_character(
+        self,
+        character_id: str,
+        limit: Optional[int] = None,
+        since: Optional[float] = None
+    ) -> List[Memory]:
+        """获取与特定角色相关的记忆
+
+        Args:
+            character_id: 角色ID
+            limit: 只返回最近的若干条（可选）
+            since: 只返回该时间戳之后的记忆（可选）
+
+        Returns:
+            按时间顺序排列的记忆列表
+        """
+        bucket = self._by_char.get(character_id, {})
+        if limit is None and since is None:
+            return [self._memories[seq] for seq in bucket]
+
+        # 桶按时间排序，从最新的记忆往前找，代价只与返回的条数有关
+        result = []
+        for seq in reversed(bucket):
+            memory = self._memories[seq]
+            if since is not None and memory.timestamp <= since:
+                break
+            result.append(memory)
+            if limit is not None and len(result) >= limit:
+                break
+        result.reverse()
+        return result
+
+    def get_important_memories(self, min_importance: int = 7) -> List[Memory]:
         """获取重要性超过特定值的记忆"""
+        memories = self._memories
+        seqs = sorted(
+            (
+                seq
+                for importance, bucket in self._by_importance.items()
+                if importance >= min_importance
+                for seq in bucket
+            ),
+            key=lambda seq: (memories[seq].timestamp, seq)
+        )
+        return [memories[seq] for seq in seqs]
+
+    def retrieve(
+        self,
+        query: str,
+        k: int = 5,
+        related_char: Optional[str] = None,
+        now: Optional[float] = None
+    ) -> List[Memory]:
+        """按新近度、重要性和与查询的相关度综合评分，取出最相关的k条记忆
+
+        评分见score_memories，全部计算在NumPy数组上向量化完成。
+
+        Args:
+            query: 查询文本，如当前情境或对话对象
+            k: 返回的记忆条数
+            related_char: 只在与该角色相关的记忆中检索（可选）
+            now: 计算新近度的当前时间戳，默认为模拟时钟的当前时间
+
+        Returns:
+            按时间顺序排列的记忆列表
+        """
+        if k <= 0:
+            return []
+        if related_char is not None:
+            bucket = self._by_char.get(related_char, {})
+            rows = np.fromiter(
+                (self._rows[seq] for seq in bucket), dtype=np.int64, count=len(bucket)
+            )
+        else:
+            rows = np.flatnonzero(self._row_seqs[:self._row_count] >= 0)
+        if rows.size == 0:
+            return []
+
+        self._embed_pending()
+        now = self.clock.now() if now is None else now
+        scores = score_memories(
+            self._row_times[rows],
+            self._row_importance[rows],
+            self._relevance(rows, embed_text(query)),
+            now
+        )
+
+        if rows.size > k:
+            top = rows[np.argpartition(-scores, k - 1)[:k]]
+        else:
+            top = rows
+        # 以时间顺序输出，便于在提示中按经历先后叙述
+        top = top[np.argsort(self._row_times[top], kind='stable')]
+        return [self._memories[int(seq)] for seq in self._row_seqs[top]]
+
+    def _relevance(self, rows: np.ndarray, query_vector: np.ndarray) -> np.ndarray:
+        """计算指定行与查询向量的余弦相似度"""
+        if rows.size * 4 < self._row_count:
+            return self._vectors[rows] @ query_vector
+        # 候选行占多数时直接对整块存储做矩阵乘法，避免复制向量
+        return (self._vectors[:self._row_count] @ query_vector)[rows]
+
+    def needs_compaction(self) -> bool:
+        """记忆数是否达到触发压缩的水位线"""
+        return len(self._memories) >= self.max_size * COMPACTION_WATERMARK
+
+    def select_compaction_groups(
+        self,
+        group_size: int = COMPACTION_GROUP_SIZE,
+        max_groups: int = COMPACTION_MAX_GROUPS,
+        now: Optional[float] = None
+    ) -> List[List[int]]:
+        """从最旧的记忆开始挑选可以压缩的记忆并分组
+
+        重要性较低或已经足够旧的记忆可以被压缩；摘要只与同一层级的摘要
+        合并，从而形成逐层概括的结构。
+
+        Returns:
+            记忆序号的分组列表，每组按时间顺序排列
+        """
+        cutoff = (self.clock.now() if now is None else now) - COMPACTION_MIN_AGE
+        pending: Dict[int, List[int]] = {}
+        groups: List[List[int]] = []
+        for seq in self._seqs:
+            memory = self._memories.get(seq)
+            if memory is None:
+                continue
+            if memory.importance > COMPACTION_MAX_IMPORTANCE and memory.timestamp > cutoff:
+                continue
+            group = pending.setdefault(memory.level, [])
+            group.append(seq)
+            if len(group) == group_size:
+                groups.append(group)
+                pending[memory.level] = []
+                if len(groups) >= max_groups:
+                    break
+        return groups
+
+    def get_group_contents(self, group: List[int]) -> List[str]:
+        """取出一组记忆的内容，已被删除的记忆跳过"""
         return [
-            memory for memory in self.memories
-            if memory.get('importance', 0) >= min_importance
+            self._memories[seq].content
+            for seq in group if seq in self._memories
         ]
 
+    def apply_compaction(self, groups: List[List[int]], summaries: List) -> List[Memory]:
+        """用摘要记忆替换被压缩的原始记忆
+
+        摘要放在原始记忆中最新一条的时间位置（时间索引和各二级索引中都是），
+        通过sources字段链接原始记忆的ID，原始记忆移入archive。压缩期间已被淘汰的记忆直接跳过。
+
+        Args:
+            groups: select_compaction_groups返回的分组
+            summaries: 与分组一一对应的摘要（带summary和importance属性），None表示跳过该组
+
+        Returns:
+            新增的摘要记忆
+        """
+        created = []
+        for group, summary in zip(groups, summaries):
+            if summary is None:
+                continue
+            sources = [self._memories[seq] for seq in group if seq in self._memories]
+            if not sources:
+                continue
+
+            related_chars: Dict[str, None] = {}
+            for source in sources:
+                if source.id is None:
+                    source.id = uuid.uuid4().hex
+                related_chars.update(dict.fromkeys(source.related_chars))
+            # 摘要至少与其中最重要的原始记忆同样重要
+            importance = max(source.importance for source in sources)
+            if summary.importance is not None:
+                importance = max(importance, summary.importance)
+
+            record = Memory(
+                content=summary.summary,
+                kind=MemoryType.SUMMARY,
+                importance=importance,
+                timestamp=sources[-1].timestamp,
+                related_chars=related_chars,
+                level=max(source.level for source in sources) + 1,
+                id=uuid.uuid4().hex,
+                extra={'sources': [source.id for source in sources]}
+            )
+            self._replace(group, record)
+            created.append(record)
+        return created
+
+    def _replace(self, seqs: List[int], summary: Memory) -> None:
+        """删除seqs中的记忆并移入archive，然后插入摘要"""
+        for seq in seqs:
+            source = self._memories.get(seq)
+            if source is None:
+                continue
+            self._remove(seq)
+            self.archive[source.id] = source
+        while len(self.archive) > COMPACTION_ARCHIVE_SIZE:
+            self.archive.popitem(last=False)
+        self._insert(summary)
+
+    def restore_compaction(self, summary: Union[Memory, Dict]) -> None:
+        """重放事件日志中的一次压缩：用摘要替换其sources列出的原始记忆"""
+        summary = Memory.coerce(summary)
+        source_ids = set(summary.extra.get('sources', ())) if summary.extra else set()
+        memories = self._memories
+        seqs = [
+            seq for seq in self._seqs
+            if seq in memories and memories[seq].id in source_ids
+        ]
+        self._replace(seqs, summary)
+        if len(self._memories) > self.max_size:
+            self._filter_memories()
+
     def summarize_memories(self, character_id: Optional[str] = None) -> str:
         """生成记忆摘要，可以选择性地针对特定角色"""
         memories_to_summarize = (
@@ -77,38 +537,62 @@ class MemoryStream:
         if not memories_to_summarize:
             return "没有相关记忆。"
 
-        # 按时间排序
-        memories_to_summarize.sort(
-            key=lambda x: datetime.fromisoformat(x['timestamp'])
-        )
+        # 记忆本身已按时间顺序保存，无需再排序
 
         # 生成摘要
         summary_parts = []
         for memory in memories_to_summarize:
-            time_str = datetime.fromisoformat(memory['timestamp']).strftime('%H:%M')
+            time_str = datetime.fromtimestamp(memory.timestamp).strftime('%H:%M')
             summary_parts.append(
-                f"[{time_str}] {memory.get('content', '未知事件')}"
+                f"[{time_str}] {memory.content or '未知事件'}"
             )
 
         return "\n".join(summary_parts)
 
+    def to_records(self) -> List[Dict]:
+        """导出可JSON序列化的记忆列表，已压缩的原始记忆带archived标记"""
+        # 时间戳只在序列化时转换为ISO字符串
+        return [
+            dict(memory.to_dict(), timestamp=datetime.fromtimestamp(memory.timestamp).isoformat())
+            for memory in self.memories
+        ] + [
+            dict(memory.to_dict(), timestamp=datetime.fromtimestamp(memory.timestamp).isoformat(), archived=True)
+            for memory in self.archive.values()
+        ]
+
+    def load_records(self, records: List[Dict]) -> None:
+        """用to_records导出的记录替换当前的全部记忆"""
+        self.memories = [record for record in records if not record.get('archived')]
+        for record in records:
+            if record.get('archived'):
+                memory = Memory.from_dict({k: v for k, v in record.items() if k != 'archived'})
+                self.archive[memory.id] = memory
+
+    def restore_memory(self, memory: Union[Memory, Dict]) -> None:
+        """按记忆原有的时间戳恢复一条记忆，用于重放事件日志"""
+        self._insert(Memory.coerce(memory))
+        if len(self._memories) > self.max_size:
+            self._filter_memories()
+
     def save_to_file(self, filepath: str) -> None:
         """将记忆流保存到文件"""
         with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(self.memories, f, ensure_ascii=False, indent=2)
+            json.dump(self.to_records(), f, ensure_ascii=False, indent=2)
 
     @classmethod
     def load_from_file(cls, filepath: str) -> 'MemoryStream':
         """从文件加载记忆流"""
         memory_stream = cls()
         with open(filepath, 'r', encoding='utf-8') as f:
-            memory_stream.memories = json.load(f)
+            memory_stream.load_records(json.load(f))
         return memory_stream
 
     def clear_old_memories(self, days: int = 7) -> None:
         """清理指定天数之前的记忆"""
-        cutoff_time = datetime.now() - timedelta(days=days)
-        self.memories = [
-            memory for memory in self.memories
-            if datetime.fromisoformat(memory['timestamp']) > cutoff_time
-        ]
\ No newline at end of file
+        # 过期记忆正好是时间索引的前缀，直接整体删除
+        cutoff = bisect_right(self._times, self.clock.now() - days * 86400)
+        for seq in self._seqs[:cutoff]:
+            self._remove(seq)
+        del self._times[:cutoff]
+        del self._seqs[:cutoff]
+        self._filter_memories()
@@ -0,0 +1,89 @@
+from typing import Dict, Iterable, List, Optional
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from models.room import Room
+
+class OccupancyIndex:
+    """小镇的在场索引：房间 -> 在场角色，角色 -> 所在房间
+
+    房间一侧直接使用Room.characters（按进入顺序排列的有序集合，与房间共享同一个对象），
+    所以进出房间、判断是否在场、统计人数和判断两个角色是否同处一室都是O(1)，
+    与房间里有多少角色无关。角色的所有移动都应经过place()，两侧始终一致。
+    """
+
+    def __init__(self, rooms: Iterable[Room] = ()):
+        self._rooms: Dict[str, Room] = {}
+        self._locations: Dict[str, str] = {}
+        for room in rooms:
+            self.add_room(room)
+
+    def add_room(self, room: Room) -> None:
+        """登记房间，房间中已有的角色一并登记"""
+        self._rooms[room.id] = room
+        for char_id in room.characters:
+            self._locations[char_id] = room.id
+
+    def clear(self) -> None:
+        """清空所有房间中的角色"""
+        for char_id, room_id in list(self._locations.items()):
+            self._rooms[room_id].remove_character(char_id)
+        self._locations.clear()
+
+    def place(self, char_id: str, room_id: str, force: bool = False) -> bool:
+        """把角色放进房间，并从原来的房间移出
+
+        Args:
+            char_id: 角色ID
+            room_id: 目标房间ID
+            force: 是否忽略房间容量上限（如放置初始位置或重放事件时）
+
+        Returns:
+            是否放置成功；房间不存在或已满时返回False，角色留在原处
+        """
+        room = self._rooms.get(room_id)
+        if room is None:
+            return False
+        old_room_id = self._locations.get(char_id)
+        if old_room_id == room_id:
+            return True
+        if not room.add_character(char_id, force):
+            return False
+        if old_room_id is not None:
+            self._rooms[old_room_id].remove_character(char_id)
+        self._locations[char_id] = room_id
+        return True
+
+    def remove(self, char_id: str) -> Optional[str]:
+        """把角色移出小镇，返回其原来所在的房间ID"""
+        room_id = self._locations.pop(char_id, None)
+        if room_id is not None:
+            self._rooms[room_id].remove_character(char_id)
+        return room_id
+
+    def room_of(self, char_id: str) -> Optional[str]:
+        """角色所在的房间ID"""
+        return self._locations.get(char_id)
+
+    def count(self, room_id: str) -> int:
+        """房间中的角色数"""
+        room = self._rooms.get(room_id)
+        return len(room.characters) if room is not None else 0
+
+    def has_space(self, room_id: str) -> bool:
+        """房间是否还能进入新角色"""
+        room = self._rooms.get(room_id)
+        return room is not None and not room.is_full
+
+    def together(self, char_id: str, other_id: str) -> bool:
+        """两个角色是否在同一个房间"""
+        room_id = self._locations.get(char_id)
+        return room_id is not None and room_id == self._locations.get(other_id)
+
+    def colocated(self, char_id: str) -> List[str]:
+        """与角色在同一个房间的其他角色，按进入房间的顺序"""
+        room_id = self._locations.get(char_id)
+        if room_id is None:
+            return []
+        return [other_id for other_id in self._rooms[room_id].characters if other_id != char_id]
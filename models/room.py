@@ -1,7 +1,12 @@
 from typing import Dict, List, Optional
-from dataclasses import dataclass
-from datetime import datetime
+from dataclasses import dataclass, field
 import json
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.settings import MAX_CHARACTERS
+from utils.sim_clock import SimClock
 
 @dataclass
 class Room:
@@ -12,17 +17,23 @@ class Room:
     items: List[str]
     ambient_sounds: List[str]
     time_features: Dict[str, str]
-    characters: List[str] = None  # 当前在房间中的角色ID列表
+    characters: Dict[str, None] = None  # 当前在房间中的角色ID，按进入顺序排列的有序集合
     state: Dict = None  # 房间状态（如光照、温度等）
+    capacity: int = MAX_CHARACTERS  # 最多容纳的角色数
+    clock: SimClock = field(default=None, repr=False, compare=False)  # 模拟时钟，默认为真实时间
 
     def __post_init__(self):
+        if self.clock is None:
+            self.clock = SimClock()
         if self.characters is None:
-            self.characters = []
+            self.characters = {}
         if self.state is None:
             self.state = self._initialize_state()
+        # 描述中的在场角色文本，人员变化时重新生成
+        self._occupant_text: Optional[str] = None
 
     @classmethod
-    def from_config(cls, room_data: Dict) -> 'Room':
+    def from_config(cls, room_data: Dict, clock: Optional[SimClock] = None) -> 'Room':
         """从配置文件创建房间实例"""
         return cls(
             id=room_data['id'],
@@ -31,7 +42,9 @@ class Room:
             connected_to=room_data['connected_to'],
             items=room_data['items'],
             ambient_sounds=room_data['ambient_sounds'],
-            time_features=room_data['time_features']
+            time_features=room_data['time_features'],
+            capacity=room_data.get('capacity', MAX_CHARACTERS),
+            clock=clock
         )
 
     def _initialize_state(self) -> Dict:
@@ -46,40 +59,53 @@ class Room:
 
     def get_current_description(self) -> str:
         """根据当前时间和状态获取房间描述"""
-        hour = datetime.now().hour
-        time_of_day = (
-            'morning' if 6 <= hour < 12
-            else 'afternoon' if 12 <= hour < 18
-            else 'evening'
-        )
-
         description = [
             self.description,
-            self.time_features[time_of_day],
+            self.time_features[self.clock.time_of_day()],
             f"当前房间温度{self.state['temperature']}℃，"
             f"光照状态{self.state['lighting']}。"
         ]
 
         if self.characters:
-            description.append(f"房间内有：{', '.join(self.characters)}")
+            if self._occupant_text is None:
+                self._occupant_text = f"房间内有：{', '.join(self.characters)}"
+            description.append(self._occupant_text)
 
         return '\n'.join(description)
 
-    def add_character(self, character_id: str) -> None:
-        """角色进入房间"""
-        if character_id not in self.characters:
-            self.characters.append(character_id)
-            # 根据人数调整房间状态
-            self._adjust_state_for_occupancy()
+    @property
+    def is_full(self) -> bool:
+        """房间是否已达到容量上限"""
+        return len(self.characters) >= self.capacity
+
+    def add_character(self, character_id: str, force: bool = False) -> bool:
+        """角色进入房间
+
+        Args:
+            character_id: 角色ID
+            force: 是否忽略容量上限（如恢复存档时）
+
+        Returns:
+            角色是否在房间中；房间已满时返回False
+        """
+        if character_id in self.characters:
+            return True
+        if self.is_full and not force:
+            return False
+        self.characters[character_id] = None
+        # 根据人数调整房间状态
+        self._adjust_state_for_occupancy()
+        return True
 
     def remove_character(self, character_id: str) -> None:
         """角色离开房间"""
         if character_id in self.characters:
-            self.characters.remove(character_id)
+            del self.characters[character_id]
             self._adjust_state_for_occupancy()
 
     def _adjust_state_for_occupancy(self) -> None:
         """根据房间占用情况调整状态"""
+        self._occupant_text = None
         num_characters = len(self.characters)
         
         # 调整噪音级别
@@ -105,10 +131,10 @@ class Room:
         interactions = [f"查看{item}" for item in self.items]
         
         # 根据时间添加特定互动
-        hour = datetime.now().hour
-        if 6 <= hour < 12:
+        time_of_day = self.clock.time_of_day()
+        if time_of_day == 'morning':
             interactions.extend(["打开窗帘", "整理房间"])
-        elif 12 <= hour < 18:
+        elif time_of_day == 'afternoon':
             interactions.extend(["调整空调", "休息一会"])
         else:
             interactions.extend(["开灯", "准备休息"])
@@ -121,7 +147,7 @@ class Room:
 
     def get_ambient_sound(self) -> str:
         """获取当前环境音效"""
-        hour = datetime.now().hour
+        hour = self.clock.hour()
         if 6 <= hour < 9:  # 清晨
             return "早晨的鸟鸣声"
         elif 9 <= hour < 18:  # 白天
@@ -139,6 +165,7 @@ class Room:
             'items': self.items,
             'ambient_sounds': self.ambient_sounds,
             'time_features': self.time_features,
-            'characters': self.characters,
-            'state': self.state
+            'characters': list(self.characters),
+            'state': self.state,
+            'capacity': self.capacity
         }
\ No newline at end of file
@@ -0,0 +1,134 @@
+from typing import Dict, FrozenSet, Iterable, List, Mapping, Optional, Tuple
+from collections import deque
+import json
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from models.room import Room
+
+class TownMap:
+    """小镇的房间连通图
+
+    邻接关系保存为集合，启动时（以及布局变化时）对每个房间做一次BFS，
+    得到所有房间之间的最短距离和最短路径上的下一步，之后的连通、距离、
+    寻路查询都是字典查找。k跳邻域按需计算并缓存，布局变化时清空。
+    连通关系按配置中的connected_to处理，是有向的；指向不存在房间的连接被忽略。
+    """
+
+    def __init__(self, adjacency: Optional[Mapping[str, Iterable[str]]] = None):
+        # 房间ID -> 相邻房间ID（保持配置中的顺序，保证随机选择可复现）
+        self._exits: Dict[str, Tuple[str, ...]] = {}
+        self._adjacency: Dict[str, FrozenSet[str]] = {}
+        # 起点 -> {终点: 最短距离}
+        self._distances: Dict[str, Dict[str, int]] = {}
+        # 起点 -> {终点: 最短路径上的第一步}
+        self._next_hops: Dict[str, Dict[str, str]] = {}
+        self._neighborhoods: Dict[Tuple[str, int], FrozenSet[str]] = {}
+        self.set_layout(adjacency or {})
+
+    @classmethod
+    def from_rooms(cls, rooms: Iterable[Room]) -> 'TownMap':
+        """从房间对象的connected_to创建"""
+        return cls({room.id: room.connected_to for room in rooms})
+
+    @classmethod
+    def from_config(cls, path: str = 'config/room_layout.json') -> 'TownMap':
+        """从房间布局配置文件创建"""
+        with open(path, 'r', encoding='utf-8') as f:
+            room_data = json.load(f)
+        return cls({room['id']: room['connected_to'] for room in room_data['rooms']})
+
+    def set_layout(self, adjacency: Mapping[str, Iterable[str]]) -> None:
+        """替换整个布局并重新计算最短路径"""
+        exits = {}
+        for room_id, connected in adjacency.items():
+            # 去重并去掉自环和指向未知房间的连接
+            exits[room_id] = tuple(dict.fromkeys(
+                other for other in connected if other in adjacency and other != room_id
+            ))
+        self._exits = exits
+        self._adjacency = {room_id: frozenset(others) for room_id, others in exits.items()}
+        self._compute_paths()
+
+    def connect(self, from_room: str, to_room: str) -> None:
+        """新增一条从from_room到to_room的连接并重新计算最短路径"""
+        layout = dict(self._exits)
+        layout.setdefault(to_room, ())
+        layout[from_room] = layout.get(from_room, ()) + (to_room,)
+        self.set_layout(layout)
+
+    def _compute_paths(self) -> None:
+        """从每个房间做一次BFS，O(V·(V+E))"""
+        self._distances = {}
+        self._next_hops = {}
+        self._neighborhoods = {}
+        for source, source_exits in self._exits.items():
+            distances = {source: 0}
+            next_hops = {}
+            queue = deque()
+            for room_id in source_exits:
+                distances[room_id] = 1
+                next_hops[room_id] = room_id
+                queue.append(room_id)
+            while queue:
+                room_id = queue.popleft()
+                for other in self._exits[room_id]:
+                    if other not in distances:
+                        distances[other] = distances[room_id] + 1
+                        # 沿途房间的第一步与其前驱相同
+                        next_hops[other] = next_hops[room_id]
+                        queue.append(other)
+            self._distances[source] = distances
+            self._next_hops[source] = next_hops
+
+    def __contains__(self, room_id: str) -> bool:
+        return room_id in self._exits
+
+    def __len__(self) -> int:
+        return len(self._exits)
+
+    def neighbors(self, room_id: str) -> Tuple[str, ...]:
+        """房间的相邻房间，按配置顺序"""
+        return self._exits.get(room_id, ())
+
+    def is_adjacent(self, from_room: str, to_room: str) -> bool:
+        """能否从from_room一步走到to_room"""
+        return to_room in self._adjacency.get(from_room, ())
+
+    def distance(self, from_room: str, to_room: str) -> Optional[int]:
+        """两个房间之间的最短步数，不可达时返回None"""
+        return self._distances.get(from_room, {}).get(to_room)
+
+    def next_hop(self, from_room: str, to_room: str) -> Optional[str]:
+        """从from_room走向to_room的下一个房间，已在目的地或不可达时返回None"""
+        return self._next_hops.get(from_room, {}).get(to_room)
+
+    def path(self, from_room: str, to_room: str) -> List[str]:
+        """从from_room到to_room的最短路径（含起点和终点），不可达时返回空列表"""
+        if self.distance(from_room, to_room) is None:
+            return []
+        path = [from_room]
+        while path[-1] != to_room:
+            path.append(self.next_hop(path[-1], to_room))
+        return path
+
+    def neighborhood(self, room_id: str, hops: int = 1) -> FrozenSet[str]:
+        """hops步以内可以到达的房间（包括房间本身）
+
+        Args:
+            room_id: 中心房间ID
+            hops: 最大步数
+
+        Returns:
+            房间ID集合，结果会被缓存
+        """
+        key = (room_id, hops)
+        neighborhood = self._neighborhoods.get(key)
+        if neighborhood is None:
+            neighborhood = frozenset(
+                other for other, distance in self._distances.get(room_id, {}).items()
+                if distance <= hops
+            )
+            self._neighborhoods[key] = neighborhood
+        return neighborhood
@@ -0,0 +1,19 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from models.memory_store import MemoryStore
+
+def test_search_does_not_match_prefixed_char_id():
+    """角色ID是另一个角色ID的前缀时，检索不能返回另一个角色的记忆"""
+    store = MemoryStore(':memory:')
+    li = store.stream('li')
+    xiaomei = store.stream('li_xiaomei')
+    for _ in range(20):
+        xiaomei.add_memory({'type': 'action', 'content': '在实验室做实验', 'importance': 5})
+    li.add_memory({'type': 'action', 'content': '在实验室喝咖啡', 'importance': 5})
+
+    assert [m.content for m in li.search('实验室', limit=1)] == ['在实验室喝咖啡']
+    assert [m.content for m in li.retrieve('实验室')] == ['在实验室喝咖啡']
+    assert len(xiaomei.search('实验室', limit=50)) == 20
+    store.close()
@@ -1,36 +1,258 @@
+import asyncio
+import functools
 import requests
 import json
-from typing import Dict, List, Optional, Union
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Union
+from dataclasses import dataclass
 from datetime import datetime
 import os
 import sys
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config.settings import API_KEY, API_BASE_URL, DEFAULT_TEMPERATURE, MAX_TOKENS
+from config.settings import (
+    API_KEY, API_BASE_URL, DEFAULT_TEMPERATURE, MAX_TOKENS, MAX_CONCURRENT_REQUESTS,
+    CACHE_ENABLED, CACHE_MAX_TEMPERATURE, CACHE_HIGH_TEMPERATURE,
+    TURN_MAX_RETRIES, RELATIONSHIP_DELTA_RANGE
+)
+from utils.llm_backend import LLMBackend, create_backend
+from utils.response_cache import ResponseCache
+from utils.prompt_builder import PromptBuilder, estimate_tokens
+from utils.resilience import (
+    APIError, APIConnectionError, RateLimitError, ServerError, CircuitOpenError,
+    RateLimiter, RetryPolicy, CircuitBreaker, parse_retry_after
+)
+
+@dataclass
+class TurnDecision:
+    """角色一回合的结构化决策"""
+    action: str  # 行为描述
+    utterance: Optional[str] = None  # 想说的话，不说话时为None
+    target: Optional[str] = None  # 说话对象的角色ID
+    mood: Optional[str] = None  # 行动后的心情
+    relationship_delta: int = 0  # 与说话对象的关系值变化
+
+    @classmethod
+    def from_content(cls, content: str) -> Optional['TurnDecision']:
+        """从模型返回的JSON文本解析决策，格式不符合要求时返回None"""
+        data = _load_json_object(content)
+        if data is None:
+            return None
+
+        action = data.get('action')
+        if not isinstance(action, str) or not action.strip():
+            return None
+
+        optional_fields = {}
+        for key in ('utterance', 'target', 'mood'):
+            value = data.get(key)
+            if value is not None and not isinstance(value, str):
+                return None
+            optional_fields[key] = (value or '').strip() or None
+
+        try:
+            delta = int(data.get('relationship_delta') or 0)
+        except (TypeError, ValueError):
+            return None
+        low, high = RELATIONSHIP_DELTA_RANGE
+        delta = max(low, min(high, delta))
+
+        return cls(action=action.strip(), relationship_delta=delta, **optional_fields)
+
+@dataclass
+class MemorySummary:
+    """一组记忆压缩后的摘要"""
+    summary: str  # 摘要内容
+    importance: Optional[int] = None  # 模型评估的重要性（1-10）
+
+    @classmethod
+    def parse_batch(cls, content: str, group_count: int) -> Optional[List[Optional['MemorySummary']]]:
+        """从模型返回的JSON文本解析多组摘要
+
+        Returns:
+            与各组一一对应的摘要列表，缺失或格式错误的组为None；
+            整体格式不符合要求时返回None
+        """
+        data = _load_json_object(content)
+        if data is None or not isinstance(data.get('summaries'), list):
+            return None
+
+        summaries: List[Optional['MemorySummary']] = [None] * group_count
+        for i, item in enumerate(data['summaries']):
+            if not isinstance(item, dict):
+                continue
+            text = item.get('summary')
+            if not isinstance(text, str) or not text.strip():
+                continue
+            try:
+                index = int(item.get('group', i + 1)) - 1
+            except (TypeError, ValueError):
+                continue
+            if not 0 <= index < group_count:
+                continue
+            try:
+                importance = max(1, min(10, int(item['importance'])))
+            except (KeyError, TypeError, ValueError):
+                importance = None
+            summaries[index] = cls(summary=text.strip(), importance=importance)
+        return summaries
+
+def _load_json_object(content: str) -> Optional[Dict]:
+    """从模型返回的文本中取出JSON对象，无法解析时返回None"""
+    # 模型有时会用代码块包裹JSON，截取最外层的大括号
+    start, end = content.find('{'), content.rfind('}')
+    if start == -1 or end <= start:
+        return None
+    try:
+        data = json.loads(content[start:end + 1])
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
 
 class DeepSeekClient:
-    def __init__(self):
+    def __init__(
+        self,
+        backend: Optional[LLMBackend] = None,
+        cache: Optional[ResponseCache] = None,
+        cache_high_temperature: bool = CACHE_HIGH_TEMPERATURE,
+        rate_limiter: Optional[RateLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None
+    ):
         self.api_key = API_KEY
         self.base_url = API_BASE_URL
         self.headers = {
             'Authorization': f'Bearer {self.api_key}',
             'Content-Type': 'application/json'
         }
+        self.backend = backend or create_backend()
+        if cache is None and CACHE_ENABLED:
+            cache = ResponseCache()
+        self.cache = cache
+        self.cache_high_temperature = cache_high_temperature
+        if rate_limiter is None:
+            rate_limiter = RateLimiter() if self.backend.rate_limited else RateLimiter(None, None)
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
 
     def _make_request(self, endpoint: str, payload: Dict) -> Dict:
-        """发送API请求"""
+        """发送API请求
+
+        Raises:
+            APIError: 重试后仍然失败，或熔断器处于打开状态
+        """
+        estimated_tokens = self._estimate_request_tokens(payload)
+        response = self._send(endpoint, payload, estimated_tokens)
         try:
-            response = requests.post(
-                f"{self.base_url}/{endpoint}",
-                headers=self.headers,
-                json=payload,
-                timeout=30
-            )
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            print(f"API请求错误: {str(e)}")
-            return {'error': str(e)}
+            data = response.json()
+        except ValueError as e:
+            raise APIError(f"无法解析API响应: {str(e)}", response.status_code)
+
+        actual_tokens = (data.get('usage') or {}).get('total_tokens')
+        if actual_tokens is not None:
+            self.rate_limiter.settle(estimated_tokens, actual_tokens)
+        return data
+
+    def _send(
+        self,
+        endpoint: str,
+        payload: Dict,
+        estimated_tokens: int,
+        stream: bool = False
+    ) -> requests.Response:
+        """在限流、重试和熔断保护下发送请求，返回成功的响应对象"""
+        for attempt in range(self.retry_policy.max_retries + 1):
+            if not self.circuit_breaker.allow_request():
+                raise CircuitOpenError("API暂时不可用，请求已被熔断")
+            self.rate_limiter.acquire(estimated_tokens)
+
+            try:
+                response = self.backend.post(
+                    f"{self.base_url}/{endpoint}",
+                    self.headers,
+                    payload,
+                    stream=stream
+                )
+            except requests.exceptions.RequestException as e:
+                error = APIConnectionError(str(e))
+            else:
+                error = self._error_from_response(response)
+                if error is None:
+                    self.circuit_breaker.record_success()
+                    return response
+                response.close()
+
+            # 失败的请求没有产生输出，归还本次预留的token，避免连续的429/503耗尽配额
+            self.rate_limiter.settle(estimated_tokens, 0)
+            if not error.retryable:
+                # 4xx等客户端错误说明请求本身有问题，不计入熔断
+                self.circuit_breaker.record_success()
+                raise error
+            self.circuit_breaker.record_failure()
+            if attempt >= self.retry_policy.max_retries:
+                raise error
+            time.sleep(self.retry_policy.get_delay(attempt, error.retry_after))
+
+    @staticmethod
+    def _error_from_response(response: requests.Response) -> Optional[APIError]:
+        """根据HTTP状态码生成对应的错误，成功时返回None"""
+        status = response.status_code
+        if status < 400:
+            return None
+        message = f"API返回错误状态码 {status}"
+        retry_after = parse_retry_after(response.headers.get('Retry-After'))
+        if status == 429:
+            return RateLimitError(message, status, retry_after)
+        if status >= 500:
+            return ServerError(message, status, retry_after)
+        return APIError(message, status)
+
+    @staticmethod
+    def _estimate_request_tokens(payload: Dict) -> int:
+        """估计一次请求消耗的token数（输入token数加上最大输出长度）"""
+        prompt_tokens = sum(
+            estimate_tokens(m.get('content', '')) for m in payload.get('messages', [])
+        )
+        return prompt_tokens + payload.get('max_tokens', MAX_TOKENS)
+
+    def _chat_completion(self, payload: Dict, refresh: bool = False) -> Dict:
+        """发送对话补全请求，可缓存的请求优先从缓存读取
+
+        Args:
+            payload: 请求内容
+            refresh: 为True时跳过缓存读取，总是发送请求（结果仍会写入缓存）
+        """
+        cacheable = self.cache is not None and self._is_cacheable(payload)
+        if cacheable and not refresh:
+            cached = self.cache.get(payload)
+            if cached is not None:
+                return cached
+
+        response = self._make_request('chat/completions', payload)
+        if cacheable:
+            self.cache.put(payload, response)
+        return response
+
+    def _discard_cached(self, payload: Dict) -> None:
+        """删除无法解析的缓存响应，避免之后的请求一直命中它"""
+        if self.cache is not None and self._is_cacheable(payload):
+            self.cache.delete(payload)
+
+    def _is_cacheable(self, payload: Dict) -> bool:
+        """低温度的确定性请求默认可缓存，高温度请求需显式开启"""
+        if self.cache_high_temperature:
+            return True
+        return payload.get('temperature', DEFAULT_TEMPERATURE) <= CACHE_MAX_TEMPERATURE
+
+    def get_cache_stats(self) -> Optional[Dict[str, float]]:
+        """获取响应缓存统计，未启用缓存时返回None"""
+        return self.cache.stats() if self.cache is not None else None
+
+    def get_backend_stats(self) -> Dict[str, float]:
+        """获取后端统计（HTTP后端为连接复用情况）"""
+        return self.backend.stats()
 
     def generate_response(
         self,
@@ -49,13 +271,108 @@ class DeepSeekClient:
 
         Returns:
             生成的响应文本
+
+        Raises:
+            APIError: API调用失败
+        """
+        payload = self._build_chat_payload(
+            prompt, temperature, max_tokens, character_desc
+        )
+
+        response = self._chat_completion(payload)
+        return response.get('choices', [{}])[0].get('message', {}).get('content', '')
+
+    def stream_response(
+        self,
+        prompt: str,
+        temperature: float = DEFAULT_TEMPERATURE,
+        max_tokens: int = MAX_TOKENS,
+        character_desc: Optional[str] = None
+    ) -> Iterator[str]:
+        """以流式方式生成AI响应，逐块返回生成的文本
+
+        参数同generate_response。请求使用SSE（stream: true），
+        每收到一个增量片段就立即产出，无需等待完整响应。
+
+        Yields:
+            响应文本片段
+
+        Raises:
+            APIError: API调用失败或流在中途断开
+        """
+        payload = self._build_chat_payload(
+            prompt, temperature, max_tokens, character_desc
+        )
+        payload['stream'] = True
+        # 让服务端在最后一个事件中附带token用量，用于修正限流器的预估
+        payload['stream_options'] = {'include_usage': True}
+
+        # 只有建立流之前的失败会重试，已输出的片段无法撤回
+        estimated_tokens = self._estimate_request_tokens(payload)
+        response = self._send(
+            'chat/completions',
+            payload,
+            estimated_tokens,
+            stream=True
+        )
+        chunks = []
+        usage = None
+        try:
+            with response:
+                for line in response.iter_lines():
+                    event = self._parse_stream_line(line)
+                    if event is None:
+                        break
+                    usage = event.get('usage') or usage
+                    choices = event.get('choices') or [{}]
+                    chunk = choices[0].get('delta', {}).get('content')
+                    if chunk:
+                        chunks.append(chunk)
+                        yield chunk
+        except requests.exceptions.RequestException as e:
+            raise APIConnectionError(f"流式响应中断: {str(e)}")
+        finally:
+            # 流正常结束、中断或被调用方提前关闭时都按实际用量结算
+            actual_tokens = (usage or {}).get('total_tokens')
+            if actual_tokens is None:
+                actual_tokens = (
+                    sum(estimate_tokens(m.get('content', '')) for m in payload['messages'])
+                    + estimate_tokens(''.join(chunks))
+                )
+            self.rate_limiter.settle(estimated_tokens, actual_tokens)
+
+    @staticmethod
+    def _parse_stream_line(line: bytes) -> Optional[Dict]:
+        """解析一行SSE数据
+
+        Returns:
+            事件对象；非数据行或无法解析时返回空字典；流结束时返回None
         """
+        if not line or not line.startswith(b'data:'):
+            return {}
+        data = line[len(b'data:'):].strip()
+        if data == b'[DONE]':
+            return None
+        try:
+            event = json.loads(data)
+        except ValueError:
+            return {}
+        return event if isinstance(event, dict) else {}
+
+    def _build_chat_payload(
+        self,
+        prompt: str,
+        temperature: float,
+        max_tokens: int,
+        character_desc: Optional[str]
+    ) -> Dict:
+        """构建对话补全请求体"""
         # 构建系统提示
         system_prompt = "你是一个虚拟小镇中的居民。"
         if character_desc:
             system_prompt += f"\n{character_desc}"
 
-        payload = {
+        return {
             'model': 'deepseek-chat',
             'messages': [
                 {'role': 'system', 'content': system_prompt},
@@ -65,12 +382,6 @@ class DeepSeekClient:
             'max_tokens': max_tokens
         }
 
-        response = self._make_request('chat/completions', payload)
-        if 'error' in response:
-            return f"生成响应时出错: {response['error']}"
-
-        return response.get('choices', [{}])[0].get('message', {}).get('content', '')
-
     def analyze_emotion(
         self,
         text: str,
@@ -85,9 +396,11 @@ class DeepSeekClient:
         Returns:
             情感分析结果，包含情感类型和强度
         """
-        prompt = f"分析以下文本的情感:\n{text}"
+        builder = PromptBuilder('emotion')
+        builder.add(f"分析以下文本的情感:\n{text}", priority=20, truncatable=True)
         if context:
-            prompt += f"\n上下文信息:\n{context}"
+            builder.add(f"\n上下文信息:\n{context}", priority=10, truncatable=True)
+        prompt = builder.build()
 
         payload = {
             'model': 'deepseek-chat',
@@ -98,12 +411,14 @@ class DeepSeekClient:
                 },
                 {'role': 'user', 'content': prompt}
             ],
-            'temperature': 0.3  # 使用较低的温度以获得更稳定的分析结果
+            'temperature': 0.3,  # 使用较低的温度以获得更稳定的分析结果
+            'max_tokens': builder.max_tokens
         }
 
-        response = self._make_request('chat/completions', payload)
-        if 'error' in response:
-            return {'emotion': 'unknown', 'intensity': 0.0, 'error': response['error']}
+        try:
+            response = self._chat_completion(payload)
+        except APIError as e:
+            return {'emotion': 'unknown', 'intensity': 0.0, 'error': str(e)}
 
         # 解析响应获取情感信息
         analysis = response.get('choices', [{}])[0].get('message', {}).get('content', '')
@@ -161,17 +476,108 @@ class DeepSeekClient:
         Returns:
             生成的行动描述
         """
-        prompt = f"角色描述：{character_desc}\n"
-        prompt += f"当前情境：{situation}\n"
-        prompt += f"可用行动：{', '.join(available_actions)}\n"
-        prompt += "请根据角色特点和当前情境，选择一个合适的行动并描述具体过程。"
+        builder = PromptBuilder('action')
+        builder.add(f"角色描述：{character_desc}\n", priority=20)
+        builder.add(f"当前情境：{situation}\n", priority=15, truncatable=True)
+        builder.add(f"可用行动：{', '.join(available_actions)}\n", priority=10, truncatable=True)
+        builder.add("请根据角色特点和当前情境，选择一个合适的行动并描述具体过程。", priority=20)
 
         return self.generate_response(
-            prompt,
+            builder.build(),
             temperature=0.7,  # 使用较高的温度以获得更有创意的行动
+            max_tokens=builder.max_tokens,
             character_desc=character_desc
         )
 
+    def generate_turn(
+        self,
+        prompt: str,
+        character_desc: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = MAX_TOKENS,
+        max_retries: int = TURN_MAX_RETRIES
+    ) -> Optional[TurnDecision]:
+        """用一次JSON模式的调用生成角色一回合的行为、对话和心情
+
+        Args:
+            prompt: 描述回合情境并要求JSON输出的提示
+            character_desc: 角色描述（可选）
+            temperature: 温度参数
+            max_tokens: 最大生成token数
+            max_retries: JSON格式错误时的重试次数
+
+        Returns:
+            解析后的回合决策；多次重试后仍无法解析时返回None
+
+        Raises:
+            APIError: API调用失败
+        """
+        payload = self._build_chat_payload(
+            prompt, temperature, max_tokens, character_desc
+        )
+        payload['response_format'] = {'type': 'json_object'}
+
+        for attempt in range(max_retries + 1):
+            # 重试时跳过缓存，否则会反复拿到同一个格式错误的响应
+            response = self._chat_completion(payload, refresh=attempt > 0)
+            content = response.get('choices', [{}])[0].get('message', {}).get('content', '')
+            decision = TurnDecision.from_content(content or '')
+            if decision is not None:
+                return decision
+            self._discard_cached(payload)
+        return None
+
+    def summarize_memory_groups(
+        self,
+        groups: List[List[str]],
+        character_desc: Optional[str] = None,
+        temperature: float = 0.3,
+        max_retries: int = TURN_MAX_RETRIES
+    ) -> List[Optional[MemorySummary]]:
+        """用一次JSON模式的调用把多组记忆分别概括为摘要
+
+        Args:
+            groups: 记忆分组，每组为按时间排列的记忆内容
+            character_desc: 记忆所属角色的描述（可选）
+            temperature: 温度参数
+            max_retries: JSON格式错误时的重试次数
+
+        Returns:
+            与groups一一对应的摘要列表，无法概括的组为None
+
+        Raises:
+            APIError: API调用失败
+        """
+        builder = PromptBuilder('reflection')
+        builder.add(
+            "下面是一个角色按时间分组的旧记忆。请把每组概括为一条简短的摘要，"
+            "保留人物、地点、事件和关系变化等长期有用的信息。\n",
+            priority=30
+        )
+        # 按条目总数均分预算，保证每组的每条记忆都能出现在提示中
+        item_limit = max(20, (builder.budget - 200) // max(1, sum(len(group) for group in groups)))
+        for i, group in enumerate(groups, 1):
+            builder.add_items(f"第{i}组：\n", group, priority=10, item_limit=item_limit)
+        builder.add(
+            '请只输出一个JSON对象，格式为{"summaries": [{"group": 组号, '
+            '"summary": 摘要（不超过60个字）, "importance": 1到10的整数}, ...]}',
+            priority=30
+        )
+
+        payload = self._build_chat_payload(
+            builder.build(), temperature, builder.max_tokens, character_desc
+        )
+        payload['response_format'] = {'type': 'json_object'}
+
+        for attempt in range(max_retries + 1):
+            response = self._chat_completion(payload, refresh=attempt > 0)
+            content = response.get('choices', [{}])[0].get('message', {}).get('content', '')
+            summaries = MemorySummary.parse_batch(content or '', len(groups))
+            if summaries is not None:
+                return summaries
+            self._discard_cached(payload)
+        return [None] * len(groups)
+
     def generate_dialogue(
         self,
         speaker_desc: str,
@@ -190,15 +596,127 @@ class DeepSeekClient:
         Returns:
             生成的对话内容
         """
-        prompt = f"说话者：{speaker_desc}\n"
-        prompt += f"听众：{listener_desc}\n"
-        prompt += f"上下文：{context}\n"
+        builder = PromptBuilder('dialogue')
+        builder.add(f"说话者：{speaker_desc}\n", priority=20)
+        builder.add(f"听众：{listener_desc}\n", priority=20)
+        builder.add(f"上下文：{context}\n", priority=10, truncatable=True)
         if topic:
-            prompt += f"主题：{topic}\n"
-        prompt += "请生成一段自然的对话内容。"
+            builder.add(f"主题：{topic}\n", priority=15)
+        builder.add("请生成一段自然的对话内容。", priority=20)
 
         return self.generate_response(
-            prompt,
+            builder.build(),
             temperature=0.8,  # 使用较高的温度以获得更自然的对话
+            max_tokens=builder.max_tokens,
             character_desc=speaker_desc
-        )
\ No newline at end of file
+        )
+
+
+class AsyncDeepSeekClient:
+    """DeepSeekClient的异步版本
+
+    HTTP请求仍由同步客户端完成，但被放到线程池中执行，
+    因此多个角色的LLM调用可以同时进行。并发数由信号量限制。
+    线程池由客户端自己持有而不是使用事件循环的默认线程池，因此取消等待中的
+    调用后，asyncio.run()退出时不必等待仍在进行的HTTP请求结束，其结果被丢弃。
+    """
+
+    def __init__(
+        self,
+        client: Optional[DeepSeekClient] = None,
+        max_concurrency: int = MAX_CONCURRENT_REQUESTS
+    ):
+        self.client = client or DeepSeekClient()
+        self.max_concurrency = max_concurrency
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """获取并发信号量（每个事件循环各自创建，多次调用asyncio.run()时不会跨循环共用）"""
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    async def _run(self, func, *args, **kwargs):
+        """在并发限制内于工作线程中执行同步调用"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_concurrency, thread_name_prefix='llm'
+            )
+        async with self._get_semaphore():
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, functools.partial(func, *args, **kwargs)
+            )
+
+    def close(self) -> None:
+        """停止工作线程，放弃尚未开始的调用"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def generate_response(
+        self,
+        prompt: str,
+        temperature: float = DEFAULT_TEMPERATURE,
+        max_tokens: int = MAX_TOKENS,
+        character_desc: Optional[str] = None
+    ) -> str:
+        """异步生成AI响应，参数同DeepSeekClient.generate_response"""
+        return await self._run(
+            self.client.generate_response,
+            prompt,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            character_desc=character_desc
+        )
+
+    async def generate_action(
+        self,
+        character_desc: str,
+        situation: str,
+        available_actions: List[str]
+    ) -> str:
+        """异步生成角色行动，参数同DeepSeekClient.generate_action"""
+        return await self._run(
+            self.client.generate_action,
+            character_desc,
+            situation,
+            available_actions
+        )
+
+    async def generate_turn(
+        self,
+        prompt: str,
+        character_desc: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = MAX_TOKENS,
+        max_retries: int = TURN_MAX_RETRIES
+    ) -> Optional[TurnDecision]:
+        """异步生成回合决策，参数同DeepSeekClient.generate_turn"""
+        return await self._run(
+            self.client.generate_turn,
+            prompt,
+            character_desc=character_desc,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            max_retries=max_retries
+        )
+
+    async def generate_dialogue(
+        self,
+        speaker_desc: str,
+        listener_desc: str,
+        context: str,
+        topic: Optional[str] = None
+    ) -> str:
+        """异步生成对话内容，参数同DeepSeekClient.generate_dialogue"""
+        return await self._run(
+            self.client.generate_dialogue,
+            speaker_desc,
+            listener_desc,
+            context,
+            topic
+        )
@@ -0,0 +1,64 @@
+from typing import List
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.settings import EMBEDDING_DIM, EMBEDDING_NGRAMS
+
+_HASH_PRIME = np.uint64(1099511628211)  # FNV-1a的64位质数
+_HASH_MIX = np.uint64(0x9E3779B97F4A7C15)
+_BATCH_SIZE = 2048  # 每批文本数，限制中间数组的内存占用
+
+def embed_texts(texts: List[str], dim: int = EMBEDDING_DIM) -> np.ndarray:
+    """批量计算文本的哈希字符n-gram向量（每行L2归一化）
+
+    完全在本地计算，不依赖模型或网络。所有文本拼接成一个码位数组，
+    n-gram的哈希、分桶和累加都在NumPy上向量化完成。相似的文本共享较多
+    n-gram，向量点积即为余弦相似度。
+
+    Args:
+        texts: 输入文本列表
+        dim: 向量维度
+
+    Returns:
+        形状为(len(texts), dim)的float32矩阵，空文本对应全零行
+    """
+    if len(texts) > _BATCH_SIZE:
+        return np.vstack([
+            embed_texts(texts[i:i + _BATCH_SIZE], dim)
+            for i in range(0, len(texts), _BATCH_SIZE)
+        ])
+
+    texts = [text.lower() for text in texts]
+    matrix = np.zeros((len(texts), dim), dtype=np.float32)
+    lengths = np.fromiter((len(text) for text in texts), dtype=np.int64, count=len(texts))
+    if not lengths.sum():
+        return matrix
+
+    codes = np.frombuffer("".join(texts).encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+    owners = np.repeat(np.arange(len(texts)), lengths)
+
+    for n in EMBEDDING_NGRAMS:
+        if len(codes) < n:
+            continue
+        count = len(codes) - n + 1
+        # 只保留不跨越两条文本的窗口
+        valid = owners[:count] == owners[n - 1:]
+        hashes = np.full(count, n, dtype=np.uint64)
+        for offset in range(n):
+            hashes = (hashes ^ codes[offset:offset + count]) * _HASH_PRIME
+        hashes = hashes[valid] * _HASH_MIX
+        buckets = (hashes >> np.uint64(32)) % np.uint64(dim)
+        signs = np.where(hashes >> np.uint64(63), 1.0, -1.0)
+        flat = owners[:count][valid] * dim + buckets.astype(np.int64)
+        matrix += np.bincount(flat, weights=signs, minlength=matrix.size).reshape(matrix.shape).astype(np.float32)
+
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+def embed_text(text: str, dim: int = EMBEDDING_DIM) -> np.ndarray:
+    """计算单条文本的哈希字符n-gram向量（L2归一化）"""
+    return embed_texts([text], dim)[0]
@@ -0,0 +1,44 @@
+from typing import Callable, Dict, List
+
+EventHandler = Callable[[Dict], None]
+
+class EventBus:
+    """模拟事件的发布/订阅
+
+    模拟引擎只发布事件，不直接输出；终端界面、日志等前端按需订阅。
+    没有订阅者时publish()只做一次字典查找，不影响模拟速度。
+    """
+
+    ALL = '*'  # 订阅所有类型的事件
+
+    def __init__(self):
+        self._handlers: Dict[str, List[EventHandler]] = {}
+
+    def subscribe(self, event_type: str, handler: EventHandler) -> None:
+        """订阅一种事件
+
+        Args:
+            event_type: 事件类型，EventBus.ALL表示所有事件
+            handler: 回调函数，参数为包含type字段的事件字典
+        """
+        self._handlers.setdefault(event_type, []).append(handler)
+
+    def unsubscribe(self, event_type: str, handler: EventHandler) -> None:
+        """取消订阅，未订阅时忽略"""
+        handlers = self._handlers.get(event_type)
+        if handlers and handler in handlers:
+            handlers.remove(handler)
+            if not handlers:
+                del self._handlers[event_type]
+
+    def publish(self, event_type: str, **data) -> None:
+        """发布一个事件，按订阅顺序同步调用回调"""
+        if not self._handlers:
+            return
+        handlers = self._handlers.get(event_type, []) + self._handlers.get(self.ALL, [])
+        if not handlers:
+            return
+        event = {'type': event_type}
+        event.update(data)
+        for handler in handlers:
+            handler(event)
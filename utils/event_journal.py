@@ -0,0 +1,138 @@
+from typing import Dict, List, Optional, Tuple
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.settings import JOURNAL_DIR, JOURNAL_SYNC_INTERVAL, JOURNAL_SNAPSHOT_INTERVAL
+
+class EventJournal:
+    """小镇状态的预写事件日志和快照
+
+    每个改变状态的事件带递增序号追加到journal.jsonl，写入先在内存中缓冲，
+    距上次同步超过sync_interval秒时一次性写入并fsync。事件数达到
+    snapshot_interval后写入完整快照snapshot.json并清空日志，因此恢复时间
+    只取决于快照大小和之后的事件数，与小镇运行了多久无关。
+    """
+
+    def __init__(
+        self,
+        directory: str = JOURNAL_DIR,
+        sync_interval: float = JOURNAL_SYNC_INTERVAL,
+        snapshot_interval: int = JOURNAL_SNAPSHOT_INTERVAL
+    ):
+        self.directory = directory
+        self.sync_interval = sync_interval
+        self.snapshot_interval = snapshot_interval
+        self.journal_path = os.path.join(directory, 'journal.jsonl')
+        self.snapshot_path = os.path.join(directory, 'snapshot.json')
+        os.makedirs(directory, exist_ok=True)
+
+        self.seq = 0
+        self.events_since_snapshot = 0
+        self._buffer: List[str] = []
+        self._last_sync = time.monotonic()
+        self._file = None
+
+    def load(self) -> Tuple[Optional[Dict], List[Dict]]:
+        """读取最新的快照和快照之后的事件，并打开日志准备继续追加
+
+        Returns:
+            (快照中的状态，没有快照时为None, 按序号排列的事件列表)
+        """
+        snapshot_state = None
+        snapshot_seq = 0
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            snapshot_state = snapshot['state']
+            snapshot_seq = snapshot['seq']
+
+        events: List[Dict] = []
+        valid_size = 0
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, 'rb') as f:
+                for line in f:
+                    # 崩溃时最后一行可能只写入了一部分，从这里截断
+                    if not line.endswith(b'\n'):
+                        break
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        break
+                    valid_size += len(line)
+                    # 写入快照后、清空日志前崩溃时，日志中会残留快照已包含的事件
+                    if event['seq'] > snapshot_seq:
+                        events.append(event)
+
+        self._file = open(self.journal_path, 'ab')
+        self._file.truncate(valid_size)
+        self.seq = events[-1]['seq'] if events else snapshot_seq
+        self.events_since_snapshot = len(events)
+        return snapshot_state, events
+
+    def append(self, event_type: str, **data) -> None:
+        """追加一个事件，到达同步间隔时写入磁盘"""
+        self.seq += 1
+        record = {'seq': self.seq, 'type': event_type, 'time': time.time()}
+        record.update(data)
+        self._buffer.append(json.dumps(record, ensure_ascii=False))
+        self.events_since_snapshot += 1
+        self.flush_if_due()
+
+    def flush_if_due(self) -> None:
+        """距上次同步超过sync_interval时写入缓冲的事件"""
+        if time.monotonic() - self._last_sync >= self.sync_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        """把缓冲的事件写入日志并fsync"""
+        if self._buffer:
+            if self._file is None:
+                self._file = open(self.journal_path, 'ab')
+            self._file.write(('\n'.join(self._buffer) + '\n').encode('utf-8'))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._buffer = []
+        self._last_sync = time.monotonic()
+
+    def needs_snapshot(self) -> bool:
+        """快照之后的事件数是否达到snapshot_interval"""
+        return self.events_since_snapshot >= self.snapshot_interval
+
+    def write_snapshot(self, state: Dict) -> None:
+        """写入完整快照并清空日志
+
+        快照先写入临时文件再原子替换，任何时刻崩溃都至少保留一份完整的快照。
+        """
+        self.flush()
+        temp_path = self.snapshot_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'seq': self.seq, 'time': time.time(), 'state': state}, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.snapshot_path)
+        self._sync_directory()
+
+        if self._file is not None:
+            self._file.truncate(0)
+            os.fsync(self._file.fileno())
+        self.events_since_snapshot = 0
+
+    def _sync_directory(self) -> None:
+        """fsync目录使文件替换持久化，不支持的平台（Windows）跳过"""
+        if not hasattr(os, 'O_DIRECTORY'):
+            return
+        fd = os.open(self.directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def close(self) -> None:
+        """写入剩余事件并关闭日志"""
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
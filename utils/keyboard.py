@@ -0,0 +1,81 @@
+from typing import Optional
+import asyncio
+import os
+import sys
+
+try:
+    import msvcrt
+except ImportError:  # 非Windows平台没有msvcrt
+    msvcrt = None
+
+if msvcrt is None:
+    import select
+    import termios
+    import tty
+
+class KeyReader:
+    """跨平台的非阻塞按键读取
+
+    POSIX终端下切换到cbreak模式（按键无需回车即可读取，Ctrl+C仍然有效），
+    通过事件循环监听标准输入；Windows下用msvcrt轮询。标准输入不是终端时
+    （如重定向或在后台运行）不读取任何按键。用作上下文管理器，退出时恢复终端设置。
+    """
+
+    POLL_INTERVAL = 0.05  # Windows下轮询按键的间隔（秒）
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdin
+        self._fd: Optional[int] = None
+        self._saved_attrs = None
+
+    def __enter__(self) -> 'KeyReader':
+        if msvcrt is None and self.stream.isatty():
+            self._fd = self.stream.fileno()
+            self._saved_attrs = termios.tcgetattr(self._fd)
+            tty.setcbreak(self._fd)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if self._saved_attrs is not None:
+            termios.tcsetattr(self._fd, termios.TCSADRAIN, self._saved_attrs)
+            self._saved_attrs = None
+        self._fd = None
+
+    @property
+    def interactive(self) -> bool:
+        """是否能够读取按键"""
+        return self._fd is not None or (msvcrt is not None and self.stream.isatty())
+
+    def read_key(self) -> Optional[str]:
+        """立即返回一个已按下的键，没有按键时返回None"""
+        if msvcrt is not None:
+            return msvcrt.getwch() if self.interactive and msvcrt.kbhit() else None
+        if self._fd is None or not select.select([self._fd], [], [], 0)[0]:
+            return None
+        data = os.read(self._fd, 1)
+        return data.decode('utf-8', errors='ignore') or None
+
+    async def read_key_async(self) -> str:
+        """等待下一个按键，不阻塞事件循环中的其他任务；无法读取按键时一直等待（可被取消）"""
+        while True:
+            key = self.read_key()
+            if key:
+                return key
+            if self._fd is None:
+                await asyncio.sleep(self.POLL_INTERVAL if self.interactive else 3600)
+                continue
+            loop = asyncio.get_running_loop()
+            ready = loop.create_future()
+            loop.add_reader(self._fd, lambda: ready.done() or ready.set_result(None))
+            try:
+                await ready
+            finally:
+                loop.remove_reader(self._fd)
+
+    async def wait_for(self, *keys: str) -> str:
+        """等待指定的键之一被按下（不区分大小写），返回该键"""
+        wanted = {key.lower() for key in keys}
+        while True:
+            key = (await self.read_key_async()).lower()
+            if key in wanted:
+                return key
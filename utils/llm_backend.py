@@ -0,0 +1,53 @@
+from typing import Dict, Optional
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.settings import LLM_BACKEND
+
+class LLMBackend:
+    """LLM后端接口
+
+    DeepSeekClient只通过post()与后端交互。返回值需要提供与
+    requests.Response相同的属性和方法：status_code、headers、
+    json()、iter_lines()、close()，并支持with语句。
+    """
+
+    # 是否受API配额限制，本地模拟后端不需要限流
+    rate_limited = True
+
+    def post(
+        self,
+        url: str,
+        headers: Dict[str, str],
+        payload: Dict,
+        stream: bool = False
+    ):
+        """发送一次/chat/completions风格的请求"""
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, float]:
+        """获取后端统计信息"""
+        return {}
+
+    def close(self) -> None:
+        """释放后端资源"""
+
+def create_backend(name: Optional[str] = None) -> LLMBackend:
+    """根据名称创建后端
+
+    Args:
+        name: 'http'使用真实的HTTP接口，'stub'使用进程内的离线模拟后端；
+            默认读取配置中的LLM_BACKEND
+
+    Returns:
+        后端实例
+    """
+    name = name or LLM_BACKEND
+    if name == 'http':
+        from utils.transport import HTTPTransport
+        return HTTPTransport()
+    if name == 'stub':
+        from utils.stub_llm import StubBackend
+        return StubBackend()
+    raise ValueError(f"未知的LLM后端: {name}")
@@ -0,0 +1,117 @@
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+from concurrent.futures import Future, ThreadPoolExecutor
+import os
+import queue
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.settings import COMPACTION_GROUP_SIZE
+from models.memory import Memory
+from models.memory_stream import MemoryStream
+from utils.resilience import APIError
+
+class MemoryCompactor:
+    """在后台把旧记忆概括为摘要记忆
+
+    记忆流达到水位线时挑选待压缩的记忆分组，在工作线程中用一次批量的
+    LLM调用生成各组摘要；结果在下一次调用apply_finished()时由调用方线程
+    写回记忆流，因此记忆流本身不需要加锁，前台调用也不会等待压缩完成。
+    """
+
+    def __init__(
+        self,
+        client,
+        max_workers: int = 1,
+        on_applied: Optional[Callable[[Hashable, List[Memory]], None]] = None
+    ):
+        """
+        Args:
+            client: 提供summarize_memory_groups的API客户端
+            max_workers: 工作线程数
+            on_applied: 写回压缩结果后的回调，参数为记忆流的标识和新增的摘要记忆（可选）
+        """
+        self.client = client
+        self.on_applied = on_applied
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='compactor')
+        # 进行中的压缩：键 -> (记忆流, 分组, future)
+        self.pending: Dict[Hashable, Tuple[MemoryStream, List[List[int]], Future]] = {}
+        self._finished: 'queue.SimpleQueue[Hashable]' = queue.SimpleQueue()
+        # 上次没有可压缩记忆时的插入计数，再插入一组记忆后才重新挑选
+        self._retry_after: Dict[Hashable, int] = {}
+        self.compacted_groups = 0
+        self.failed_calls = 0
+
+    def maybe_schedule(
+        self,
+        key: Hashable,
+        memory_stream: MemoryStream,
+        character_desc: Optional[str] = None
+    ) -> bool:
+        """记忆流达到水位线时在后台发起一次压缩
+
+        Args:
+            key: 记忆流的标识（如角色ID），同一记忆流同时只进行一次压缩
+            memory_stream: 要压缩的记忆流
+            character_desc: 记忆所属角色的描述（可选）
+
+        Returns:
+            是否发起了压缩
+        """
+        if key in self.pending or not memory_stream.needs_compaction():
+            return False
+        if memory_stream.insert_count < self._retry_after.get(key, 0):
+            return False
+
+        groups = memory_stream.select_compaction_groups()
+        if not groups:
+            self._retry_after[key] = memory_stream.insert_count + COMPACTION_GROUP_SIZE
+            return False
+
+        contents = [memory_stream.get_group_contents(group) for group in groups]
+        future = self.executor.submit(
+            self.client.summarize_memory_groups, contents, character_desc
+        )
+        self.pending[key] = (memory_stream, groups, future)
+        future.add_done_callback(lambda _: self._finished.put(key))
+        return True
+
+    def apply_finished(self) -> int:
+        """把已完成的压缩结果写回记忆流，返回新增的摘要数
+
+        API调用失败时放弃本次压缩，原始记忆保持不变。
+        """
+        applied = 0
+        while True:
+            try:
+                key = self._finished.get_nowait()
+            except queue.Empty:
+                return applied
+            memory_stream, groups, future = self.pending.pop(key)
+            try:
+                summaries = future.result()
+            except APIError:
+                self.failed_calls += 1
+                continue
+            created = memory_stream.apply_compaction(groups, summaries)
+            self.compacted_groups += len(created)
+            applied += len(created)
+            if created and self.on_applied is not None:
+                self.on_applied(key, created)
+
+    def wait(self, timeout: Optional[float] = None) -> int:
+        """等待所有进行中的压缩完成并写回，主要用于退出前和基准测试"""
+        for _, _, future in list(self.pending.values()):
+            future.exception(timeout=timeout)
+        return self.apply_finished()
+
+    def stats(self) -> Dict[str, int]:
+        """获取压缩统计"""
+        return {
+            'pending': len(self.pending),
+            'compacted_groups': self.compacted_groups,
+            'failed_calls': self.failed_calls
+        }
+
+    def close(self) -> None:
+        """停止工作线程，放弃尚未开始的压缩"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
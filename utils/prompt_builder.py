@@ -0,0 +1,149 @@
+from typing import Dict, List, Optional
+from functools import lru_cache
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.settings import (
+    PROMPT_TOKEN_BUDGETS, COMPLETION_TOKEN_LIMITS, MEMORY_ITEM_TOKEN_LIMIT
+)
+
+def _char_cost(ch: str) -> float:
+    """估计单个字符占用的token数"""
+    code = ord(ch)
+    if code < 128:
+        return 0.3  # 英文、数字、标点约3-4个字符一个token
+    if (0x4E00 <= code <= 0x9FFF or 0x3400 <= code <= 0x4DBF
+            or 0x3000 <= code <= 0x303F or 0xFF00 <= code <= 0xFFEF):
+        return 0.6  # 中日韩文字及全角标点
+    return 1.0  # emoji等其他字符
+
+@lru_cache(maxsize=4096)
+def estimate_tokens(text: str) -> int:
+    """在本地粗略估计文本的token数，对中文按字计算"""
+    if not text:
+        return 0
+    return int(sum(_char_cost(ch) for ch in text) + 0.999)
+
+def truncate_to_tokens(text: str, max_tokens: int, suffix: str = "…") -> str:
+    """截断文本使其不超过指定token数"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    budget = max_tokens - estimate_tokens(suffix)
+    used = 0.0
+    for i, ch in enumerate(text):
+        used += _char_cost(ch)
+        if used > budget:
+            return text[:i] + suffix
+    return text
+
+def completion_tokens(call_type: str) -> int:
+    """获取指定调用类型的最大输出token数"""
+    return COMPLETION_TOKEN_LIMITS.get(call_type, COMPLETION_TOKEN_LIMITS['default'])
+
+class PromptBuilder:
+    """按优先级在token预算内组装提示
+
+    提示由若干段组成，每段有一个优先级（数值越大越重要）。
+    build()时按优先级从高到低依次放入预算，放不下的段落被截断或省略，
+    最终仍按添加顺序输出。
+    """
+
+    def __init__(self, call_type: str, budget: Optional[int] = None):
+        self.call_type = call_type
+        self.budget = budget or PROMPT_TOKEN_BUDGETS.get(
+            call_type, PROMPT_TOKEN_BUDGETS['default']
+        )
+        self.sections: List[Dict] = []
+
+    @property
+    def max_tokens(self) -> int:
+        """该调用类型的最大输出token数"""
+        return completion_tokens(self.call_type)
+
+    def add(self, text: str, priority: int = 10, truncatable: bool = False) -> 'PromptBuilder':
+        """添加一段文本
+
+        Args:
+            text: 段落内容
+            priority: 优先级，数值越大越先放入预算
+            truncatable: 预算不足时是否允许截断（否则整段省略）
+        """
+        if text:
+            self.sections.append({
+                'text': text,
+                'priority': priority,
+                'truncatable': truncatable
+            })
+        return self
+
+    def add_items(
+        self,
+        header: str,
+        items: List[str],
+        priority: int = 5,
+        item_limit: int = MEMORY_ITEM_TOKEN_LIMIT,
+        prefix: str = "- "
+    ) -> 'PromptBuilder':
+        """添加一个列表段落（如记忆列表）
+
+        预算不足时优先保留列表末尾（最新）的条目，单个条目超过
+        item_limit时会被截断。
+
+        Args:
+            header: 列表标题，列表为空时不输出
+            items: 条目列表，按时间从旧到新排列
+            priority: 优先级
+            item_limit: 单个条目的最大token数
+            prefix: 每个条目的前缀
+        """
+        if items:
+            self.sections.append({
+                'header': header,
+                'items': [prefix + truncate_to_tokens(item, item_limit) for item in items],
+                'priority': priority
+            })
+        return self
+
+    def build(self) -> str:
+        """在预算内组装最终提示"""
+        remaining = self.budget
+        rendered: Dict[int, str] = {}
+
+        order = sorted(
+            range(len(self.sections)),
+            key=lambda i: -self.sections[i]['priority']
+        )
+        for i in order:
+            section = self.sections[i]
+            if 'items' in section:
+                text = self._fit_items(section, remaining)
+            else:
+                text = section['text']
+                if estimate_tokens(text) > remaining:
+                    text = (
+                        truncate_to_tokens(text, remaining)
+                        if section['truncatable'] and remaining > 0
+                        else ''
+                    )
+            if text:
+                rendered[i] = text
+                remaining -= estimate_tokens(text)
+
+        return ''.join(rendered[i] for i in sorted(rendered))
+
+    @staticmethod
+    def _fit_items(section: Dict, remaining: int) -> str:
+        """从最新的条目开始尽可能多地放入剩余预算"""
+        header = section['header']
+        remaining -= estimate_tokens(header)
+        kept: List[str] = []
+        for item in reversed(section['items']):
+            cost = estimate_tokens(item) + 1  # 加上换行符
+            if cost > remaining:
+                break
+            kept.append(item)
+            remaining -= cost
+        if not kept:
+            return ''
+        return header + ''.join(item + "\n" for item in reversed(kept))
@@ -1,15 +1,105 @@
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
 from datetime import datetime
+from functools import lru_cache
 import os
+import shutil
 import sys
+import unicodedata
 from colorama import init, Fore, Back, Style
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from models.memory import Memory
+
 # 初始化colorama
 init(autoreset=True)
 
+BOX_WIDTH = 50  # 方框总宽度（终端列数）
+WRAP_WIDTH = 45  # 方框内每行文字的最大显示宽度
+
+# ANSI控制序列
+CLEAR_SCREEN = "\x1b[2J\x1b[H"
+CLEAR_LINE = "\x1b[K"
+HIDE_CURSOR = "\x1b[?25l"
+SHOW_CURSOR = "\x1b[?25h"
+
+# 一行文字及其颜色键
+Row = Tuple[str, str]
+
+@lru_cache(maxsize=None)
+def char_width(ch: str) -> int:
+    """单个字符在终端中占用的列数：中日韩全角字符和宽emoji为2，组合字符为0"""
+    if unicodedata.combining(ch) or ch in '​‍︎️':
+        return 0
+    return 2 if unicodedata.east_asian_width(ch) in ('W', 'F') else 1
+
+@lru_cache(maxsize=4096)
+def display_width(text: str) -> int:
+    """文本在终端中的显示宽度"""
+    width = 0
+    previous = 0
+    for ch in text:
+        # emoji变体选择符使前一个窄字符按emoji宽度显示（如🌡️、⚠️）
+        if ch == '️' and previous == 1:
+            width += 1
+            previous = 2
+            continue
+        w = char_width(ch)
+        width += w
+        if w:
+            previous = w
+    return width
+
+def pad(text: str, width: int) -> str:
+    """在右侧补空格，使文本的显示宽度达到width"""
+    return text + " " * max(0, width - display_width(text))
+
+def center(text: str, width: int) -> str:
+    """按显示宽度居中"""
+    space = max(0, width - display_width(text))
+    return " " * (space // 2) + text + " " * (space - space // 2)
+
+def truncate(text: str, width: int) -> str:
+    """截断文本，使显示宽度不超过width"""
+    if display_width(text) <= width:
+        return text
+    out = []
+    used = 0
+    for ch in text:
+        w = char_width(ch)
+        if used + w > width:
+            break
+        out.append(ch)
+        used += w
+    return ''.join(out)
+
+def wrap(text: str, width: int = WRAP_WIDTH) -> List[str]:
+    """按显示宽度把文本折成多行，保留原有的换行"""
+    lines = []
+    for paragraph in text.split('\n'):
+        line = []
+        used = 0
+        for ch in paragraph:
+            w = char_width(ch)
+            if used + w > width and line:
+                lines.append(''.join(line))
+                line = []
+                used = 0
+            line.append(ch)
+            used += w
+        lines.append(''.join(line))
+    return lines
+
 class Renderer:
-    def __init__(self, color_enabled: bool = True):
+    """终端渲染器
+
+    每个render_*方法先在缓冲区中拼出完整的一帧，再一次性写入终端；方框按显示宽度
+    补齐，中文和emoji也能对齐。实时模式（begin_live/render_live/end_live）下
+    只重写与上一帧不同的行，用于观察模式的实时面板。
+    """
+
+    def __init__(self, color_enabled: bool = True, stream=None):
         self.color_enabled = color_enabled
+        self.stream = stream or sys.stdout
         self.colors = {
             'room_name': Fore.CYAN,
             'character_name': Fore.YELLOW,
@@ -19,10 +109,21 @@ class Renderer:
             'description': Fore.BLUE,
             'error': Fore.RED
         }
+        # 实时模式下终端上当前显示的各行，None表示不在实时模式
+        self._live_frame: Optional[List[str]] = None
+
+    def _write(self, text: str) -> None:
+        """一次性写入并刷新"""
+        self.stream.write(text)
+        self.stream.flush()
+
+    def _emit(self, lines: Iterable[str]) -> None:
+        """把一帧的所有行一次性写入终端"""
+        self._write('\n'.join(lines) + '\n')
 
     def clear_screen(self) -> None:
         """清空屏幕"""
-        os.system('cls' if os.name == 'nt' else 'clear')
+        self._write(CLEAR_SCREEN)
 
     def _colorize(self, text: str, color_key: str) -> str:
         """为文本添加颜色"""
@@ -30,15 +131,63 @@ class Renderer:
             return text
         return f"{self.colors.get(color_key, '')}{text}{Style.RESET_ALL}"
 
+    def _box(
+        self,
+        title: Optional[str],
+        sections: Sequence[Sequence[Row]],
+        border_color: str,
+        double: bool = False
+    ) -> List[str]:
+        """拼出一个方框，各部分之间用分隔线隔开
+
+        Args:
+            title: 嵌在上边框中的标题，None时为普通上边框
+            sections: 各部分的行，每行为(文字, 颜色键)，文字需已按WRAP_WIDTH折行
+            border_color: 边框颜色键
+            double: 是否使用双线边框
+
+        Returns:
+            已着色的各行，第一行为空行
+        """
+        inner = BOX_WIDTH - 2
+        if double:
+            left, right, horizontal, vertical = "╔╚╠", "╗╝╣", "═", "║"
+        else:
+            left, right, horizontal, vertical = "┌└├", "┐┘┤", "─", "│"
+
+        if title is None:
+            top = left[0] + horizontal * inner + right[0]
+        else:
+            label = f"{horizontal}[ {title} ]"
+            top = left[0] + label + horizontal * max(0, inner - display_width(label)) + right[0]
+        separator = self._colorize(left[2] + horizontal * inner + right[2], border_color)
+
+        lines = ["", self._colorize(top, border_color)]
+        for i, rows in enumerate(sections):
+            if i > 0:
+                lines.append(separator)
+            for text, color in rows:
+                lines.append(self._colorize(f"{vertical} {pad(text, inner - 1)}{vertical}", color))
+        lines.append(self._colorize(left[1] + horizontal * inner + right[1], border_color))
+        return lines
+
+    @staticmethod
+    def _wrapped(text: str, color: str) -> List[Row]:
+        """把文本折行为同一颜色的多行"""
+        return [(line, color) for line in wrap(text)]
+
     def render_header(self) -> None:
         """渲染界面头部"""
         title = "=== 虚拟小镇 ==="
         time_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        print("\n" + "=" * 50)
-        print(self._colorize(title.center(50), 'system'))
-        print(self._colorize(time_str.center(50), 'time'))
-        print("=" * 50 + "\n")
+        self._emit([
+            "",
+            "=" * BOX_WIDTH,
+            self._colorize(center(title, BOX_WIDTH), 'system'),
+            self._colorize(center(time_str, BOX_WIDTH), 'time'),
+            "=" * BOX_WIDTH,
+            ""
+        ])
 
     def render_room(self, room_data: Dict) -> None:
         """渲染房间信息
@@ -46,46 +195,35 @@ class Renderer:
         Args:
             room_data: 房间信息字典，包含名称、描述、物品等
         """
-        # 房间名称和边框
-        border = "╔" + "═" * 48 + "╗"
-        print("\n" + self._colorize(border, 'room_name'))
-        name_line = f"║ {room_data['name']}" + " " * (47 - len(room_data['name'])) + "║"
-        print(self._colorize(name_line, 'room_name'))
-        print(self._colorize("╠" + "═" * 48 + "╣", 'room_name'))
-        
-        # 房间描述
-        desc = room_data['description']
-        desc_lines = [desc[i:i+46] for i in range(0, len(desc), 46)]
-        for line in desc_lines:
-            padded_line = f"║ {line}" + " " * (47 - len(line)) + "║"
-            print(self._colorize(padded_line, 'description'))
-        
+        sections: List[List[Row]] = [
+            [(room_data['name'], 'room_name')],
+            self._wrapped(room_data['description'], 'description')
+        ]
+
         # 房间状态
         if 'state' in room_data:
             state = room_data['state']
-            print(self._colorize("╠" + "═" * 48 + "╣", 'room_name'))
-            status_line = f"║ 🌡️{state.get('temperature', '??')}℃ | 💡{state.get('lighting', '??')} | 🧹{state.get('cleanliness', '??')}/10"
-            status_line = status_line + " " * (47 - len(status_line)) + "║"
-            print(self._colorize(status_line, 'system'))
+            sections.append([(
+                f"🌡️{state.get('temperature', '??')}℃ | 💡{state.get('lighting', '??')} | "
+                f"🧹{state.get('cleanliness', '??')}/10",
+                'system'
+            )])
 
         # 显示物品
         if room_data.get('items'):
-            print(self._colorize("╠" + "═" * 48 + "╣", 'room_name'))
-            print(self._colorize("║ 📦 物品：" + " " * 39 + "║", 'system'))
-            for item in room_data['items']:
-                item_line = f"║   • {item}" + " " * (45 - len(item)) + "║"
-                print(self._colorize(item_line, 'description'))
+            sections.append(
+                [("📦 物品：", 'system')]
+                + [(f"  • {item}", 'description') for item in room_data['items']]
+            )
 
         # 显示在场角色
         if room_data.get('characters'):
-            print(self._colorize("╠" + "═" * 48 + "╣", 'room_name'))
-            print(self._colorize("║ 👥 在场角色：" + " " * 36 + "║", 'system'))
-            for char in room_data['characters']:
-                char_line = f"║   • {char}" + " " * (45 - len(char)) + "║"
-                print(self._colorize(char_line, 'character_name'))
+            sections.append(
+                [("👥 在场角色：", 'system')]
+                + [(f"  • {char}", 'character_name') for char in room_data['characters']]
+            )
 
-        # 底部边框
-        print(self._colorize("╚" + "═" * 48 + "╝", 'room_name'))
+        self._emit(self._box(None, sections, 'room_name', double=True))
 
     def render_character(self, char_data: Dict) -> None:
         """渲染角色信息
@@ -94,16 +232,6 @@ class Renderer:
             char_data: 角色信息字典
         """
         name = char_data.get('name', '未知角色')
-        # 顶部边框
-        print(self._colorize("\n┌" + "─" * 48 + "┐", 'character_name'))
-        
-        # 角色名称和职业
-        title_line = f"│ 👤 {name} - {char_data.get('occupation', '未知')}"
-        title_line = title_line + " " * (47 - len(title_line)) + "│"
-        print(self._colorize(title_line, 'character_name'))
-        print(self._colorize("├" + "─" * 48 + "┤", 'character_name'))
-        
-        # 状态信息
         mood = char_data.get('mood', '平静')
         energy = char_data.get('energy', 0)
         mood_emoji = {
@@ -114,21 +242,14 @@ class Renderer:
             '专注': '🤔',
             '困扰': '😕'
         }.get(mood, '😐')
-        
         energy_bar = "█" * (energy // 10) + "░" * (10 - energy // 10)
-        status_line = f"│ {mood_emoji} 心情: {mood} | ⚡ 精力: [{energy_bar}] {energy}/100"
-        status_line = status_line + " " * (47 - len(status_line)) + "│"
-        print(self._colorize(status_line, 'description'))
-        
-        # 当前活动
-        print(self._colorize("├" + "─" * 48 + "┤", 'character_name'))
         activity = char_data.get('current_activity', '无特定活动')
-        activity_line = f"│ 🎯 当前活动: {activity}"
-        activity_line = activity_line + " " * (47 - len(activity_line)) + "│"
-        print(self._colorize(activity_line, 'description'))
-        
-        # 底部边框
-        print(self._colorize("└" + "─" * 48 + "┘", 'character_name'))
+
+        self._emit(self._box(None, [
+            [(f"👤 {name} - {char_data.get('occupation', '未知')}", 'character_name')],
+            [(f"{mood_emoji} 心情: {mood} | ⚡ 精力: [{energy_bar}] {energy}/100", 'description')],
+            self._wrapped(f"🎯 当前活动: {activity}", 'description')
+        ], 'character_name'))
 
     def render_dialogue(self, speaker: str, content: str) -> None:
         """渲染对话内容
@@ -137,26 +258,73 @@ class Renderer:
             speaker: 说话者名称
             content: 对话内容
         """
-        print("\n" + self._colorize("┌─[ 对话 ]" + "─" * 39 + "┐", 'system'))
-        speaker_line = f"│ 🗣️ {speaker}"
-        speaker_line = speaker_line + " " * (47 - len(speaker_line)) + "│"
-        print(self._colorize(speaker_line, 'character_name'))
-        
-        # 分割内容为多行
-        content_lines = [content[i:i+45] for i in range(0, len(content), 45)]
-        print(self._colorize("├" + "─" * 48 + "┤", 'system'))
-        for line in content_lines:
-            content_line = f"│ {line}" + " " * (47 - len(line)) + "│"
-            print(self._colorize(content_line, 'dialogue'))
-        print(self._colorize("└" + "─" * 48 + "┘", 'system'))
-
-    def render_memory(self, memory: Dict) -> None:
+        self._emit(self._box("对话", [
+            [(f"🗣️ {speaker}", 'character_name')],
+            self._wrapped(content, 'dialogue')
+        ], 'system'))
+
+    def render_dialogue_stream(self, speaker: str, chunks: Iterable[str]) -> str:
+        """流式渲染对话内容，边接收边填充对话框
+
+        Args:
+            speaker: 说话者名称
+            chunks: 对话内容片段的迭代器
+
+        Returns:
+            完整的对话内容
+        """
+        header = self._box("对话", [[(f"🗣️ {speaker}", 'character_name')], []], 'system')
+        # 去掉空内容部分之后的下边框，对话框在内容结束后再闭合
+        self._emit(header[:-1])
+
+        received = []
+        line_width = 0
+        line_open = False
+        try:
+            for chunk in chunks:
+                received.append(chunk)
+                out = []
+                for ch in chunk:
+                    if ch == '\r':
+                        continue
+                    if not line_open:
+                        out.append("│ ")
+                        line_open = True
+                    if ch == '\n':
+                        # 换行时补齐当前行
+                        out.append(" " * (BOX_WIDTH - 3 - line_width) + "│\n")
+                        line_width = 0
+                        line_open = False
+                        continue
+                    w = char_width(ch)
+                    if line_width + w > WRAP_WIDTH:
+                        out.append(" " * (BOX_WIDTH - 3 - line_width) + "│\n│ ")
+                        line_width = 0
+                    out.append(ch)
+                    line_width += w
+                if out:
+                    self._write(self._colorize(''.join(out), 'dialogue'))
+        finally:
+            # 即使生成中途出错也要闭合对话框
+            tail = ""
+            if line_open:
+                tail = self._colorize(" " * (BOX_WIDTH - 3 - line_width) + "│\n", 'dialogue')
+            self._write(tail + self._colorize("└" + "─" * (BOX_WIDTH - 2) + "┘", 'system') + "\n")
+
+        return ''.join(received)
+
+    def render_memory(self, memory: Union[Memory, Dict]) -> None:
         """渲染记忆内容
 
         Args:
-            memory: 记忆信息字典
+            memory: 记忆记录或记忆信息字典
         """
-        timestamp = datetime.fromisoformat(memory['timestamp']).strftime("%H:%M")
+        timestamp = memory['timestamp']
+        if isinstance(timestamp, str):
+            timestamp = datetime.fromisoformat(timestamp)
+        else:
+            timestamp = datetime.fromtimestamp(timestamp)
+        timestamp = timestamp.strftime("%H:%M")
         importance = memory.get('importance', 0)
         importance_icons = {
             1: '📝',  # 普通记忆
@@ -165,19 +333,11 @@ class Renderer:
             4: '❗',  # 非常重要
             5: '❗❗'  # 极其重要
         }.get(importance, '📝')
-        
-        print("\n" + self._colorize("┌─[ 记忆 ]" + "─" * 40 + "┐", 'time'))
-        time_line = f"│ ⏰ {timestamp} {importance_icons}"
-        time_line = time_line + " " * (47 - len(time_line)) + "│"
-        print(self._colorize(time_line, 'time'))
-        
-        # 分割内容为多行
-        content_lines = [memory['content'][i:i+45] for i in range(0, len(memory['content']), 45)]
-        print(self._colorize("├" + "─" * 48 + "┤", 'time'))
-        for line in content_lines:
-            content_line = f"│ {line}" + " " * (47 - len(line)) + "│"
-            print(self._colorize(content_line, 'description'))
-        print(self._colorize("└" + "─" * 48 + "┘", 'time'))
+
+        self._emit(self._box("记忆", [
+            [(f"⏰ {timestamp} {importance_icons}", 'time')],
+            self._wrapped(memory['content'], 'description')
+        ], 'time'))
 
     def render_menu(self, options: List[str]) -> None:
         """渲染菜单选项
@@ -185,12 +345,9 @@ class Renderer:
         Args:
             options: 选项列表
         """
-        print("\n" + self._colorize("┌─[ 可用操作 ]" + "─" * 36 + "┐", 'system'))
-        for i, option in enumerate(options, 1):
-            option_line = f"│ {i}. {option}"
-            option_line = option_line + " " * (47 - len(option_line)) + "│"
-            print(self._colorize(option_line, 'system'))
-        print(self._colorize("└" + "─" * 48 + "┘", 'system'))
+        self._emit(self._box("可用操作", [
+            [(f"{i}. {option}", 'system') for i, option in enumerate(options, 1)]
+        ], 'system'))
 
     def render_error(self, message: str) -> None:
         """渲染错误信息
@@ -198,13 +355,7 @@ class Renderer:
         Args:
             message: 错误信息
         """
-        print("\n" + self._colorize("┌─[ ⚠️ 错误 ]" + "─" * 38 + "┐", 'error'))
-        # 分割消息为多行
-        message_lines = [message[i:i+45] for i in range(0, len(message), 45)]
-        for line in message_lines:
-            error_line = f"│ {line}" + " " * (47 - len(line)) + "│"
-            print(self._colorize(error_line, 'error'))
-        print(self._colorize("└" + "─" * 48 + "┘", 'error'))
+        self._emit(self._box("⚠️ 错误", [self._wrapped(message, 'error')], 'error'))
 
     def render_system_message(self, message: str) -> None:
         """渲染系统消息
@@ -212,13 +363,7 @@ class Renderer:
         Args:
             message: 系统消息
         """
-        print("\n" + self._colorize("┌─[ 💬 系统消息 ]" + "─" * 34 + "┐", 'system'))
-        # 分割消息为多行
-        message_lines = [message[i:i+45] for i in range(0, len(message), 45)]
-        for line in message_lines:
-            system_line = f"│ {line}" + " " * (47 - len(line)) + "│"
-            print(self._colorize(system_line, 'system'))
-        print(self._colorize("└" + "─" * 48 + "┘", 'system'))
+        self._emit(self._box("💬 系统消息", [self._wrapped(message, 'system')], 'system'))
 
     def render_status_bar(self, status: Dict) -> None:
         """渲染状态栏
@@ -227,24 +372,14 @@ class Renderer:
             status: 状态信息字典
         """
         time_str = datetime.now().strftime("%H:%M")
-        print("\n" + self._colorize("┌─[ 状态信息 ]" + "─" * 36 + "┐", 'time'))
-        
-        # 时间和位置
-        location_line = f"│ ⏰ {time_str} | 📍 位置: {status.get('location', '未知')}"
-        location_line = location_line + " " * (47 - len(location_line)) + "│"
-        print(self._colorize(location_line, 'time'))
-        
-        # 角色数量和系统状态
-        status_line = f"│ 👥 角色: {status.get('character_count', 0)} | 🔄 状态: {status.get('system_status', 'normal')}"
-        status_line = status_line + " " * (47 - len(status_line)) + "│"
-        print(self._colorize(status_line, 'time'))
-        
-        print(self._colorize("└" + "─" * 48 + "┘", 'time'))
+        self._emit(self._box("状态信息", [[
+            (f"⏰ {time_str} | 📍 位置: {status.get('location', '未知')}", 'time'),
+            (f"👥 角色: {status.get('character_count', 0)} | "
+             f"🔄 状态: {status.get('system_status', 'normal')}", 'time')
+        ]], 'time'))
 
     def render_help(self) -> None:
         """渲染帮助信息"""
-        print("\n" + self._colorize("┌─[ ℹ️ 帮助信息 ]" + "─" * 35 + "┐", 'system'))
-        
         help_sections = [
             ("基本操作", [
                 "🔢 输入数字选择菜单选项",
@@ -263,23 +398,87 @@ class Renderer:
                 "🔄 Ctrl+L: 清屏"
             ])
         ]
-        
-        for i, (section, items) in enumerate(help_sections):
-            if i > 0:
-                print(self._colorize("├" + "─" * 48 + "┤", 'system'))
-            
-            # 打印分节标题
-            section_line = f"│ 📚 {section}"
-            section_line = section_line + " " * (47 - len(section_line)) + "│"
-            print(self._colorize(section_line, 'system'))
-            
-            # 打印分节内容
-            for item in items:
-                item_line = f"│   {item}"
-                item_line = item_line + " " * (47 - len(item_line)) + "│"
-                print(self._colorize(item_line, 'description'))
-        
-        print(self._colorize("└" + "─" * 48 + "┘", 'system'))
+        self._emit(self._box("ℹ️ 帮助信息", [
+            [(f"📚 {section}", 'system')] + [(f"  {item}", 'description') for item in items]
+            for section, items in help_sections
+        ], 'system'))
+
+    @property
+    def live_supported(self) -> bool:
+        """输出是否为终端，只有终端才能使用实时模式"""
+        return self.stream.isatty()
+
+    def begin_live(self) -> None:
+        """进入实时模式：清屏并隐藏光标，之后用render_live刷新画面"""
+        self._live_frame = []
+        self._write(HIDE_CURSOR + CLEAR_SCREEN)
+
+    def render_live(self, rows: Sequence[Row]) -> None:
+        """实时模式下刷新画面，只重写与上一帧不同的行
+
+        Args:
+            rows: 画面的各行，每行为(文字, 颜色键)；超出终端宽高的部分被截掉
+        """
+        if self._live_frame is None:
+            self.begin_live()
+        columns, lines = shutil.get_terminal_size()
+        frame = [
+            self._colorize(truncate(text, columns - 1), color)
+            for text, color in rows[:lines - 1]
+        ]
+
+        out = []
+        for row, line in enumerate(frame):
+            if row >= len(self._live_frame) or self._live_frame[row] != line:
+                out.append(f"\x1b[{row + 1};1H{line}{CLEAR_LINE}")
+        # 新画面更短时清除多出的旧行
+        for row in range(len(frame), len(self._live_frame)):
+            out.append(f"\x1b[{row + 1};1H{CLEAR_LINE}")
+        self._live_frame = frame
+        if out:
+            self._write(''.join(out))
+
+    def render_observation(self, title: str, characters: Sequence[Dict], events: Sequence[str]) -> None:
+        """在实时模式下渲染观察面板：角色状态表和最近的事件
+
+        Args:
+            title: 面板标题，如当前tick和模拟时间
+            characters: 角色信息字典列表，包含name、location、mood、energy和activity
+            events: 最近的事件描述，按时间先后排列
+        """
+        _, height = shutil.get_terminal_size()
+        rows: List[Row] = [
+            (title, 'system'),
+            ("─" * BOX_WIDTH, 'system'),
+            (f"{pad('角色', 10)}{pad('位置', 12)}{pad('心情', 6)}{pad('精力', 11)}行为", 'system')
+        ]
+        # 角色表至少保留一行，其余空间优先留给事件
+        room = max(1, height - 1 - len(rows) - len(events) - 3)
+        shown = characters if len(characters) <= room else characters[:room - 1]
+        for char in shown:
+            energy = char.get('energy', 0)
+            rows.append((
+                pad(truncate(char['name'], 9), 10)
+                + pad(truncate(char.get('location', ''), 11), 12)
+                + pad(truncate(char.get('mood', ''), 5), 6)
+                + pad("█" * (energy // 10) + "░" * (10 - energy // 10), 11)
+                + char.get('activity', ''),
+                'character_name'
+            ))
+        if len(shown) < len(characters):
+            rows.append((f"…还有{len(characters) - len(shown)}个角色", 'description'))
+
+        rows.append(("─" * BOX_WIDTH, 'system'))
+        rows.extend((event, 'dialogue') for event in events)
+        rows.append(("按q键退出", 'time'))
+        self.render_live(rows)
+
+    def end_live(self) -> None:
+        """退出实时模式：把光标移到画面下方并恢复显示"""
+        if self._live_frame is None:
+            return
+        self._write(f"\x1b[{len(self._live_frame) + 1};1H" + SHOW_CURSOR)
+        self._live_frame = None
 
     def get_input(self, prompt: str = "> ") -> str:
         """获取用户输入
@@ -297,4 +496,4 @@ class Renderer:
             return 'q'  # 返回退出命令
         except EOFError:
             print("\n")
-            return ''  # 返回空字符串
\ No newline at end of file
+            return ''  # 返回空字符串
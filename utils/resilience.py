@@ -0,0 +1,210 @@
+from typing import Optional
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.settings import (
+    REQUESTS_PER_MINUTE, TOKENS_PER_MINUTE, MAX_RETRIES, RETRY_BASE_DELAY,
+    RETRY_MAX_DELAY, CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RECOVERY_TIMEOUT
+)
+
+class APIError(Exception):
+    """API调用失败"""
+
+    def __init__(
+        self,
+        message: str,
+        status_code: Optional[int] = None,
+        retry_after: Optional[float] = None
+    ):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self) -> bool:
+        """该错误是否值得重试"""
+        return False
+
+class APIConnectionError(APIError):
+    """网络连接失败或超时"""
+
+    @property
+    def retryable(self) -> bool:
+        return True
+
+class RateLimitError(APIError):
+    """API返回429，请求过于频繁"""
+
+    @property
+    def retryable(self) -> bool:
+        return True
+
+class ServerError(APIError):
+    """API返回5xx服务端错误"""
+
+    @property
+    def retryable(self) -> bool:
+        return True
+
+class CircuitOpenError(APIError):
+    """熔断器打开，请求被直接拒绝"""
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析Retry-After响应头，支持秒数和HTTP日期两种格式"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+class TokenBucket:
+    """令牌桶，按固定速率补充令牌，容量为一分钟的配额
+
+    per_minute为None时不做限制。
+    """
+
+    def __init__(self, per_minute: Optional[float]):
+        self.unlimited = per_minute is None
+        self.capacity = float(per_minute or 0)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def acquire(self, amount: float = 1) -> None:
+        """取出令牌，不足时阻塞等待"""
+        if self.unlimited:
+            return
+        # 单次请求超过桶容量时按容量计算，避免永久阻塞
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def adjust(self, amount: float) -> None:
+        """修正令牌数（正数归还，负数补扣），允许暂时为负"""
+        if self.unlimited:
+            return
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+class RateLimiter:
+    """同时限制每分钟请求数和token数，传入None表示不限制"""
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = REQUESTS_PER_MINUTE,
+        tokens_per_minute: Optional[float] = TOKENS_PER_MINUTE
+    ):
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+
+    def acquire(self, estimated_tokens: int) -> None:
+        """等待直到请求数和token数配额都足够"""
+        self.request_bucket.acquire(1)
+        self.token_bucket.acquire(estimated_tokens)
+
+    def settle(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """根据响应中实际使用的token数修正预估值"""
+        self.token_bucket.adjust(estimated_tokens - actual_tokens)
+
+class RetryPolicy:
+    """带随机抖动的指数退避重试策略"""
+
+    def __init__(
+        self,
+        max_retries: int = MAX_RETRIES,
+        base_delay: float = RETRY_BASE_DELAY,
+        max_delay: float = RETRY_MAX_DELAY
+    ):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def get_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """计算第attempt次重试前的等待时间，服务端给出Retry-After时优先使用"""
+        if retry_after is not None:
+            return min(self.max_delay, retry_after)
+        backoff = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return random.uniform(0, backoff)
+
+class CircuitBreaker:
+    """熔断器
+
+    连续失败达到阈值后打开，期间直接拒绝请求；
+    冷却时间过后进入半开状态，放行一个试探请求，成功则关闭。
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(
+        self,
+        failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+        recovery_timeout: float = CIRCUIT_RECOVERY_TIMEOUT
+    ):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        """判断当前是否放行请求"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.recovery_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            # 半开状态下同一时间只放行一个试探请求
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        """记录一次成功调用"""
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        """记录一次失败调用"""
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
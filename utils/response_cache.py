@@ -0,0 +1,171 @@
+from typing import Dict, Optional
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.settings import (
+    CACHE_FILE, CACHE_TTL, CACHE_MEMORY_SIZE, CACHE_DISK_SIZE
+)
+
+class ResponseCache:
+    """LLM响应缓存
+
+    两级缓存：内存中的LRU作为第一级，SQLite文件作为第二级持久化存储。
+    缓存键由请求中的模型、消息、温度、最大token数和响应格式计算得到。
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[str] = CACHE_FILE,
+        ttl: float = CACHE_TTL,
+        memory_size: int = CACHE_MEMORY_SIZE,
+        disk_size: int = CACHE_DISK_SIZE
+    ):
+        self.ttl = ttl
+        self.memory_size = memory_size
+        self.disk_size = disk_size
+        self._memory: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        # db_path为None时只使用内存缓存
+        self._db: Optional[sqlite3.Connection] = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, "
+                "response TEXT NOT NULL, "
+                "created_at REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_responses_created "
+                "ON responses(created_at)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def make_key(payload: Dict) -> str:
+        """根据请求内容计算缓存键"""
+        key_data = {
+            'model': payload.get('model'),
+            'messages': payload.get('messages'),
+            'temperature': payload.get('temperature'),
+            'max_tokens': payload.get('max_tokens'),
+            'response_format': payload.get('response_format')
+        }
+        raw = json.dumps(key_data, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, payload: Dict) -> Optional[Dict]:
+        """查找缓存的响应，未命中或已过期时返回None"""
+        key = self.make_key(payload)
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created_at, response = entry
+                if now - created_at <= self.ttl:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return response
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT response, created_at FROM responses WHERE key = ?",
+                    (key,)
+                ).fetchone()
+                if row is not None:
+                    if now - row[1] <= self.ttl:
+                        response = json.loads(row[0])
+                        self._remember(key, row[1], response)
+                        self.hits += 1
+                        self.disk_hits += 1
+                        return response
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._db.commit()
+
+            self.misses += 1
+            return None
+
+    def put(self, payload: Dict, response: Dict) -> None:
+        """写入缓存"""
+        key = self.make_key(payload)
+        now = time.time()
+
+        with self._lock:
+            self._remember(key, now, response)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, created_at) "
+                    "VALUES (?, ?, ?)",
+                    (key, json.dumps(response, ensure_ascii=False), now)
+                )
+                self._evict_disk(now)
+                self._db.commit()
+
+    def delete(self, payload: Dict) -> None:
+        """删除请求对应的缓存条目（如响应内容无法解析时）"""
+        key = self.make_key(payload)
+
+        with self._lock:
+            self._memory.pop(key, None)
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._db.commit()
+
+    def _remember(self, key: str, created_at: float, response: Dict) -> None:
+        """写入内存LRU，超出容量时淘汰最久未使用的条目"""
+        self._memory[key] = (created_at, response)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self, now: float) -> None:
+        """删除过期条目，并在超出容量时删除最旧的条目"""
+        self._db.execute(
+            "DELETE FROM responses WHERE created_at < ?",
+            (now - self.ttl,)
+        )
+        count = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        if count > self.disk_size:
+            self._db.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY created_at LIMIT ?)",
+                (count - self.disk_size,)
+            )
+
+    def stats(self) -> Dict[str, float]:
+        """获取缓存命中统计"""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'memory_entries': len(self._memory)
+        }
+
+    def clear(self) -> None:
+        """清空所有缓存"""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def close(self) -> None:
+        """关闭数据库连接"""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
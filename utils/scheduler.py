@@ -0,0 +1,97 @@
+from typing import Dict, List, Optional, Tuple
+import heapq
+import os
+import random
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.settings import ACTION_UPDATE_INTERVAL, EMOTION_UPDATE_INTERVAL, INTERACTION_COOLDOWN
+
+ACTION = 'action'  # 回合决策（行为、对话和心情）
+MOOD = 'mood'  # 心情重新评估
+
+class CharacterScheduler:
+    """按角色安排行为和心情更新时间的优先队列
+
+    每个角色有各自的下次行为时间、下次心情时间和互动冷却结束时间。
+    到期任务按时间从最小堆中取出，重新安排或提前时旧条目留在堆中，
+    弹出时与当前安排的时间不一致即跳过（惰性删除），每次操作O(log n)。
+    """
+
+    def __init__(self, seed: Optional[int] = None):
+        # 最小堆：(到期时间, 序号, 角色ID, 任务类型)
+        self._heap: List[Tuple[float, int, str, str]] = []
+        # 当前有效的安排：(角色ID, 任务类型) -> 到期时间
+        self._due: Dict[Tuple[str, str], float] = {}
+        self._next_interaction: Dict[str, float] = {}
+        self._seq = 0
+        self._rng = random.Random(seed)
+
+    def __len__(self) -> int:
+        """已安排的角色数"""
+        return len(self._next_interaction)
+
+    def __contains__(self, char_id: str) -> bool:
+        return char_id in self._next_interaction
+
+    def add(self, char_id: str, now: float) -> None:
+        """登记角色，首次任务在一个间隔内随机错开，避免所有角色同时请求LLM"""
+        self._next_interaction[char_id] = now
+        self.schedule(char_id, ACTION, now + self._rng.uniform(0, ACTION_UPDATE_INTERVAL))
+        self.schedule(char_id, MOOD, now + self._rng.uniform(0, EMOTION_UPDATE_INTERVAL))
+
+    def remove(self, char_id: str) -> None:
+        """注销角色，堆中剩余的条目在弹出时跳过"""
+        self._next_interaction.pop(char_id, None)
+        self._due.pop((char_id, ACTION), None)
+        self._due.pop((char_id, MOOD), None)
+
+    def schedule(self, char_id: str, kind: str, when: float) -> None:
+        """把角色的一种任务安排在when时刻，替换原有的安排"""
+        self._due[(char_id, kind)] = when
+        self._seq += 1
+        heapq.heappush(self._heap, (when, self._seq, char_id, kind))
+
+    def wake(self, char_id: str, when: float) -> None:
+        """把角色的下次行为提前到when（例如有人对其说话），已经更早时不变"""
+        due = self._due.get((char_id, ACTION))
+        if due is not None and when < due:
+            self.schedule(char_id, ACTION, when)
+
+    def next_time(self) -> Optional[float]:
+        """最早的到期时间，没有任务时返回None"""
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: float) -> List[Tuple[str, str]]:
+        """取出所有在now之前到期的任务
+
+        Returns:
+            按到期时间排列的(角色ID, 任务类型)列表；取出的任务需要由调用方重新安排
+        """
+        due: List[Tuple[str, str]] = []
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            when, _, char_id, kind = heapq.heappop(heap)
+            if self._due.get((char_id, kind)) == when:
+                del self._due[(char_id, kind)]
+                due.append((char_id, kind))
+        # 重新安排和提前留下的失效条目过多时重建堆
+        if len(heap) > 2 * len(self._due) + 64:
+            self._heap = [entry for entry in heap if self._due.get((entry[2], entry[3])) == entry[0]]
+            heapq.heapify(self._heap)
+        return due
+
+    def _drop_stale(self) -> None:
+        """丢弃堆顶的失效条目"""
+        heap = self._heap
+        while heap and self._due.get((heap[0][2], heap[0][3])) != heap[0][0]:
+            heapq.heappop(heap)
+
+    def can_interact(self, char_id: str, now: float) -> bool:
+        """角色的互动冷却是否已经结束"""
+        return now >= self._next_interaction.get(char_id, now)
+
+    def mark_interaction(self, char_id: str, now: float) -> None:
+        """角色刚刚发起互动，INTERACTION_COOLDOWN秒内不再发起"""
+        self._next_interaction[char_id] = now + INTERACTION_COOLDOWN
@@ -0,0 +1,115 @@
+from typing import Optional
+from datetime import datetime
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.settings import SIMULATION_TICK
+
+REALTIME = 'realtime'  # 模拟时间等于真实时间
+ACCELERATED = 'accelerated'  # 模拟时间按speed倍速流逝
+MANUAL = 'manual'  # 模拟时间只在tick()或advance()时前进
+
+class SimClock:
+    """模拟时钟
+
+    小镇中所有与时间相关的判断（记忆时间戳、日常作息、房间光照、昼夜）都通过同一个
+    时钟获取，模拟时间因此可以脱离真实时间：加速模式下一分钟可以过完一天，手动模式下
+    每个tick前进固定的step秒，与运行速度无关。
+
+    小时、时段、昼夜等派生值读取tick()（或sync()）时记下的时间，一个tick内的查询
+    不再读取系统时钟；小时按小时缓存，只有时间越过整点时才重新换算本地时间。
+    """
+
+    def __init__(
+        self,
+        mode: str = REALTIME,
+        speed: float = 1.0,
+        step: float = SIMULATION_TICK,
+        start: Optional[float] = None
+    ):
+        """
+        Args:
+            mode: REALTIME、ACCELERATED或MANUAL
+            speed: 加速模式下模拟时间与真实时间之比，如1440为一分钟一天
+            step: 手动模式下每个tick前进的模拟时间（秒）
+            start: 初始模拟时间戳，默认为当前时间
+        """
+        if mode not in (REALTIME, ACCELERATED, MANUAL):
+            raise ValueError(f"未知的时钟模式: {mode}")
+        self.mode = mode
+        self.speed = speed if mode == ACCELERATED else 1.0
+        self.step = step
+        self._wall_origin = time.time()
+        self._origin = self._wall_origin if start is None else start
+        # 最近一次tick()或sync()时的模拟时间，派生值都按它计算
+        self._tick_time = self._origin
+        # 缓存的小时及其所在的时间区间[_hour_start, _hour_end)
+        self._hour = 0
+        self._hour_start = float('inf')
+        self._hour_end = float('-inf')
+
+    def now(self) -> float:
+        """当前模拟时间戳（秒）"""
+        if self.mode == MANUAL:
+            return self._origin
+        return self._origin + (time.time() - self._wall_origin) * self.speed
+
+    def tick(self) -> float:
+        """进入下一个tick：手动模式前进step秒，其他模式随真实时间流逝
+
+        Returns:
+            新tick的模拟时间戳
+        """
+        if self.mode == MANUAL:
+            self._origin += self.step
+        return self.sync()
+
+    def sync(self) -> float:
+        """不推进时间，只把派生值使用的时间更新为当前模拟时间（如菜单模式每次操作前）
+
+        Returns:
+            当前模拟时间戳
+        """
+        self._tick_time = self.now()
+        return self._tick_time
+
+    def advance(self, seconds: float) -> None:
+        """让模拟时间立即前进seconds秒"""
+        self._origin += seconds
+        self.sync()
+
+    def set_time(self, timestamp: float) -> None:
+        """把模拟时间设为timestamp（如从存档恢复时）"""
+        self._wall_origin = time.time()
+        self._origin = timestamp
+        self.sync()
+
+    def wall_seconds(self, seconds: float) -> float:
+        """经过seconds秒模拟时间需要等待的真实时间，手动模式为0"""
+        return 0.0 if self.mode == MANUAL else seconds / self.speed
+
+    def hour(self, timestamp: Optional[float] = None) -> int:
+        """模拟时间（默认为最近一次tick的时间）的本地小时数"""
+        t = self._tick_time if timestamp is None else timestamp
+        if not self._hour_start <= t < self._hour_end:
+            moment = datetime.fromtimestamp(t)
+            self._hour = moment.hour
+            self._hour_start = t - (moment.minute * 60 + moment.second + moment.microsecond / 1e6)
+            self._hour_end = self._hour_start + 3600
+        return self._hour
+
+    def time_of_day(self) -> str:
+        """当前时段：morning（6-12点）、afternoon（12-18点）或evening（其余时间）"""
+        hour = self.hour()
+        if 6 <= hour < 12:
+            return 'morning'
+        elif 12 <= hour < 18:
+            return 'afternoon'
+        return 'evening'
+
+    def is_night(self) -> bool:
+        """是否为夜间（22点到次日6点）"""
+        hour = self.hour()
+        return hour >= 22 or hour < 6
@@ -0,0 +1,341 @@
+from typing import Dict, Iterator, List, Optional, Tuple
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.settings import STUB_LATENCY, STUB_ERROR_RATE, STUB_SEED
+from utils.llm_backend import LLMBackend
+from utils.prompt_builder import estimate_tokens
+
+# 默认的固定回复，按请求内容的哈希确定性地选取
+DEFAULT_RESPONSES = [
+    "我整理了一下桌上的资料，准备开始今天的工作。",
+    "我走到窗边看了看外面，然后回到座位上继续忙。",
+    "我打开电脑查看了最新的实验结果，觉得还不错。",
+    "我和旁边的人聊了几句最近的趣事。",
+    "我决定休息一会儿，喝杯水放松一下。"
+]
+DEFAULT_MOODS = ["开心", "平静", "兴奋", "疲惫", "专注"]
+
+class LatencyModel:
+    """模拟响应延迟的分布
+
+    规格字符串格式：
+        fixed:0.05          固定延迟（秒）
+        uniform:0.01,0.2    均匀分布
+        lognormal:-2.5,0.6  对数正态分布（mu, sigma）
+    """
+
+    def __init__(self, spec: str = "fixed:0", rng: Optional[random.Random] = None):
+        self.spec = spec
+        self.rng = rng or random.Random()
+        kind, _, args = spec.partition(':')
+        self.kind = kind
+        self.params = [float(x) for x in args.split(',') if x]
+        if kind not in ('fixed', 'uniform', 'lognormal'):
+            raise ValueError(f"未知的延迟分布: {spec}")
+
+    def sample(self) -> float:
+        """采样一次延迟（秒）"""
+        if self.kind == 'fixed':
+            return self.params[0] if self.params else 0.0
+        if self.kind == 'uniform':
+            return self.rng.uniform(self.params[0], self.params[1])
+        return self.rng.lognormvariate(self.params[0], self.params[1])
+
+class StubLLM:
+    """离线的DeepSeek兼容响应生成器
+
+    根据请求内容生成确定性的回复：相同的请求总是得到相同的内容。
+    JSON模式的请求返回符合回合决策格式的JSON。支持注入延迟和错误。
+    """
+
+    def __init__(
+        self,
+        latency: str = STUB_LATENCY,
+        error_rate: float = STUB_ERROR_RATE,
+        error_statuses: Tuple[int, ...] = (429, 500, 503),
+        responses: Optional[List[str]] = None,
+        template: Optional[str] = None,
+        seed: int = STUB_SEED,
+        stream_chunk_size: int = 4
+    ):
+        """
+        Args:
+            latency: 延迟分布规格，见LatencyModel
+            error_rate: 返回错误的概率（0-1）
+            error_statuses: 注入错误时随机选用的HTTP状态码
+            responses: 固定回复列表，为None时使用默认回复
+            template: 回复模板，可使用{reply}和{prompt}占位符
+            seed: 随机数种子，用于延迟和错误注入
+            stream_chunk_size: 流式响应每个片段的字符数
+        """
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.latency = LatencyModel(latency, self._rng)
+        self.error_rate = error_rate
+        self.error_statuses = error_statuses
+        self.responses = responses or DEFAULT_RESPONSES
+        self.template = template
+        self.stream_chunk_size = stream_chunk_size
+        self.request_count = 0
+        self.error_count = 0
+
+    def handle(self, payload: Dict) -> Tuple[int, Dict[str, str], Optional[Dict]]:
+        """处理一次请求
+
+        Returns:
+            (状态码, 响应头, 响应体)，出错时响应体为错误信息
+        """
+        with self._lock:
+            self.request_count += 1
+            delay = self.latency.sample()
+            inject_error = self.error_rate > 0 and self._rng.random() < self.error_rate
+            status = self._rng.choice(self.error_statuses) if inject_error else 200
+        if delay > 0:
+            time.sleep(delay)
+
+        if inject_error:
+            with self._lock:
+                self.error_count += 1
+            headers = {'Retry-After': '1'} if status == 429 else {}
+            return status, headers, {'error': {'message': f'stub error {status}'}}
+
+        return 200, {}, self._completion(payload)
+
+    def _completion(self, payload: Dict) -> Dict:
+        """生成完整的对话补全响应体"""
+        messages = payload.get('messages', [])
+        prompt = messages[-1].get('content', '') if messages else ''
+        content = self.generate_content(payload)
+        prompt_tokens = sum(estimate_tokens(m.get('content', '')) for m in messages)
+        completion_tokens = estimate_tokens(content)
+        return {
+            'id': 'stub-' + hashlib.md5(prompt.encode('utf-8')).hexdigest()[:12],
+            'object': 'chat.completion',
+            'model': payload.get('model', 'deepseek-chat'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': 'stop'
+            }],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens
+            }
+        }
+
+    def generate_content(self, payload: Dict) -> str:
+        """根据请求内容确定性地生成回复文本"""
+        messages = payload.get('messages', [])
+        prompt = messages[-1].get('content', '') if messages else ''
+        digest = int(hashlib.md5(prompt.encode('utf-8')).hexdigest(), 16)
+        reply = self.responses[digest % len(self.responses)]
+        if self.template:
+            reply = self.template.format(reply=reply, prompt=prompt[:50])
+
+        if (payload.get('response_format') or {}).get('type') == 'json_object':
+            if '"summaries"' in prompt:
+                # 记忆压缩请求：每组返回一条摘要
+                groups = re.findall(r'^第(\d+)组', prompt, re.MULTILINE)
+                return json.dumps({
+                    'summaries': [
+                        {'group': int(group), 'summary': f"这段时间里，{reply}", 'importance': 4}
+                        for group in groups
+                    ]
+                }, ensure_ascii=False)
+
+            # 从提示中找出可以交谈的对象
+            candidates = re.findall(r'id: (\w+)', prompt)
+            target = candidates[digest % len(candidates)] if candidates else None
+            return json.dumps({
+                'action': reply,
+                'utterance': f"你好，{reply}" if target else None,
+                'target': target,
+                'mood': DEFAULT_MOODS[digest % len(DEFAULT_MOODS)],
+                'relationship_delta': (digest % 16) - 5 if target else 0
+            }, ensure_ascii=False)
+
+        max_chars = payload.get('max_tokens')
+        if max_chars:
+            # 按中文字符粗略限制输出长度
+            reply = reply[:max(1, int(max_chars / 0.6))]
+        return reply
+
+    def stream_events(self, body: Dict) -> Iterator[bytes]:
+        """把完整响应拆分为SSE事件"""
+        content = body['choices'][0]['message']['content']
+        size = self.stream_chunk_size
+        for i in range(0, len(content), size):
+            event = {
+                'id': body['id'],
+                'object': 'chat.completion.chunk',
+                'choices': [{'index': 0, 'delta': {'content': content[i:i + size]}}]
+            }
+            yield b'data: ' + json.dumps(event, ensure_ascii=False).encode('utf-8')
+        yield b'data: [DONE]'
+
+    def stats(self) -> Dict[str, float]:
+        """获取请求统计"""
+        return {
+            'requests': self.request_count,
+            'errors': self.error_count
+        }
+
+class StubResponse:
+    """进程内模拟后端返回的响应对象，接口与requests.Response一致"""
+
+    def __init__(
+        self,
+        status_code: int,
+        headers: Dict[str, str],
+        body: Optional[Dict],
+        events: Optional[Iterator[bytes]] = None
+    ):
+        self.status_code = status_code
+        self.headers = headers
+        self._body = body
+        self._events = events
+
+    def json(self) -> Dict:
+        return self._body
+
+    def iter_lines(self) -> Iterator[bytes]:
+        for event in self._events or ():
+            yield event
+            yield b''
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> 'StubResponse':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+class StubBackend(LLMBackend):
+    """进程内的离线后端，不经过网络，适合基准测试"""
+
+    rate_limited = False
+
+    def __init__(self, llm: Optional[StubLLM] = None, **kwargs):
+        self.llm = llm or StubLLM(**kwargs)
+
+    def post(
+        self,
+        url: str,
+        headers: Dict[str, str],
+        payload: Dict,
+        stream: bool = False
+    ) -> StubResponse:
+        status, response_headers, body = self.llm.handle(payload)
+        events = None
+        if stream and status == 200:
+            events = self.llm.stream_events(body)
+        return StubResponse(status, response_headers, body, events)
+
+    def stats(self) -> Dict[str, float]:
+        return self.llm.stats()
+
+class _StubRequestHandler(BaseHTTPRequestHandler):
+    """模拟服务器的请求处理器"""
+
+    protocol_version = 'HTTP/1.1'
+    llm: StubLLM = None
+
+    def do_POST(self) -> None:
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._send_json(404, {}, {'error': {'message': 'not found'}})
+            return
+
+        length = int(self.headers.get('Content-Length', 0))
+        try:
+            payload = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            self._send_json(400, {}, {'error': {'message': 'invalid json'}})
+            return
+
+        status, headers, body = self.llm.handle(payload)
+        if status != 200 or not payload.get('stream'):
+            self._send_json(status, headers, body)
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        for event in self.llm.stream_events(body):
+            self.wfile.write(event + b'\n\n')
+            self.wfile.flush()
+        self.close_connection = True
+
+    def _send_json(self, status: int, headers: Dict[str, str], body: Dict) -> None:
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args) -> None:
+        pass  # 压测时不输出访问日志
+
+class StubServer:
+    """在本地端口提供/chat/completions接口的模拟服务器"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, llm: Optional[StubLLM] = None):
+        self.llm = llm or StubLLM()
+        handler = type('StubRequestHandler', (_StubRequestHandler,), {'llm': self.llm})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        """可直接用作API_BASE_URL的地址"""
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> 'StubServer':
+        """在后台线程中启动服务器"""
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """停止服务器"""
+        self.server.shutdown()
+        self.server.server_close()
+
+def main():
+    parser = argparse.ArgumentParser(description="离线的DeepSeek兼容模拟服务器")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--latency', default=STUB_LATENCY, help="延迟分布，如 uniform:0.05,0.3")
+    parser.add_argument('--error-rate', type=float, default=STUB_ERROR_RATE)
+    parser.add_argument('--seed', type=int, default=STUB_SEED)
+    args = parser.parse_args()
+
+    llm = StubLLM(latency=args.latency, error_rate=args.error_rate, seed=args.seed)
+    server = StubServer(args.host, args.port, llm)
+    print(f"模拟服务器已启动: {server.base_url}")
+    try:
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
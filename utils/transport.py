@@ -0,0 +1,108 @@
+from typing import Dict, Tuple
+import os
+import sys
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.settings import HTTP_POOL_SIZE, CONNECT_TIMEOUT, READ_TIMEOUT
+from utils.llm_backend import LLMBackend
+
+class HTTPTransport(LLMBackend):
+    """带连接池的HTTP传输层，即访问真实API的后端
+
+    持有一个长连接的requests.Session，同一主机的请求复用已建立的
+    TCP/TLS连接，避免每次调用都重新握手。
+    """
+
+    def __init__(
+        self,
+        pool_size: int = HTTP_POOL_SIZE,
+        connect_timeout: float = CONNECT_TIMEOUT,
+        read_timeout: float = READ_TIMEOUT
+    ):
+        self.pool_size = pool_size
+        self.timeout: Tuple[float, float] = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        self.session.headers['Connection'] = 'keep-alive'
+        # 实际建立的TCP连接数；urllib3在池中的连接对象上重连时不会增加num_connections，
+        # 所以在连接类的connect()中计数
+        self._socket_opens = 0
+        self._opens_lock = threading.Lock()
+
+        # pool_maxsize需要不小于并发请求数，否则多余的连接用完即被丢弃
+        self.adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_size,
+            pool_block=True
+        )
+        self.adapter.poolmanager.pool_classes_by_scheme = self._counting_pool_classes()
+        self.session.mount('https://', self.adapter)
+        self.session.mount('http://', self.adapter)
+
+    def _counting_pool_classes(self) -> Dict[str, type]:
+        """创建连接时计数的连接池类，按协议返回"""
+        transport = self
+
+        def count_connect(connection_cls: type) -> type:
+            class CountingConnection(connection_cls):
+                def connect(self) -> None:
+                    super().connect()
+                    with transport._opens_lock:
+                        transport._socket_opens += 1
+            return CountingConnection
+
+        class CountingHTTPPool(HTTPConnectionPool):
+            ConnectionCls = count_connect(HTTPConnection)
+
+        class CountingHTTPSPool(HTTPSConnectionPool):
+            ConnectionCls = count_connect(HTTPSConnection)
+
+        return {'http': CountingHTTPPool, 'https': CountingHTTPSPool}
+
+    def post(
+        self,
+        url: str,
+        headers: Dict[str, str],
+        payload: Dict,
+        stream: bool = False
+    ) -> requests.Response:
+        """发送POST请求，返回原始响应对象"""
+        return self.session.post(
+            url,
+            headers=headers,
+            json=payload,
+            timeout=self.timeout,
+            stream=stream
+        )
+
+    def stats(self) -> Dict[str, float]:
+        """获取连接复用统计
+
+        Returns:
+            包含请求数、新建连接数、复用次数和复用率的字典
+        """
+        total_requests = 0
+        pools = self.adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            total_requests += pool.num_requests
+        new_connections = self._socket_opens
+
+        reused = max(0, total_requests - new_connections)
+        return {
+            'requests': total_requests,
+            'new_connections': new_connections,
+            'reused_connections': reused,
+            'reuse_rate': reused / total_requests if total_requests else 0.0
+        }
+
+    def close(self) -> None:
+        """关闭会话并释放连接池"""
+        self.session.close()
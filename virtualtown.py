@@ -0,0 +1,125 @@
+"""VirtualTown命令行入口
+
+用法：
+    python -m virtualtown run --ticks 1000 --headless
+    python -m virtualtown run --ticks 100 --backend stub --latency uniform:0.05,0.3 --events events.jsonl
+    python -m virtualtown run --ticks 1008 --tick-seconds 600 --headless --backend stub  # 模拟一周
+"""
+from typing import Dict, Optional
+from collections import Counter
+import argparse
+import json
+import random
+import sys
+import time
+
+from engine import SimulationEngine
+from utils.api_client import DeepSeekClient
+from utils.event_bus import EventBus
+from utils.llm_backend import create_backend
+from utils.renderer import Renderer
+from utils.sim_clock import SimClock, REALTIME, ACCELERATED, MANUAL
+from config.settings import (
+    LLM_BACKEND, STUB_LATENCY, STUB_ERROR_RATE, STUB_SEED, SIMULATION_TICK, CLOCK_SPEED
+)
+
+def create_client(backend: str, latency: str, error_rate: float, seed: Optional[int]) -> DeepSeekClient:
+    """按命令行参数创建LLM客户端"""
+    if backend == 'stub':
+        from utils.stub_llm import StubBackend
+        return DeepSeekClient(backend=StubBackend(
+            latency=latency, error_rate=error_rate, seed=STUB_SEED if seed is None else seed
+        ))
+    return DeepSeekClient(backend=create_backend(backend))
+
+def attach_console(engine: SimulationEngine) -> None:
+    """把行为、对话和移动事件输出到终端"""
+    renderer = Renderer()
+
+    def name(char_id: str) -> str:
+        return engine.characters[char_id].name
+
+    engine.events.subscribe('action', lambda e: renderer.render_system_message(
+        f"{name(e['char_id'])}的行为：{e['action']}"))
+    engine.events.subscribe('dialogue', lambda e: renderer.render_dialogue(
+        name(e['char_id']), e['utterance']))
+    engine.events.subscribe('move', lambda e: renderer.render_system_message(
+        f"{name(e['char_id'])}移动到了{engine.rooms[e['room_id']].name}"))
+    engine.events.subscribe('turn_failed', lambda e: renderer.render_error(
+        f"{name(e['char_id'])}本回合行动失败: {e['error']}"))
+    engine.events.subscribe('tick', lambda e: renderer.render_system_message(
+        f"第{e['tick']}个tick完成，用时{e['elapsed']:.2f}秒"))
+
+def run(args: argparse.Namespace) -> int:
+    """无交互地运行指定数量的tick，结束时输出统计"""
+    if args.seed is not None:
+        random.seed(args.seed)
+    engine = SimulationEngine(
+        create_client(args.backend, args.latency, args.error_rate, args.seed),
+        SimClock(args.clock, speed=args.speed, step=args.tick_seconds)
+    )
+
+    counts: Dict[str, int] = Counter()
+    engine.events.subscribe(EventBus.ALL, lambda e: counts.update((e['type'],)))
+    events_file = open(args.events, 'w', encoding='utf-8') if args.events else None
+    if events_file is not None:
+        engine.events.subscribe(
+            EventBus.ALL, lambda e: events_file.write(json.dumps(e, ensure_ascii=False) + '\n')
+        )
+    if not args.headless:
+        attach_console(engine)
+
+    start = time.perf_counter()
+    start_time = engine.now
+    try:
+        engine.initialize()
+        # 从存档恢复时模拟时间从存档处继续
+        start_time = engine.now
+        engine.run(args.ticks)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.shutdown()
+        if events_file is not None:
+            events_file.close()
+    elapsed = time.perf_counter() - start
+
+    summary = {
+        'ticks': engine.tick,
+        'characters': len(engine.characters),
+        'elapsed_s': round(elapsed, 3),
+        'ticks_per_second': round(engine.tick / elapsed, 3) if elapsed else 0.0,
+        'simulated_s': round(engine.now - start_time, 3),
+        'events': dict(counts)
+    }
+    print(json.dumps(summary, ensure_ascii=False))
+    return 0
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='virtualtown', description="VirtualTown虚拟小镇模拟")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help="无交互地运行模拟")
+    run_parser.add_argument('--ticks', type=int, default=10, help="运行的tick数")
+    run_parser.add_argument('--headless', action='store_true',
+                            help="不在终端输出事件，只在结束时输出统计")
+    run_parser.add_argument('--backend', choices=['http', 'stub'], default=LLM_BACKEND,
+                            help="LLM后端，stub为离线模拟后端")
+    run_parser.add_argument('--latency', default=STUB_LATENCY, help="模拟后端的延迟分布")
+    run_parser.add_argument('--error-rate', type=float, default=STUB_ERROR_RATE,
+                            help="模拟后端注入错误的概率")
+    run_parser.add_argument('--seed', type=int, help="随机数种子")
+    run_parser.add_argument('--clock', choices=[MANUAL, ACCELERATED, REALTIME], default=MANUAL,
+                            help="模拟时钟，manual为每个tick前进--tick-seconds秒")
+    run_parser.add_argument('--speed', type=float, default=CLOCK_SPEED,
+                            help="accelerated时钟的倍速")
+    run_parser.add_argument('--tick-seconds', type=float, default=SIMULATION_TICK,
+                            help="manual时钟每个tick推进的模拟时间（秒）")
+    run_parser.add_argument('--events', help="把所有事件以JSON Lines格式写入该文件")
+    run_parser.set_defaults(func=run)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())